@@ -0,0 +1,600 @@
+import os
+import asyncio
+import json
+import uuid
+import asyncpg
+from decimal import Decimal
+from typing import Optional, Dict, Any, List
+from datetime import datetime, date, timezone
+from rock_index import RockEventIndex
+from pagination import decode_cursor
+from stats import build_event_stats
+from batching import BatchLoader
+from singleflight import SingleFlight, single_flight
+
+# Queries quentes: preparadas uma vez por conexão do pool
+HOT_QUERIES = {
+    'get_event': "SELECT * FROM events WHERE id = $1",
+    'get_events_by_ids': "SELECT * FROM events WHERE id = ANY($1::integer[])",
+    'get_rock_events': """
+        SELECT * FROM eventos_rock
+        WHERE data_formatada >= $1
+          AND ($2::text IS NULL OR cidade ILIKE $2)
+        ORDER BY data_formatada ASC, id ASC
+        LIMIT $3 OFFSET $4
+    """,
+    'get_rock_events_after': """
+        SELECT * FROM eventos_rock
+        WHERE data_formatada >= $1
+          AND ($2::text IS NULL OR cidade ILIKE $2)
+          AND (data_formatada, id) > ($4::timestamptz, $5::uuid)
+        ORDER BY data_formatada ASC, id ASC
+        LIMIT $3
+    """,
+    'get_tickets_by_user': """
+        SELECT t.*, to_jsonb(e) AS events
+        FROM tickets t
+        LEFT JOIN events e ON e.id = t.event_id
+        WHERE t.user_id = $1
+    """,
+    'create_ticket': """
+        INSERT INTO tickets (event_id, user_id, price_paid, ticket_number, qr_code, status, purchased_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        RETURNING *
+    """,
+}
+
+def encode_json(value: Any) -> str:
+    """Codec dos parâmetros json/jsonb: datas e Decimal viram texto, como no PostgREST"""
+    return json.dumps(value, default=str)
+
+class PreparedConnection(asyncpg.Connection):
+    """Conexão asyncpg que guarda os prepared statements das queries quentes"""
+    __slots__ = ('statements',)
+
+class AsyncpgClient:
+    """Backend PostgreSQL direto via asyncpg com a mesma interface do SupabaseClient"""
+
+    def __init__(self):
+        self.database_url = os.getenv("DATABASE_URL")
+
+        if not self.database_url:
+            raise ValueError("DATABASE_URL deve estar definida para usar DATABASE_BACKEND=asyncpg")
+
+        self.min_size = int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))
+        self.max_size = int(os.getenv("DATABASE_POOL_MAX_SIZE", "20"))
+        self.read_timeout = float(os.getenv("DATABASE_READ_TIMEOUT", "5"))
+        self.write_timeout = float(os.getenv("DATABASE_WRITE_TIMEOUT", "10"))
+
+        self.pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+
+        # Índice slug -> evento da tabela eventos_rock
+        self.rock_index = RockEventIndex(
+            refresh_interval=float(os.getenv("ROCK_INDEX_REFRESH_INTERVAL", "600"))
+        )
+
+        # Leituras idênticas simultâneas compartilham a mesma consulta
+        self.flights = SingleFlight('database')
+
+        # Agrupa get_event/get_user feitos no mesmo ciclo do event loop numa única consulta
+        batch_size = int(os.getenv("DATABASE_BATCH_MAX_SIZE", "100"))
+        self.event_loader = BatchLoader('events', self._load_events, batch_size)
+        self.user_loader = BatchLoader('users', self._load_users, batch_size)
+
+    async def _init_connection(self, conn: PreparedConnection):
+        """Configura codecs JSON e prepara as queries quentes na conexão"""
+        for json_type in ('json', 'jsonb'):
+            await conn.set_type_codec(json_type, encoder=encode_json, decoder=json.loads, schema='pg_catalog')
+        conn.statements = {}
+        for name, sql in HOT_QUERIES.items():
+            conn.statements[name] = await conn.prepare(sql)
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        """Cria o pool de conexões sob demanda (dentro do event loop)"""
+        if self.pool is None:
+            async with self._pool_lock:
+                if self.pool is None:
+                    self.pool = await asyncpg.create_pool(
+                        self.database_url,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        connection_class=PreparedConnection,
+                        init=self._init_connection
+                    )
+        return self.pool
+
+    async def aclose(self):
+        """Fecha as conexões do pool"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def _normalize_value(self, value: Any) -> Any:
+        """Converte tipos do PostgreSQL para o mesmo formato JSON devolvido pelo PostgREST"""
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+    def _row_to_dict(self, row: Optional[asyncpg.Record]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        return {key: self._normalize_value(value) for key, value in row.items()}
+
+    def _rows_to_list(self, rows: List[asyncpg.Record]) -> List[Dict[str, Any]]:
+        return [self._row_to_dict(row) for row in rows]
+
+    def _quote_columns(self, data: Dict[str, Any]) -> str:
+        return ', '.join(f'"{column}"' for column in data.keys())
+
+    def _select_columns(self, columns: Optional[List[str]]) -> str:
+        """Lista de colunas do SELECT: só as pedidas, ou todas"""
+        if not columns:
+            return "*"
+        return ', '.join(f'"{column}"' for column in columns)
+
+    async def _fetch(self, sql: str, *args, timeout: Optional[float] = None) -> List[asyncpg.Record]:
+        pool = await self._get_pool()
+        return await pool.fetch(sql, *args, timeout=timeout or self.read_timeout)
+
+    async def _fetchrow(self, sql: str, *args, timeout: Optional[float] = None) -> Optional[asyncpg.Record]:
+        pool = await self._get_pool()
+        return await pool.fetchrow(sql, *args, timeout=timeout or self.read_timeout)
+
+    async def _fetch_prepared(self, name: str, *args, timeout: Optional[float] = None) -> List[asyncpg.Record]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            return await conn.statements[name].fetch(*args, timeout=timeout or self.read_timeout)
+
+    async def _insert(self, table: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        INSERT genérico: os valores chegam como JSON e o PostgreSQL faz a conversão de tipos, como no PostgREST.
+        O dict vai direto como parâmetro; o codec jsonb da conexão (encode_json) faz a serialização.
+        """
+        columns = self._quote_columns(data)
+        sql = f"""
+            INSERT INTO {table} ({columns})
+            SELECT {columns} FROM jsonb_populate_record(NULL::{table}, $1::jsonb)
+            RETURNING *
+        """
+        row = await self._fetchrow(sql, data, timeout=self.write_timeout)
+        return self._row_to_dict(row)
+
+    async def _update(self, table: str, row_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """UPDATE genérico por id com conversão de tipos feita pelo PostgreSQL"""
+        columns = self._quote_columns(data)
+        sql = f"""
+            UPDATE {table} SET ({columns}) = (
+                SELECT {columns} FROM jsonb_populate_record(NULL::{table}, $2::jsonb)
+            )
+            WHERE id = $1
+            RETURNING *
+        """
+        row = await self._fetchrow(sql, row_id, data, timeout=self.write_timeout)
+        return self._row_to_dict(row)
+
+    async def _delete(self, table: str, row_id: int) -> bool:
+        pool = await self._get_pool()
+        await pool.execute(f"DELETE FROM {table} WHERE id = $1", row_id, timeout=self.write_timeout)
+        return True
+
+    # Métodos para Usuários
+    async def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cria um novo usuário"""
+        try:
+            return await self._insert('users', user_data)
+        except Exception as e:
+            print(f"Erro ao criar usuário: {e}")
+            raise e
+
+    @single_flight
+    async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Busca um usuário por ID (agrupado com as demais buscas do mesmo ciclo)"""
+        try:
+            return await self.user_loader.load(user_id)
+        except Exception as e:
+            print(f"Erro ao buscar usuário: {e}")
+            raise e
+
+    @single_flight
+    async def get_users_by_ids(self, user_ids: List[int]) -> List[Dict[str, Any]]:
+        """Busca vários usuários numa única consulta"""
+        try:
+            if not user_ids:
+                return []
+            rows = await self._fetch("SELECT * FROM users WHERE id = ANY($1::integer[])", list(user_ids))
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao buscar usuários: {e}")
+            raise e
+
+    async def _load_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return {user['id']: user for user in await self.get_users_by_ids(user_ids)}
+
+    @single_flight
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Busca um usuário por email"""
+        try:
+            row = await self._fetchrow("SELECT * FROM users WHERE email = $1", email)
+            return self._row_to_dict(row)
+        except Exception as e:
+            print(f"Erro ao buscar usuário por email: {e}")
+            raise e
+
+    async def update_user(self, user_id: int, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Atualiza um usuário"""
+        try:
+            return await self._update('users', user_id, user_data)
+        except Exception as e:
+            print(f"Erro ao atualizar usuário: {e}")
+            raise e
+
+    async def delete_user(self, user_id: int) -> bool:
+        """Deleta um usuário"""
+        try:
+            return await self._delete('users', user_id)
+        except Exception as e:
+            print(f"Erro ao deletar usuário: {e}")
+            raise e
+
+    # Métodos para Eventos
+    async def create_event(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cria um novo evento"""
+        try:
+            return await self._insert('events', event_data)
+        except Exception as e:
+            print(f"Erro ao criar evento: {e}")
+            raise e
+
+    @single_flight
+    async def get_event(self, event_id: int) -> Optional[Dict[str, Any]]:
+        """Busca um evento por ID (agrupado com as demais buscas do mesmo ciclo)"""
+        try:
+            return await self.event_loader.load(event_id)
+        except Exception as e:
+            print(f"Erro ao buscar evento: {e}")
+            raise e
+
+    @single_flight
+    async def get_events_by_ids(self, event_ids: List[int]) -> List[Dict[str, Any]]:
+        """Busca vários eventos numa única consulta"""
+        try:
+            if not event_ids:
+                return []
+            if len(event_ids) == 1:
+                rows = await self._fetch_prepared('get_event', event_ids[0])
+            else:
+                rows = await self._fetch_prepared('get_events_by_ids', list(event_ids))
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao buscar eventos: {e}")
+            raise e
+
+    async def _load_events(self, event_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return {event['id']: event for event in await self.get_events_by_ids(event_ids)}
+
+    @single_flight
+    async def get_events(self, limit: int = 50, offset: int = 0, cursor: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Busca todos os eventos com paginação (por offset ou por cursor em id)"""
+        try:
+            select = self._select_columns(columns)
+            if cursor:
+                last_id, = decode_cursor(cursor, 1)
+                rows = await self._fetch(f"SELECT {select} FROM events WHERE id > $1 ORDER BY id LIMIT $2", int(last_id), limit)
+            else:
+                rows = await self._fetch(f"SELECT {select} FROM events ORDER BY id LIMIT $1 OFFSET $2", limit, offset)
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao buscar eventos: {e}")
+            raise e
+
+    @single_flight
+    async def get_events_by_organizer(self, organizer_id: int, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Busca eventos por organizador"""
+        try:
+            rows = await self._fetch(f"SELECT {self._select_columns(columns)} FROM events WHERE organizer_id = $1", organizer_id)
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao buscar eventos por organizador: {e}")
+            raise e
+
+    async def update_event(self, event_id: int, event_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Atualiza um evento"""
+        try:
+            return await self._update('events', event_id, event_data)
+        except Exception as e:
+            print(f"Erro ao atualizar evento: {e}")
+            raise e
+
+    async def delete_event(self, event_id: int) -> bool:
+        """Deleta um evento"""
+        try:
+            return await self._delete('events', event_id)
+        except Exception as e:
+            print(f"Erro ao deletar evento: {e}")
+            raise e
+
+    # Métodos para Ingressos
+    async def create_ticket(self, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cria um novo ingresso"""
+        try:
+            rows = await self._fetch_prepared(
+                'create_ticket',
+                ticket_data['event_id'],
+                ticket_data['user_id'],
+                ticket_data['price_paid'],
+                ticket_data['ticket_number'],
+                ticket_data['qr_code'],
+                ticket_data.get('status', 'active'),
+                ticket_data.get('purchased_at') or datetime.utcnow(),
+                timeout=self.write_timeout
+            )
+            return self._row_to_dict(rows[0]) if rows else None
+        except Exception as e:
+            print(f"Erro ao criar ingresso: {e}")
+            raise e
+
+    async def create_tickets(self, tickets_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cria vários ingressos num único INSERT em lote"""
+        try:
+            if not tickets_data:
+                return []
+            columns = self._quote_columns(tickets_data[0])
+            sql = f"""
+                INSERT INTO tickets ({columns})
+                SELECT {columns} FROM jsonb_populate_recordset(NULL::tickets, $1::jsonb)
+                RETURNING *
+            """
+            rows = await self._fetch(sql, tickets_data, timeout=self.write_timeout)
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao criar ingressos em lote: {e}")
+            raise e
+
+    async def create_tickets_within_capacity(self, event_id: int, tickets_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cria os ingressos num único INSERT só se couberem na capacidade do evento (lista vazia se esgotado)"""
+        try:
+            if not tickets_data:
+                return []
+            rows = await self._fetch(
+                "SELECT * FROM create_tickets_within_capacity($1, $2::jsonb)",
+                event_id, tickets_data, timeout=self.write_timeout
+            )
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao criar ingressos dentro da capacidade: {e}")
+            raise e
+
+    @single_flight
+    async def get_ticket(self, ticket_id: int) -> Optional[Dict[str, Any]]:
+        """Busca um ingresso por ID"""
+        try:
+            row = await self._fetchrow("SELECT * FROM tickets WHERE id = $1", ticket_id)
+            return self._row_to_dict(row)
+        except Exception as e:
+            print(f"Erro ao buscar ingresso: {e}")
+            raise e
+
+    @single_flight
+    async def get_tickets_by_user(self, user_id: int, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Busca ingressos por usuário (com `columns`, sem embutir o evento)"""
+        try:
+            if columns:
+                rows = await self._fetch(f"SELECT {self._select_columns(columns)} FROM tickets WHERE user_id = $1", user_id)
+            else:
+                rows = await self._fetch_prepared('get_tickets_by_user', user_id)
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao buscar ingressos por usuário: {e}")
+            raise e
+
+    @single_flight
+    async def get_tickets_by_event(self, event_id: int) -> List[Dict[str, Any]]:
+        """Busca ingressos por evento"""
+        try:
+            rows = await self._fetch("""
+                SELECT t.*, to_jsonb(u) AS users
+                FROM tickets t
+                LEFT JOIN users u ON u.id = t.user_id
+                WHERE t.event_id = $1
+            """, event_id)
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao buscar ingressos por evento: {e}")
+            raise e
+
+    async def get_tickets_by_event_page(self, event_id: int, limit: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Página de ingressos válidos (não cancelados) do evento, ordenada por id, com nome e email do comprador"""
+        try:
+            rows = await self._fetch("""
+                SELECT t.*, jsonb_build_object('name', u.name, 'email', u.email) AS users
+                FROM tickets t
+                LEFT JOIN users u ON u.id = t.user_id
+                WHERE t.event_id = $1
+                  AND t.status <> 'cancelled'
+                  AND ($3::integer IS NULL OR t.id > $3)
+                ORDER BY t.id
+                LIMIT $2
+            """, event_id, limit, after_id)
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao buscar página de ingressos do evento: {e}")
+            raise e
+
+    async def get_event_checkin_page(self, event_id: int, limit: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Página com id, QR code, status e uso dos ingressos válidos do evento, para o índice do check-in"""
+        try:
+            rows = await self._fetch("""
+                SELECT id, event_id, qr_code, status, used_at
+                FROM tickets
+                WHERE event_id = $1
+                  AND status <> 'cancelled'
+                  AND ($3::integer IS NULL OR id > $3)
+                ORDER BY id
+                LIMIT $2
+            """, event_id, limit, after_id)
+            return self._rows_to_list(rows)
+        except Exception as e:
+            print(f"Erro ao buscar ingressos para o check-in: {e}")
+            raise e
+
+    async def get_ticket_by_qr_code(self, qr_code: str) -> Optional[Dict[str, Any]]:
+        """Busca ingresso pelo QR code"""
+        try:
+            row = await self._fetchrow("SELECT id, event_id, qr_code, status, used_at FROM tickets WHERE qr_code = $1", qr_code)
+            return self._row_to_dict(row) if row else None
+        except Exception as e:
+            print(f"Erro ao buscar ingresso por QR code: {e}")
+            raise e
+
+    async def lease_worker_id(self) -> int:
+        """Worker id (0-1023) para o gerador de números de ingresso, distinto a cada chamada"""
+        try:
+            row = await self._fetchrow("SELECT lease_worker_id() AS worker_id", timeout=self.write_timeout)
+            return row['worker_id']
+        except Exception as e:
+            print(f"Erro ao obter worker id: {e}")
+            raise e
+
+    @staticmethod
+    def is_unique_violation(error: Exception) -> bool:
+        """Erro de chave duplicada (ticket_number/qr_code já gravados)"""
+        return isinstance(error, asyncpg.UniqueViolationError)
+
+    async def mark_tickets_used(self, ticket_ids: List[int], used_at: List[datetime]) -> List[int]:
+        """Marca vários ingressos como usados numa única chamada; retorna os ids que ainda estavam ativos"""
+        try:
+            rows = await self._fetch(
+                "SELECT ticket_id FROM mark_tickets_used($1::integer[], $2::timestamp[])",
+                list(ticket_ids), list(used_at), timeout=self.write_timeout
+            )
+            return [row['ticket_id'] for row in rows]
+        except Exception as e:
+            print(f"Erro ao marcar ingressos como usados: {e}")
+            raise e
+
+    async def update_ticket(self, ticket_id: int, ticket_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Atualiza um ingresso"""
+        try:
+            return await self._update('tickets', ticket_id, ticket_data)
+        except Exception as e:
+            print(f"Erro ao atualizar ingresso: {e}")
+            raise e
+
+    async def delete_ticket(self, ticket_id: int) -> bool:
+        """Deleta um ingresso"""
+        try:
+            return await self._delete('tickets', ticket_id)
+        except Exception as e:
+            print(f"Erro ao deletar ingresso: {e}")
+            raise e
+
+    # Métodos para Estatísticas
+    @single_flight
+    async def get_event_stats(self, event_id: int) -> Dict[str, Any]:
+        """Busca estatísticas de um evento com uma única consulta agregada no banco"""
+        try:
+            row = await self._fetchrow("SELECT * FROM event_ticket_stats($1)", event_id)
+            if row is None:
+                return {}
+
+            return build_event_stats(self._row_to_dict(row))
+        except Exception as e:
+            print(f"Erro ao buscar estatísticas do evento: {e}")
+            raise e
+
+    @single_flight
+    async def get_events_stats(self, event_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Busca estatísticas de vários eventos numa única consulta agrupada"""
+        try:
+            if not event_ids:
+                return {}
+            rows = await self._fetch("SELECT * FROM events_ticket_stats($1::integer[])", list(event_ids))
+            return {row['event_id']: build_event_stats(self._row_to_dict(row)) for row in rows}
+        except Exception as e:
+            print(f"Erro ao buscar estatísticas dos eventos: {e}")
+            raise e
+
+    # Métodos para Eventos Rock (Agregador)
+    @single_flight
+    async def get_rock_events(self, limit: int = 50, offset: int = 0, city: Optional[str] = None, cursor: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Busca eventos da tabela eventos_rock (agregador de eventos externos)
+
+        Com `cursor`, pagina por (data_formatada, id) a partir da última linha entregue
+        em vez de usar offset. Com `columns`, devolve só essas colunas.
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            city_pattern = f"%{city.strip().upper()}%" if city else None
+            if cursor:
+                last_date, last_id = decode_cursor(cursor, 2)
+                args = ('get_rock_events_after', now, city_pattern, limit, datetime.fromisoformat(last_date), uuid.UUID(last_id))
+            else:
+                args = ('get_rock_events', now, city_pattern, limit, offset)
+
+            if columns:
+                # Projeção: mesma query quente com outra lista de colunas (cacheada pelo asyncpg)
+                sql = HOT_QUERIES[args[0]].replace("SELECT *", f"SELECT {self._select_columns(columns)}", 1)
+                rows = await self._fetch(sql, *args[1:])
+            else:
+                rows = await self._fetch_prepared(*args)
+            events = self._rows_to_list(rows)
+            if columns is None:
+                # Só linhas completas alimentam o índice em memória
+                self.rock_index.add(events)
+            return events
+        except Exception as e:
+            print(f"Erro ao buscar eventos rock: {e}")
+            raise e
+
+    @single_flight
+    async def get_featured_rock_events(self, limit: int = 3) -> List[Dict[str, Any]]:
+        """Busca eventos em destaque da tabela eventos_rock ordenados por prioridade"""
+        try:
+            now = datetime.now(timezone.utc)
+            rows = await self._fetch("""
+                SELECT * FROM eventos_rock
+                WHERE data_formatada >= $1 AND prioridade IS NOT NULL
+                ORDER BY prioridade ASC, data_formatada ASC
+                LIMIT $2
+            """, now, limit)
+            events = self._rows_to_list(rows)
+            self.rock_index.add(events)
+            return events
+        except Exception as e:
+            print(f"Erro ao buscar eventos em destaque: {e}")
+            raise e
+
+    async def _fetch_rock_page(self, limit: int, cursor: Optional[str]) -> List[Dict[str, Any]]:
+        """Página de eventos futuros usada para aquecer o índice em memória"""
+        return await self.get_rock_events(limit, cursor=cursor)
+
+    @single_flight
+    async def get_rock_event_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        """Busca um evento da tabela eventos_rock pelo slug usando o índice em memória"""
+        try:
+            self.rock_index.ensure_fresh(self._fetch_rock_page)
+            event = self.rock_index.get(slug)
+            if event is None:
+                # Evento ainda não indexado: busca apenas a linha pedida
+                row = await self._fetchrow("SELECT * FROM eventos_rock WHERE slug = $1 LIMIT 1", slug)
+                event = self._row_to_dict(row)
+                if event:
+                    self.rock_index.add([event])
+            return event
+        except Exception as e:
+            print(f"Erro ao buscar evento rock por slug: {e}")
+            raise e
+
+    async def search_rock_events(self, query: str, limit: int = 50, offset: int = 0, city: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Busca textual sem acentos nos eventos_rock futuros (titulo, artistas, local, cidade e gêneros)"""
+        try:
+            await self.rock_index.ensure_loaded(self._fetch_rock_page)
+            return self.rock_index.search(query, limit, offset, city)
+        except Exception as e:
+            print(f"Erro ao buscar eventos rock por texto: {e}")
+            raise e
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+def parse_id_list(raw: str, max_ids: int = 100) -> List[int]:
+    """Converte '3,1,3,2' em [3, 1, 2] (sem repetições, na ordem pedida); lança ValueError se inválido"""
+    ids: List[int] = []
+    for part in raw.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            value = int(part)
+        except ValueError:
+            raise ValueError(f"ID inválido: {part}")
+        if value not in ids:
+            ids.append(value)
+    if not ids:
+        raise ValueError("Informe ao menos um ID")
+    if len(ids) > max_ids:
+        raise ValueError(f"Máximo de {max_ids} IDs por requisição")
+    return ids
+
+class BatchLoader:
+    """
+    Agrupador no estilo dataloader.
+
+    Chamadas a load(key) feitas no mesmo ciclo do event loop são acumuladas
+    e resolvidas por uma única chamada a batch_fn(keys), que devolve um
+    dicionário chave -> valor. Chaves repetidas no mesmo ciclo compartilham
+    o mesmo resultado; chaves ausentes no dicionário resolvem para None.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]], max_batch_size: int = 100):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._scheduled = False
+
+        self.loads = 0
+        self.batches = 0
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        self.loads += 1
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if not self._scheduled:
+                # Despacha no fim do ciclo atual, depois que as demais corrotinas já pediram suas chaves
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        return await asyncio.shield(future)
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        items = list(pending.items())
+        for start in range(0, len(items), self.max_batch_size):
+            asyncio.ensure_future(self._run_batch(dict(items[start:start + self.max_batch_size])))
+
+    async def _run_batch(self, batch: Dict[Hashable, asyncio.Future]):
+        self.batches += 1
+        try:
+            results = await self.batch_fn(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "loads": self.loads,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+        }
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos backends de dados (PostgREST x asyncpg) contra um PostgreSQL local
+
+Mede p50/p99 das queries quentes: get_event, get_rock_events,
+get_tickets_by_user e create_ticket, e das escritas genéricas
+create_user e update_event (jsonb_populate_record). Antes de medir,
+confere em cada backend que create_user, update_event e create_tickets
+(jsonb_populate_recordset) gravam os valores enviados, e que
+create_tickets_within_capacity não grava nada num evento sem capacidade.
+
+As leituras passam por cima do agrupamento dos clientes: chamadas
+idênticas simultâneas seriam atendidas por uma única consulta
+(@single_flight) e get_event agruparia os ids num só SELECT (BatchLoader),
+e o benchmark mediria o agrupamento em vez dos backends. Cada chamada usa
+o método sem o decorador (__wrapped__), e get_event é medido pela consulta
+de um id que o BatchLoader faria (get_events_by_ids).
+
+Pré-requisitos:
+  - DATABASE_URL apontando para o PostgreSQL local (ex: docker-compose, serviço db)
+  - Um PostgREST servindo o mesmo banco, por exemplo:
+        docker run --rm --network host \\
+            -e PGRST_DB_URI=$DATABASE_URL -e PGRST_DB_ANON_ROLE=postgres \\
+            -e PGRST_SERVER_PORT=3002 postgrest/postgrest
+    com SUPABASE_REST_URL=http://localhost:3002 e SUPABASE_URL/SUPABASE_KEY
+    com qualquer valor
+
+Uso:
+    python benchmarks/bench_db_backends.py --seed --iterations 1000 --concurrency 20
+"""
+
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import functools
+import statistics
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Adicionar o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+from supabase_client import SupabaseClient
+from asyncpg_client import AsyncpgClient
+
+BENCH_PREFIX = "BENCH"
+
+async def seed_data(client: AsyncpgClient) -> dict:
+    """Cria usuário, evento e ingressos de teste e retorna os ids"""
+    pool = await client._get_pool()
+    suffix = uuid.uuid4().hex[:8]
+    user_id = await pool.fetchval(
+        "INSERT INTO users (email, name, provider) VALUES ($1, $2, 'email') RETURNING id",
+        f"bench-{suffix}@ticketmetal.com", "Benchmark"
+    )
+    event_date = datetime.utcnow() + timedelta(days=30)
+    event_id = await pool.fetchval("""
+        INSERT INTO events (title, description, date, location, address, city, state,
+                            max_tickets, price, sales_end_date, organizer_id)
+        VALUES ('Benchmark Fest', 'Evento de benchmark', $1, 'Arena', 'Rua 1', 'São Paulo', 'SP',
+                20000, 150.00, $1, $2)
+        RETURNING id
+    """, event_date, user_id)
+    for i in range(20):
+        await pool.execute("""
+            INSERT INTO tickets (event_id, user_id, price_paid, ticket_number, qr_code, status)
+            VALUES ($1, $2, 150.00, $3, $3, 'active')
+        """, event_id, user_id, f"{BENCH_PREFIX}{suffix}{i:04d}")
+    return {'user_id': user_id, 'event_id': event_id}
+
+async def cleanup_data(client: AsyncpgClient, ids: dict):
+    pool = await client._get_pool()
+    await pool.execute(f"DELETE FROM tickets WHERE ticket_number LIKE '{BENCH_PREFIX}%'")
+    await pool.execute("DELETE FROM events WHERE id = $1", ids['event_id'])
+    await pool.execute("DELETE FROM users WHERE id = $1", ids['user_id'])
+    await pool.execute(f"DELETE FROM users WHERE email LIKE '{BENCH_PREFIX.lower()}-user-%'")
+
+async def verify_generic_writes(client, ids: dict):
+    """INSERT/UPDATE genéricos gravam os valores enviados (tipos convertidos pelo banco)"""
+    email = f"{BENCH_PREFIX.lower()}-user-{uuid.uuid4().hex[:12]}@ticketmetal.com"
+    user = await client.create_user({'email': email, 'name': 'Benchmark', 'provider': 'email'})
+    assert user and user['email'] == email, f"create_user retornou {user!r}"
+
+    sales_end = datetime.utcnow() + timedelta(days=10)
+    event = await client.update_event(ids['event_id'], {'price': 175.5, 'max_tickets': 19999, 'sales_end_date': sales_end})
+    assert event and float(event['price']) == 175.5 and event['max_tickets'] == 19999, f"update_event retornou {event!r}"
+
+    numbers = [f"{BENCH_PREFIX}{uuid.uuid4().hex[:12].upper()}" for _ in range(3)]
+    tickets = await client.create_tickets([
+        {
+            'event_id': ids['event_id'],
+            'user_id': ids['user_id'],
+            'price_paid': 150.0,
+            'ticket_number': number,
+            'qr_code': f"TICKETMETAL:{number}",
+            'status': 'active',
+            'purchased_at': datetime.utcnow()
+        }
+        for number in numbers
+    ])
+    assert sorted(ticket['ticket_number'] for ticket in tickets) == sorted(numbers), f"create_tickets retornou {tickets!r}"
+
+    number = f"{BENCH_PREFIX}{uuid.uuid4().hex[:12].upper()}"
+    ticket = {**tickets[0], 'ticket_number': number, 'qr_code': f"TICKETMETAL:{number}"}
+    ticket.pop('id', None)
+    await client.update_event(ids['event_id'], {'max_tickets': 0})
+    try:
+        refused = await client.create_tickets_within_capacity(ids['event_id'], [ticket])
+    finally:
+        await client.update_event(ids['event_id'], {'max_tickets': 19999})
+    assert refused == [], f"create_tickets_within_capacity gravou além da capacidade: {refused!r}"
+    created = await client.create_tickets_within_capacity(ids['event_id'], [ticket])
+    assert [row['ticket_number'] for row in created] == [number], f"create_tickets_within_capacity retornou {created!r}"
+
+async def measure(operation, iterations: int, concurrency: int) -> list:
+    """Executa a operação N vezes com concorrência limitada e devolve as latências em ms"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def run_once(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await operation(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(run_once(i) for i in range(iterations)))
+    return latencies
+
+def percentiles(latencies: list) -> tuple:
+    cuts = statistics.quantiles(latencies, n=100)
+    return cuts[49], cuts[98]
+
+def uncoalesced(client, name: str):
+    """Método do cliente sem @single_flight: chamadas idênticas simultâneas vão todas ao banco"""
+    return functools.partial(getattr(type(client), name).__wrapped__, client)
+
+def hot_operations(client, ids: dict) -> dict:
+    def create_ticket(i: int):
+        number = f"{BENCH_PREFIX}{uuid.uuid4().hex[:12].upper()}"
+        return client.create_ticket({
+            'event_id': ids['event_id'],
+            'user_id': ids['user_id'],
+            'price_paid': 150.0,
+            'ticket_number': number,
+            'qr_code': f"TICKETMETAL:{number}",
+            'status': 'active',
+            'purchased_at': datetime.utcnow()
+        })
+
+    get_events_by_ids = uncoalesced(client, 'get_events_by_ids')
+    get_rock_events = uncoalesced(client, 'get_rock_events')
+    get_tickets_by_user = uncoalesced(client, 'get_tickets_by_user')
+
+    def create_user(i: int):
+        return client.create_user({
+            'email': f"{BENCH_PREFIX.lower()}-user-{uuid.uuid4().hex[:12]}@ticketmetal.com",
+            'name': 'Benchmark',
+            'provider': 'email'
+        })
+
+    return {
+        'get_event': lambda i: get_events_by_ids([ids['event_id']]),
+        'get_rock_events': lambda i: get_rock_events(50, 0),
+        'get_tickets_by_user': lambda i: get_tickets_by_user(ids['user_id']),
+        'create_ticket': create_ticket,
+        'create_user': create_user,
+        'update_event': lambda i: client.update_event(ids['event_id'], {'price': 150.0 + i % 10}),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark PostgREST x asyncpg")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--event-id", type=int)
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--seed", action="store_true", help="Cria dados de teste e remove ao final")
+    args = parser.parse_args()
+
+    asyncpg_client = AsyncpgClient()
+    postgrest_client = SupabaseClient()
+
+    if args.seed:
+        ids = await seed_data(asyncpg_client)
+    elif args.event_id and args.user_id:
+        ids = {'event_id': args.event_id, 'user_id': args.user_id}
+    else:
+        parser.error("Informe --seed ou --event-id e --user-id")
+
+    print("🎫 TicketMetal - Benchmark de backends de dados")
+    print(f"   {args.iterations} chamadas por query, concorrência {args.concurrency}")
+    print("=" * 64)
+    print(f"{'query':<22}{'backend':<12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+
+    try:
+        for client in (postgrest_client, asyncpg_client):
+            await verify_generic_writes(client, ids)
+        print("✅ Escritas genéricas conferidas nos dois backends")
+
+        for name in ('get_event', 'get_rock_events', 'get_tickets_by_user', 'create_ticket', 'create_user', 'update_event'):
+            for label, client in (('postgrest', postgrest_client), ('asyncpg', asyncpg_client)):
+                operation = hot_operations(client, ids)[name]
+                # Aquecimento do pool e dos prepared statements
+                await measure(operation, min(20, args.iterations), args.concurrency)
+                latencies = await measure(operation, args.iterations, args.concurrency)
+                p50, p99 = percentiles(latencies)
+                print(f"{name:<22}{label:<12}{p50:>12.2f}{p99:>12.2f}")
+    finally:
+        if args.seed:
+            await cleanup_data(asyncpg_client, ids)
+        await postgrest_client.aclose()
+        await asyncpg_client.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
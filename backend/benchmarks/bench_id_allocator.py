@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark do gerador de IDs de ingressos (IdAllocator)
+
+Mede IDs por segundo gerados um a um (next_id), em lote (next_ids) e os
+números de ingresso com os tokens de QR assinados gerados na compra
+(next_ids + QrSigner.sign), e verifica que não há repetição
+nem quebra de ordem, inclusive com várias threads e vários "workers"
+(geradores com worker ids distintos).
+
+Uso:
+    python benchmarks/bench_id_allocator.py --count 2000000
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+# Adicionar o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from id_allocator import IdAllocator, encode_base32
+from qr_signing import QrSigner
+
+def rate(count: int, elapsed: float) -> str:
+    return f"{count / elapsed:>14,.0f} IDs/s"
+
+def bench_single(allocator: IdAllocator, count: int) -> list:
+    started = time.perf_counter()
+    ids = [allocator.next_id() for _ in range(count)]
+    print(f"   next_id (um a um)        {rate(count, time.perf_counter() - started)}")
+    return ids
+
+def bench_batch(allocator: IdAllocator, count: int, batch: int) -> list:
+    started = time.perf_counter()
+    ids = []
+    for _ in range(count // batch):
+        ids.extend(allocator.next_ids(batch))
+    print(f"   next_ids (lotes de {batch:<5}) {rate(len(ids), time.perf_counter() - started)}")
+    return ids
+
+def bench_identities(allocator: IdAllocator, count: int) -> list:
+    """Número do ingresso e token do QR, como em insert_hold_tickets"""
+    signer = QrSigner("benchmark")
+    expires_at = int(time.time()) + 86400
+    started = time.perf_counter()
+    identities = [
+        (f"TM{encode_base32(ticket_id)}", signer.sign(ticket_id, 1, expires_at))
+        for ticket_id in allocator.next_ids(count)
+    ]
+    print(f"   número + QR assinado     {rate(count, time.perf_counter() - started)}")
+    return identities
+
+def bench_threads(allocator: IdAllocator, count: int, threads: int) -> list:
+    results = [[] for _ in range(threads)]
+
+    def worker(index: int):
+        results[index] = allocator.next_ids(count // threads)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    ids = [value for chunk in results for value in chunk]
+    print(f"   {threads} threads, mesmo gerador  {rate(len(ids), time.perf_counter() - started)}")
+    return ids
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do IdAllocator")
+    parser.add_argument("--count", type=int, default=2_000_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=8, help="Geradores com worker ids distintos")
+    args = parser.parse_args()
+
+    print("🎫 TicketMetal - Benchmark do gerador de IDs")
+    print(f"   {args.count:,} IDs por cenário")
+    print("=" * 64)
+
+    ok = True
+    allocator = IdAllocator(worker_id=1)
+
+    single = bench_single(allocator, args.count)
+    if single != sorted(single) or len(set(single)) != len(single):
+        print("❌ next_id gerou IDs repetidos ou fora de ordem")
+        ok = False
+
+    batched = bench_batch(allocator, args.count, args.batch)
+    if batched != sorted(batched) or len(set(batched)) != len(batched) or batched[0] <= single[-1]:
+        print("❌ next_ids gerou IDs repetidos ou fora de ordem")
+        ok = False
+
+    identities = bench_identities(allocator, min(args.count, 200_000))
+    if len({number for number, _ in identities}) != len(identities) or len({token for _, token in identities}) != len(identities):
+        print("❌ Números de ingresso ou tokens de QR repetidos")
+        ok = False
+
+    threaded = bench_threads(allocator, args.count, args.threads)
+    if len(set(threaded)) != len(threaded):
+        print("❌ IDs repetidos entre threads")
+        ok = False
+
+    # Vários workers gerando no mesmo instante (simula processos/instâncias)
+    generators = [IdAllocator(worker_id=worker_id) for worker_id in range(args.workers)]
+    started = time.perf_counter()
+    across = [value for generator in generators for value in generator.next_ids(args.count // args.workers)]
+    print(f"   {args.workers} workers distintos       {rate(len(across), time.perf_counter() - started)}")
+    if len(set(across)) != len(across):
+        print("❌ IDs repetidos entre workers")
+        ok = False
+
+    print("=" * 64)
+    print(f"   exemplo: {identities[-1][0]} / {identities[-1][1]}")
+    if ok:
+        print("✅ Nenhuma colisão e IDs ordenados por worker")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark do processamento das imagens enviadas
+
+Compara, numa foto sintética do tamanho de uma câmera, o processamento
+antigo (GCPStorageService._resize_image: decodificação completa e uma única
+variante 1200x800 em JPEG) com _process_image do pool de imagens (draft
+do JPEG e variantes hero, card e thumbnail em JPEG e WebP a partir de uma
+única decodificação). Mostra p50 por imagem e o tamanho de cada variante.
+
+Uso:
+    python benchmarks/bench_image_variants.py --iterations 20 --width 4000 --height 3000
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Adicionar o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from image_pool import _process_image
+
+def legacy_resize(image_data: bytes, max_width: int = 1200, max_height: int = 800) -> bytes:
+    """Cópia do GCPStorageService._resize_image anterior, sem depender das credenciais do GCP"""
+    image = Image.open(io.BytesIO(image_data))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGB')
+    width, height = image.size
+    if width > max_width or height > max_height:
+        ratio = min(max_width / width, max_height / height)
+        image = image.resize((int(width * ratio), int(height * ratio)), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=85, optimize=True)
+    return output.getvalue()
+
+def measure(fn, data: bytes, iterations: int) -> float:
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(data)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do processamento de imagens do upload")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    args = parser.parse_args()
+
+    photo = Image.effect_mandelbrot((args.width, args.height), (-2.2, -1.2, 1.0, 1.2), 100).convert('RGB')
+    buffer = io.BytesIO()
+    photo.save(buffer, format='JPEG', quality=92)
+    data = buffer.getvalue()
+
+    print("🖼️  TicketMetal - Benchmark do processamento de imagens")
+    print(f"   foto {args.width}x{args.height} ({len(data) / 1024:.0f} KB), {args.iterations} iterações")
+    print("=" * 64)
+
+    legacy_ms = measure(legacy_resize, data, args.iterations)
+    variants_ms = measure(_process_image, data, args.iterations)
+    print(f"   {'antigo (1 JPEG)':<28}{legacy_ms:>10.1f} ms")
+    print(f"   {'variantes (3 x JPEG+WebP)':<28}{variants_ms:>10.1f} ms")
+
+    print("-" * 64)
+    for name, variant in _process_image(data).items():
+        print(f"   {name:<12}{variant['width']:>5}x{variant['height']:<5}"
+              f"jpeg {len(variant['jpeg']) / 1024:>7.1f} KB   webp {len(variant['webp']) / 1024:>7.1f} KB")
+    print("=" * 64)
+    print(f"   variantes em {variants_ms / legacy_ms:.2f}x o tempo do processamento antigo")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark da renderização do PDF do ingresso
+
+Compara, no mesmo processo, o modo story (create_ticket_pdf: documento
+platypus montado do zero a cada ingresso) com o modo template
+(create_ticket_pdf_fast: layout do evento compilado uma vez e só os campos
+do ingresso desenhados por cima), com o QR Code em PNG e vetorial. Mostra p50/p99 por ingresso, o tamanho
+médio do PDF e quanto do tempo é só a geração do QR code; com --output grava
+um exemplo de cada modo para conferência visual.
+
+Uso:
+    python benchmarks/bench_ticket_pdf.py --iterations 300 --output /tmp
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime
+
+# Adicionar o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab import rl_config
+from ticket_generator import TicketGenerator
+
+# Mesma configuração dos processos do pool de PDFs (pdf_pool._init_worker)
+rl_config.useA85 = 0
+
+EVENT = {
+    'id': 1,
+    'title': 'Sepultura - Celebrating Life Through Death Tour',
+    'date': datetime(2025, 11, 22, 20, 0),
+    'location': 'Espaço Unimed',
+    'address': 'Rua Tagipuru, 795 - Barra Funda',
+    'city': 'São Paulo',
+    'state': 'SP',
+}
+
+def make_ticket(i: int) -> dict:
+    return {
+        'ticket_number': f"TM0A8E2QERG{i:04d}",
+        'qr_code': f"0A8E2QERG{i:04d}K3M9QZ7W",
+        'price_paid': 180.0,
+        'purchased_at': datetime(2025, 9, 1, 14, 30),
+        'buyer_name': f"Comprador {i}",
+    }
+
+def measure(render, iterations: int) -> tuple:
+    latencies = []
+    sizes = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        pdf = render(make_ticket(i), EVENT)
+        latencies.append((time.perf_counter() - started) * 1000)
+        sizes.append(len(pdf))
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return p50, p99, statistics.mean(sizes)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos modos de renderização do PDF do ingresso")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--output", help="Diretório para gravar um PDF de exemplo de cada modo")
+    args = parser.parse_args()
+
+    generator = TicketGenerator()
+    png_generator = TicketGenerator(qr_mode='png')
+    modes = (
+        ('story', generator.create_ticket_pdf),
+        ('template', png_generator.create_ticket_pdf_fast),
+        ('vector', generator.create_ticket_pdf_fast),
+    )
+
+    print("🎫 TicketMetal - Benchmark do PDF do ingresso")
+    print(f"   {args.iterations} ingressos por modo")
+    print("=" * 64)
+    print(f"{'modo':<12}{'p50 (ms)':>12}{'p99 (ms)':>12}{'tamanho (KB)':>16}")
+
+    results = {}
+    for name, render in modes:
+        # Aquecimento: fontes, imports e (no modo template) a compilação do layout
+        measure(render, 5)
+        p50, p99, size = measure(render, args.iterations)
+        results[name] = p50
+        print(f"{name:<12}{p50:>12.2f}{p99:>12.2f}{size / 1024:>16.1f}")
+
+        if args.output:
+            path = os.path.join(args.output, f"ticket_{name}.pdf")
+            with open(path, 'wb') as f:
+                f.write(render(make_ticket(0), EVENT))
+
+    # Parte do tempo que é só do QR code (PNG gerado e decodificado de novo pelo ReportLab)
+    qr_payload = generator.qr_payload(make_ticket(0))
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        generator.generate_qr_code(qr_payload)
+    qr_ms = (time.perf_counter() - started) * 1000 / args.iterations
+    print(f"{'qr (png)':<12}{qr_ms:>12.2f}")
+
+    print("=" * 64)
+    print(f"   template é {results['story'] / results['template']:.1f}x mais rápido (p50)")
+    print(f"   template com QR vetorial é {results['story'] / results['vector']:.1f}x mais rápido (p50)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do check-in na entrada (CheckinService)
+
+Simula a abertura dos portões: vários leitores (dispositivos) lendo ao
+mesmo tempo os QR codes de milhares de fãs. Parte dos fãs passa o
+ingresso duas vezes em leitores diferentes ao mesmo tempo, parte compra o
+ingresso depois da carga do índice e há leituras de QR codes falsos. O
+banco é simulado com latência e falhas aleatórias na gravação dos lotes;
+uma leitura que falha volta para a fila, como o leitor lendo de novo. Os
+leitores se dividem entre --instances instâncias com índices próprios e o
+mesmo banco, então a segunda leitura de um ingresso pode cair numa
+instância que ainda o tem como ativo: só a gravação condicional impede
+que ele entre duas vezes.
+
+Mostra a latência por leitura (p50/p99, em microssegundos) separando os
+ingressos que estavam no índice dos que exigiram busca no banco, leituras por
+segundo e quantos lotes foram gravados. Ao final verifica que cada ingresso
+foi aceito exatamente uma vez, que nenhum QR falso passou e que o banco
+ficou com exatamente os ingressos aceitos marcados como usados.
+
+Uso:
+    python benchmarks/load_checkin.py --fans 5000 --devices 40
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+# Adicionar o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkin import CheckinService, VALID, ALREADY_USED, INVALID
+from id_allocator import IdAllocator
+from qr_signing import QrSigner
+
+EVENT_ID = 1
+
+async def run(args) -> bool:
+    allocator = IdAllocator(worker_id=1)
+    signer = QrSigner("load-test")
+    expires_at = int(time.time()) + 86400
+
+    def signed_tokens(count: int) -> list:
+        """Tokens de QR como os da compra (ID local assinado)"""
+        return [signer.sign(snowflake, EVENT_ID, expires_at) for snowflake in allocator.next_ids(count)]
+
+    tickets = {}
+    for ticket_id, token in enumerate(signed_tokens(args.fans), start=1):
+        tickets[ticket_id] = {'id': ticket_id, 'event_id': EVENT_ID, 'qr_code': f"TICKETMETAL:{token}", 'status': 'active', 'used_at': None}
+    by_qr = {ticket['qr_code']: ticket for ticket in tickets.values()}
+    db_calls = {'pages': 0, 'lookups': 0, 'commits': 0}
+
+    async def load_page(event_id, limit, after_id):
+        db_calls['pages'] += 1
+        await asyncio.sleep(0.02)
+        rows = [dict(t) for t in tickets.values() if t['event_id'] == event_id and t['status'] != 'cancelled' and (after_id is None or t['id'] > after_id)]
+        return rows[:limit]
+
+    async def lookup(token):
+        db_calls['lookups'] += 1
+        await asyncio.sleep(random.uniform(0.005, 0.02))
+        ticket = by_qr.get(f"TICKETMETAL:{token}")
+        return dict(ticket) if ticket else None
+
+    async def commit(ticket_ids, used_at):
+        db_calls['commits'] += 1
+        # Latência do UPDATE em lote e falhas ocasionais do banco
+        await asyncio.sleep(random.uniform(0.005, 0.03))
+        if random.random() < args.failure_rate:
+            raise RuntimeError("falha simulada ao gravar lote")
+        updated = []
+        for ticket_id, moment in zip(ticket_ids, used_at):
+            if tickets[ticket_id]['status'] == 'active':
+                tickets[ticket_id]['status'] = 'used'
+                tickets[ticket_id]['used_at'] = moment
+                updated.append(ticket_id)
+        return updated
+
+    services = [
+        CheckinService(load_page, lookup, commit, batch_size=args.batch_size, flush_interval=args.flush_interval)
+        for _ in range(args.instances)
+    ]
+    for service in services:
+        await service.preload(EVENT_ID)
+
+    # Ingressos vendidos depois da carga do índice (aparecem só no banco)
+    late = int(args.fans * args.late_rate)
+    for ticket_id, token in enumerate(signed_tokens(late), start=args.fans + 1):
+        tickets[ticket_id] = {'id': ticket_id, 'event_id': EVENT_ID, 'qr_code': f"TICKETMETAL:{token}", 'status': 'active', 'used_at': None}
+        by_qr[tickets[ticket_id]['qr_code']] = tickets[ticket_id]
+
+    # Fila de leituras: cada fã uma vez, alguns duas, mais QR codes falsos
+    scans = []
+    for ticket in tickets.values():
+        payload = f"TICKETMETAL:{ticket['qr_code']}"
+        scans.append(('fan', ticket['id'], payload))
+        if random.random() < args.duplicate_rate:
+            scans.append(('fan', ticket['id'], payload))
+    fakes = int(args.fans * args.fake_rate)
+    scans.extend(('fake', None, f"TICKETMETAL:FAKE{i:08d}") for i in range(fakes))
+    random.shuffle(scans)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for scan in scans:
+        queue.put_nowait(scan)
+
+    latencies = {'índice': [], 'busca no banco': []}
+    accepted = {}
+    outcomes = {}
+    fakes_accepted = 0
+    failed_scans = 0
+
+    async def device(service: CheckinService):
+        nonlocal fakes_accepted, failed_scans
+        while not queue.empty():
+            kind, ticket_id, payload = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                result = await service.scan(EVENT_ID, payload)
+            except RuntimeError:
+                # Gravação falhou: o leitor lê o mesmo QR de novo
+                failed_scans += 1
+                queue.put_nowait((kind, ticket_id, payload))
+                continue
+            indexed = ticket_id is not None and ticket_id <= args.fans
+            latencies['índice' if indexed else 'busca no banco'].append((time.perf_counter() - started) * 1_000_000)
+            outcomes[result['result']] = outcomes.get(result['result'], 0) + 1
+            if result['result'] == VALID:
+                if kind == 'fake':
+                    fakes_accepted += 1
+                else:
+                    accepted[ticket_id] = accepted.get(ticket_id, 0) + 1
+            # Tempo do leitor até a próxima pessoa
+            await asyncio.sleep(random.uniform(0, args.think_time))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(device(services[i % len(services)]) for i in range(args.devices)))
+    elapsed = time.perf_counter() - started
+    for service in services:
+        await service.flush()
+
+    used_in_db = {ticket_id for ticket_id, ticket in tickets.items() if ticket['status'] == 'used'}
+
+    print("🎫 TicketMetal - Carga do check-in")
+    print(f"   {len(tickets)} ingressos ({late} vendidos após a carga), {len(scans)} leituras, {args.devices} leitores em {args.instances} instâncias")
+    print("=" * 64)
+    for name, count in sorted(outcomes.items()):
+        print(f"   {name:<16}{count:>10}")
+    for name, values in latencies.items():
+        values.sort()
+        p50 = statistics.median(values)
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        print(f"   latência ({name}) p50: {p50:.1f} µs   p99: {p99:.1f} µs")
+    print(f"   {len(scans) / elapsed:,.0f} leituras/s em {elapsed:.2f}s")
+    print(f"   banco: {db_calls['pages']} páginas, {db_calls['lookups']} buscas, {db_calls['commits']} gravações, {failed_scans} leituras repetidas após falha")
+    for number, service in enumerate(services, start=1):
+        print(f"   métricas ({number}): {service.stats()}")
+
+    ok = True
+    double = [ticket_id for ticket_id, count in accepted.items() if count > 1]
+    if double:
+        print(f"❌ {len(double)} ingressos aceitos mais de uma vez")
+        ok = False
+    if len(accepted) != len(tickets):
+        print(f"❌ {len(tickets) - len(accepted)} ingressos válidos recusados")
+        ok = False
+    if fakes_accepted:
+        print(f"❌ {fakes_accepted} QR codes falsos aceitos")
+        ok = False
+    if outcomes.get(INVALID, 0) != fakes or outcomes.get(ALREADY_USED, 0) != len(scans) - len(tickets) - fakes:
+        print("❌ Contagem de recusas diferente do esperado")
+        ok = False
+    if used_in_db != set(accepted):
+        print(f"❌ Banco com {len(used_in_db)} ingressos usados, {len(accepted)} aceitos na entrada")
+        ok = False
+    if ok:
+        print("✅ Cada ingresso aceito uma única vez e banco consistente")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do CheckinService")
+    parser.add_argument("--fans", type=int, default=5000)
+    parser.add_argument("--devices", type=int, default=40, help="Leitores lendo ao mesmo tempo")
+    parser.add_argument("--instances", type=int, default=2, help="Instâncias da API, cada uma com seu índice")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="Fração dos fãs que passa o ingresso duas vezes")
+    parser.add_argument("--late-rate", type=float, default=0.02, help="Fração de ingressos vendidos após a carga do índice")
+    parser.add_argument("--fake-rate", type=float, default=0.01)
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Fração das gravações em lote que falham")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    parser.add_argument("--think-time", type=float, default=0.002, help="Intervalo máximo entre leituras de um leitor (s)")
+    args = parser.parse_args()
+
+    ok = asyncio.run(run(args))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
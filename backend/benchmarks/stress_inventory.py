@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Teste de estresse do estoque de ingressos em memória (InventoryEngine)
+
+Simula uma abertura de vendas: milhares de checkouts simultâneos disputando
+poucos ingressos de um mesmo evento. Cada checkout reserva, espera o
+"pagamento" e então confirma, desiste ou abandona (deixa a reserva vencer).
+A gravação no banco é simulada com latência e falhas aleatórias.
+
+Ao final verifica que nenhum ingresso foi vendido além de max_tickets e que
+o estoque em memória bate com os ingressos efetivamente gravados.
+
+Uso:
+    python benchmarks/stress_inventory.py --checkouts 20000 --capacity 500
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+# Adicionar o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory import InventoryEngine, SoldOutError, HoldNotFoundError
+
+EVENT_ID = 1
+
+async def run(args) -> bool:
+    committed = []
+
+    async def seed(event_id: int):
+        # Recargas (após falha de gravação) leem os ingressos já gravados
+        await asyncio.sleep(0.005)
+        return args.capacity, len(committed)
+
+    async def commit(hold):
+        # Latência do INSERT e falhas ocasionais do banco
+        await asyncio.sleep(random.uniform(0.001, 0.01))
+        if random.random() < args.failure_rate:
+            raise RuntimeError("falha simulada ao gravar ingresso")
+        committed.extend([hold.hold_id] * hold.quantity)
+        return hold.quantity
+
+    engine = InventoryEngine(seed, hold_ttl=args.hold_ttl, max_quantity=4)
+    outcomes = {'confirmed': 0, 'released': 0, 'abandoned': 0, 'sold_out': 0, 'commit_failed': 0, 'expired': 0}
+
+    async def checkout(i: int):
+        quantity = random.choice((1, 1, 1, 2, 4))
+        try:
+            hold = await engine.hold(EVENT_ID, quantity, user_id=i)
+        except SoldOutError:
+            outcomes['sold_out'] += 1
+            return
+
+        # Tempo do pagamento: alguns passam do prazo da reserva
+        await asyncio.sleep(random.uniform(0, args.hold_ttl * 1.2))
+        action = random.random()
+        if action < args.confirm_rate:
+            try:
+                await engine.confirm(hold.hold_id, commit)
+                outcomes['confirmed'] += 1
+            except HoldNotFoundError:
+                outcomes['expired'] += 1
+            except RuntimeError:
+                outcomes['commit_failed'] += 1
+                engine.release(hold.hold_id)
+        elif action < args.confirm_rate + (1 - args.confirm_rate) / 2:
+            engine.release(hold.hold_id)
+            outcomes['released'] += 1
+        else:
+            outcomes['abandoned'] += 1
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(i: int):
+        async with semaphore:
+            await checkout(i)
+
+    await asyncio.gather(*(limited(i) for i in range(args.checkouts)))
+    elapsed = time.perf_counter() - started
+
+    # Espera as reservas abandonadas vencerem
+    await asyncio.sleep(args.hold_ttl)
+    availability = await engine.availability(EVENT_ID)
+    sold = len(committed)
+
+    print("🎫 TicketMetal - Estresse do estoque de ingressos")
+    print(f"   {args.checkouts} checkouts, concorrência {args.concurrency}, capacidade {args.capacity}")
+    print("=" * 64)
+    for name, count in outcomes.items():
+        print(f"   {name:<16}{count:>10}")
+    print(f"   ingressos gravados: {sold} de {args.capacity}")
+    print(f"   estoque em memória: {availability}")
+    print(f"   {args.checkouts / elapsed:,.0f} checkouts/s em {elapsed:.2f}s")
+    print(f"   métricas: {engine.stats()}")
+
+    ok = True
+    if sold > args.capacity:
+        print(f"❌ Overselling: {sold} ingressos para {args.capacity} lugares")
+        ok = False
+    if availability['sold'] != sold:
+        print(f"❌ Estoque em memória ({availability['sold']}) diferente do gravado ({sold})")
+        ok = False
+    if availability['held'] != 0:
+        print(f"❌ Reservas presas após o fim: {availability['held']}")
+        ok = False
+    if ok:
+        print("✅ Sem overselling e estoque consistente")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de estresse do InventoryEngine")
+    parser.add_argument("--checkouts", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=5000)
+    parser.add_argument("--capacity", type=int, default=500)
+    parser.add_argument("--hold-ttl", type=float, default=1.0, help="Prazo da reserva em segundos")
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--confirm-rate", type=float, default=0.8, help="Fração dos checkouts que pagam")
+    args = parser.parse_args()
+
+    ok = asyncio.run(run(args))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class CacheEntry:
+    __slots__ = ('value', 'size', 'stored_at')
+
+    def __init__(self, value: Any, size: int, stored_at: float):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+class TTLCache:
+    """
+    Cache read-through em memória com TTL, limite de memória (LRU) e
+    stale-while-revalidate.
+
+    - Entradas com idade < ttl são servidas direto (hit)
+    - Entradas com idade < ttl + stale_ttl são servidas imediatamente e
+      recarregadas em segundo plano (stale hit)
+    - Entradas mais antigas, ou ausentes, são carregadas na hora (miss);
+      chamadas concorrentes para a mesma chave aguardam a mesma carga
+    - invalidate() também desliga as cargas em andamento da chave: elas
+      ainda respondem a quem já esperava por elas, mas não gravam no cache
+      (o valor pode ter sido lido antes da alteração que motivou a
+      invalidação), e a próxima chamada começa uma carga nova
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0, max_bytes: int = 32 * 1024 * 1024):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Task] = {}
+        self._current_bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.errors = 0
+        self.discarded_loads = 0
+
+    def _estimate_size(self, value: Any) -> int:
+        """Tamanho aproximado da entrada, medido pelo JSON serializado (ou em bytes, para arquivos)"""
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        return len(json.dumps(value, default=str))
+
+    def _store(self, key: Hashable, value: Any):
+        self._discard(key)
+        entry = CacheEntry(value, self._estimate_size(value), time.monotonic())
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._current_bytes += entry.size
+        # Remove as entradas menos usadas até caber no limite de memória
+        while self._current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._current_bytes -= evicted.size
+            self.evictions += 1
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._current_bytes -= entry.size
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            # Carga desligada por invalidate(): a chave pode já ter outra carga em andamento
+            current = self._loading.get(key) is task
+            if current:
+                del self._loading[key]
+        if current:
+            self._store(key, value)
+        else:
+            self.discarded_loads += 1
+        return value
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._loading[key] = task
+        return task
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        if key in self._loading:
+            return
+        self.refreshes += 1
+        task = self._start_load(key, loader)
+
+        def log_failure(done: asyncio.Task):
+            if not done.cancelled() and done.exception() is not None:
+                print(f"Erro ao revalidar cache {self.name} ({key}): {done.exception()}")
+
+        task.add_done_callback(log_failure)
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Retorna o valor da chave, carregando com `loader` quando necessário"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._refresh_in_background(key, loader)
+                return entry.value
+
+        self.misses += 1
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Remove uma chave (ou todas, se nenhuma for informada)"""
+        if key is None:
+            self._entries.clear()
+            self._current_bytes = 0
+            self._loading.clear()
+        else:
+            self._discard(key)
+            self._loading.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'name': self.name,
+            'entries': len(self._entries),
+            'bytes': self._current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'discarded_loads': self.discarded_loads,
+            'hit_rate': (self.hits + self.stale_hits) / lookups if lookups else 0
+        }
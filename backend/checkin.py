@@ -0,0 +1,457 @@
+import time
+import asyncio
+import hashlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from qr_signing import QR_PREFIX, InvalidQrError, SignedTicket, is_signed_token
+
+# Estados no índice
+ACTIVE = 0
+USED = 1
+CANCELLED = 2
+
+# Resultados da leitura
+VALID = 'valid'
+ALREADY_USED = 'already_used'
+CANCELLED_TICKET = 'cancelled'
+WRONG_EVENT = 'wrong_event'
+EXPIRED = 'expired'
+INVALID = 'invalid'
+
+STATUS_STATES = {'active': ACTIVE, 'used': USED, 'cancelled': CANCELLED}
+
+# Tamanho da coluna tickets.qr_code: nada maior que isso pode estar no banco
+MAX_TOKEN_LENGTH = 255
+
+def normalize_qr(value: str) -> str:
+    """Token do QR sem o prefixo TICKETMETAL: (o conteúdo lido pode trazer o prefixo repetido)"""
+    value = value.strip()
+    while value.startswith(QR_PREFIX):
+        value = value[len(QR_PREFIX):]
+    return value
+
+def qr_hash(token: str) -> int:
+    """Chave de 64 bits do token no índice"""
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little')
+
+def _timestamp(value: Any) -> float:
+    if not value:
+        return 0.0
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if value.tzinfo is not None:
+        return value.timestamp()
+    # used_at é gravado sem fuso, em UTC (datetime.utcnow)
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+class EventCheckinIndex:
+    """
+    Ingressos de um evento em estruturas compactas: hash do QR -> posição,
+    e arrays paralelos com id do ingresso, estado e horário de uso.
+    misses guarda os hashes que não existem no banco (hash -> expira em).
+    """
+    __slots__ = ('slots', 'ticket_ids', 'states', 'used_at', 'used', 'misses', 'loaded_at')
+
+    def __init__(self):
+        self.slots: Dict[int, int] = {}
+        self.ticket_ids = array('q')
+        self.states = bytearray()
+        self.used_at = array('d')
+        self.used = 0
+        self.misses: Dict[int, float] = {}
+        self.loaded_at = time.monotonic()
+
+    def add(self, ticket: Dict[str, Any]) -> int:
+        key = qr_hash(normalize_qr(ticket['qr_code']))
+        self.misses.pop(key, None)
+        state = STATUS_STATES.get(ticket.get('status') or 'active', ACTIVE)
+        position = self.slots.get(key)
+        if position is None:
+            position = len(self.ticket_ids)
+            self.slots[key] = position
+            self.ticket_ids.append(ticket['id'])
+            self.states.append(ACTIVE)
+            self.used_at.append(0.0)
+        self.set_state(position, state, _timestamp(ticket.get('used_at')))
+        return position
+
+    def set_state(self, position: int, state: int, used_at: float = 0.0):
+        if self.states[position] == USED:
+            self.used -= 1
+        self.states[position] = state
+        if state == USED:
+            self.used += 1
+            self.used_at[position] = used_at or self.used_at[position] or time.time()
+
+    def __len__(self) -> int:
+        return len(self.ticket_ids)
+
+class CheckinService:
+    """
+    Validação de ingressos na entrada do evento.
+
+    Os QR codes válidos de cada evento são carregados do banco uma vez
+    (preload, ou na primeira leitura) num índice em memória. Validar e
+    marcar um ingresso é uma consulta num dict, sem I/O; como o event loop é
+    único por processo e não há await entre verificar e marcar, duas
+    leituras simultâneas do mesmo QR nunca são aceitas as duas.
+
+    A gravação de used_at/status='used' no banco é feita em lotes (group
+    commit): as leituras aceitas entram numa fila que é gravada a cada
+    flush_interval segundos, ou assim que juntar batch_size ingressos, com
+    um único comando por lote, e a leitura só responde depois da gravação.
+    O comando só marca ingressos ainda ativos no banco, então um ingresso
+    usado ou cancelado em outra instância é recusado (already_used ou
+    cancelled) mesmo que o índice local ainda o tenha como ativo. Se a
+    gravação falhar a leitura termina com erro e o ingresso volta a ficar
+    ativo no índice, para ser lido de novo.
+
+    O índice de um evento é recarregado em segundo plano quando passa de
+    max_age segundos (as leituras continuam no índice anterior até a troca)
+    e no máximo max_events índices ficam em memória, saindo primeiro o do
+    evento lido há mais tempo.
+
+    QR codes fora do índice (ingresso comprado depois da carga, ou em outro
+    processo) são buscados no banco uma vez e passam a fazer parte dele.
+    Os que não existem no banco ficam num cache negativo por evento durante
+    miss_ttl segundos (até max_misses por evento), para que o mesmo código
+    inválido lido várias vezes não gere uma consulta a cada leitura.
+    Com verify, tokens assinados falsos, expirados ou de outro evento são
+    recusados antes do índice, sem nenhuma consulta ao banco.
+    """
+
+    def __init__(
+        self,
+        load_page: Callable[[int, int, Optional[int]], Awaitable[List[Dict[str, Any]]]],
+        lookup: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+        commit: Callable[[List[int], List[datetime]], Awaitable[List[int]]],
+        batch_size: int = 200,
+        flush_interval: float = 0.25,
+        page_size: int = 1000,
+        verify: Optional[Callable[[str], SignedTicket]] = None,
+        miss_ttl: float = 30,
+        max_misses: int = 10000,
+        max_age: float = 60,
+        max_events: int = 20
+    ):
+        # load_page(event_id, limit, after_id) -> ingressos não cancelados ordenados por id
+        self.load_page = load_page
+        # lookup(token) -> ingresso com esse QR ou None
+        self.lookup = lookup
+        # commit(ticket_ids, used_at) -> ids efetivamente marcados como usados
+        self.commit = commit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.page_size = page_size
+        # verify(token) -> SignedTicket, ou InvalidQrError
+        self.verify = verify
+        self.miss_ttl = miss_ttl
+        self.max_misses = max_misses
+        self.max_age = max_age
+        self.max_events = max_events
+
+        self._events: "OrderedDict[int, EventCheckinIndex]" = OrderedDict()
+        self._loading: Dict[int, asyncio.Task] = {}
+        # (ingresso, horário da leitura, resultado da gravação: True se o banco marcou)
+        self._pending: List[Tuple[int, float, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.scans = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.lookups = 0
+        self.cached_misses = 0
+        self.batches = 0
+        self.committed = 0
+        self.conflicts = 0
+        self.commit_errors = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    async def _build(self, event_id: int) -> EventCheckinIndex:
+        index = EventCheckinIndex()
+        after_id = None
+        while True:
+            page = await self.load_page(event_id, self.page_size, after_id)
+            for ticket in page:
+                index.add(ticket)
+            if len(page) < self.page_size:
+                break
+            after_id = page[-1]['id']
+
+        # Leituras aceitas que ainda estão na fila de gravação continuam valendo
+        pending = {ticket_id: used_at for ticket_id, used_at, _ in self._pending}
+        if pending:
+            for position, ticket_id in enumerate(index.ticket_ids):
+                if ticket_id in pending and index.states[position] == ACTIVE:
+                    index.set_state(position, USED, pending[ticket_id])
+        return index
+
+    def _start_build(self, event_id: int) -> asyncio.Task:
+        """Carga do índice do evento, uma só por vez mesmo com leituras simultâneas"""
+        task = self._loading.get(event_id)
+        if task is None:
+            task = asyncio.ensure_future(self._build(event_id))
+            self._loading[event_id] = task
+            task.add_done_callback(lambda done: self._built(event_id, done))
+        return task
+
+    def _built(self, event_id: int, task: asyncio.Task):
+        self._loading.pop(event_id, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # Na primeira carga quem espera recebe o erro; na recarga o índice anterior continua valendo
+            if event_id in self._events:
+                self.refresh_errors += 1
+                print(f"Erro ao recarregar índice de check-in do evento {event_id}: {error}")
+            return
+        if event_id in self._events:
+            self.refreshes += 1
+        self._events[event_id] = task.result()
+        self._events.move_to_end(event_id)
+        while len(self._events) > self.max_events:
+            self._events.popitem(last=False)
+            self.evictions += 1
+
+    async def _load(self, event_id: int) -> EventCheckinIndex:
+        """Índice do evento: carregado na primeira leitura e recarregado em segundo plano depois de max_age"""
+        index = self._events.get(event_id)
+        if index is not None:
+            self._events.move_to_end(event_id)
+            if time.monotonic() - index.loaded_at > self.max_age:
+                self._start_build(event_id)
+            return index
+        return await asyncio.shield(self._start_build(event_id))
+
+    def _indexes(self, event_id: int, index: EventCheckinIndex) -> List[EventCheckinIndex]:
+        """O índice usado na leitura e o atual do evento, se uma recarga trocou os dois no meio"""
+        current = self._events.get(event_id)
+        return [index] if current is None or current is index else [index, current]
+
+    async def preload(self, event_id: int) -> Dict[str, Any]:
+        """Carrega o índice antes da abertura dos portões"""
+        await self._load(event_id)
+        return self.event_stats(event_id)
+
+    async def scan(self, event_id: int, qr_code: str) -> Dict[str, Any]:
+        """Valida o QR lido na entrada e marca o ingresso como usado"""
+        self.scans += 1
+        token = normalize_qr(qr_code)
+        if not token or len(token) > MAX_TOKEN_LENGTH:
+            self.rejected += 1
+            return {'event_id': event_id, 'result': INVALID}
+        if self.verify is not None and is_signed_token(token):
+            try:
+                signed = self.verify(token)
+            except InvalidQrError as e:
+                self.rejected += 1
+                return {'event_id': event_id, 'result': EXPIRED if e.reason == 'expired' else INVALID}
+            if signed.event_id != event_id:
+                self.rejected += 1
+                return {'event_id': event_id, 'result': WRONG_EVENT}
+
+        index = await self._load(event_id)
+        key = qr_hash(token)
+        position = index.slots.get(key)
+
+        if position is None:
+            expires = index.misses.get(key)
+            if expires is not None:
+                if expires > time.monotonic():
+                    self.cached_misses += 1
+                    self.rejected += 1
+                    return {'event_id': event_id, 'result': INVALID}
+                del index.misses[key]
+
+            # Fora do índice: busca no banco uma vez
+            self.lookups += 1
+            ticket = await self.lookup(token)
+            if ticket is None:
+                self._remember_miss(index, key)
+                self.rejected += 1
+                return {'event_id': event_id, 'result': INVALID}
+            if ticket['event_id'] != event_id:
+                self.rejected += 1
+                return {'event_id': event_id, 'ticket_id': ticket['id'], 'result': WRONG_EVENT}
+            # Outra leitura pode ter incluído o ingresso durante a busca
+            position = index.slots.get(key)
+            if position is None:
+                position = index.add(ticket)
+
+        # Daqui até marcar não há await: verificar e marcar é atômico no event loop
+        ticket_id = index.ticket_ids[position]
+        if index.states[position] != ACTIVE:
+            return self._refused(event_id, index, position)
+
+        now = time.time()
+        index.set_state(position, USED, now)
+        try:
+            # shield: se o cliente desistir, a gravação segue e o índice fica como no banco
+            committed = await asyncio.shield(self._enqueue(ticket_id, now))
+        except Exception:
+            # Sem gravação a leitura não vale: o ingresso volta a ser aceito na próxima
+            for current in self._indexes(event_id, index):
+                current_position = current.slots.get(key)
+                if current_position is not None and current.states[current_position] == USED and current.used_at[current_position] == now:
+                    current.set_state(current_position, ACTIVE)
+            raise
+
+        if not committed:
+            # Usado ou cancelado no banco por outro caminho (outra instância, alteração do ingresso)
+            self.conflicts += 1
+            return await self._resolve_conflict(event_id, index, key, token)
+
+        self.accepted += 1
+        return {
+            'event_id': event_id,
+            'ticket_id': ticket_id,
+            'result': VALID,
+            'used_at': datetime.utcfromtimestamp(now).isoformat()
+        }
+
+    def _refused(self, event_id: int, index: EventCheckinIndex, position: int) -> Dict[str, Any]:
+        ticket_id = index.ticket_ids[position]
+        if index.states[position] == CANCELLED:
+            self.rejected += 1
+            return {'event_id': event_id, 'ticket_id': ticket_id, 'result': CANCELLED_TICKET}
+        self.duplicates += 1
+        return {
+            'event_id': event_id,
+            'ticket_id': ticket_id,
+            'result': ALREADY_USED,
+            'used_at': datetime.utcfromtimestamp(index.used_at[position]).isoformat()
+        }
+
+    async def _resolve_conflict(self, event_id: int, index: EventCheckinIndex, key: int, token: str) -> Dict[str, Any]:
+        """Atualiza o índice com o estado do banco de um ingresso que o banco não marcou"""
+        try:
+            ticket = await self.lookup(token)
+        except Exception as e:
+            print(f"Erro ao buscar ingresso em conflito no check-in: {e}")
+            ticket = {}
+        for current in self._indexes(event_id, index):
+            position = current.slots.get(key)
+            if position is None:
+                continue
+            if ticket is None:
+                current.set_state(position, CANCELLED)
+            elif ticket.get('status') in ('used', 'cancelled'):
+                current.add(ticket)
+        return self._refused(event_id, index, index.slots[key])
+
+    def _remember_miss(self, index: EventCheckinIndex, key: int):
+        # Outra leitura pode ter incluído o ingresso durante a busca
+        if key in index.slots:
+            return
+        index.misses[key] = time.monotonic() + self.miss_ttl
+        if len(index.misses) > self.max_misses:
+            # Descarta o mais antigo (dict em ordem de inserção)
+            del index.misses[next(iter(index.misses))]
+
+    def _enqueue(self, ticket_id: int, used_at: float) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+        self._pending.append((ticket_id, used_at, result))
+        if len(self._pending) >= self.batch_size:
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._start_flush)
+        return result
+
+    def _start_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        # Um lote por vez: enquanto ele grava, as novas leituras formam o próximo
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            ticket_ids = [ticket_id for ticket_id, _, _ in batch]
+            try:
+                updated = await self.commit(ticket_ids, [datetime.utcfromtimestamp(used_at) for _, used_at, _ in batch])
+            except Exception as e:
+                print(f"Erro ao gravar lote de check-in ({len(batch)} ingressos): {e}")
+                self.commit_errors += 1
+                for _, _, result in batch:
+                    if not result.done():
+                        result.set_exception(e)
+                continue
+            self.batches += 1
+            self.committed += len(updated)
+            # Os que ficaram de fora já não estavam ativos no banco: cada leitura resolve o seu conflito
+            updated = set(updated)
+            for ticket_id, _, result in batch:
+                if not result.done():
+                    result.set_result(ticket_id in updated)
+
+    async def flush(self):
+        """Grava tudo o que está na fila (usado no desligamento)"""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            await self._flush()
+
+    def add_tickets(self, tickets: List[Dict[str, Any]]):
+        """Inclui ingressos recém-criados nos índices já carregados"""
+        for ticket in tickets:
+            index = self._events.get(ticket['event_id'])
+            if index is not None:
+                index.add(ticket)
+
+    def update_ticket(self, ticket: Dict[str, Any]):
+        """Reflete no índice uma alteração de status feita fora do check-in"""
+        if ticket.get('status') == 'active':
+            # Ingresso reativado: uma leitura ainda na fila não pode marcá-lo como usado depois
+            for ticket_id, _, result in self._pending:
+                if ticket_id == ticket['id'] and not result.done():
+                    result.set_result(False)
+            self._pending = [entry for entry in self._pending if entry[0] != ticket['id']]
+        self.add_tickets([ticket])
+
+    def remove_ticket(self, ticket: Dict[str, Any]):
+        """Ingresso removido deixa de ser aceito na entrada"""
+        self.add_tickets([{**ticket, 'status': 'cancelled'}])
+
+    def event_stats(self, event_id: int) -> Dict[str, Any]:
+        index = self._events.get(event_id)
+        if index is None:
+            return {'event_id': event_id, 'loaded': False}
+        return {
+            'event_id': event_id,
+            'loaded': True,
+            'tickets': len(index) - index.states.count(CANCELLED),
+            'checked_in': index.used,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'events': len(self._events),
+            'scans': self.scans,
+            'accepted': self.accepted,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'lookups': self.lookups,
+            'cached_misses': self.cached_misses,
+            'pending_writes': len(self._pending),
+            'batches': self.batches,
+            'committed': self.committed,
+            'conflicts': self.conflicts,
+            'commit_errors': self.commit_errors,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'evictions': self.evictions,
+        }
@@ -1,10 +1,20 @@
 import os
+import re
 import uuid
-from typing import Optional
+import asyncio
+from typing import Any, Dict, Optional, Union
 from google.cloud import storage
 from google.oauth2 import service_account
-from PIL import Image
-import io
+
+# Formato -> (extensão, content type) de cada variante enviada
+VARIANT_FORMATS = {
+    'jpeg': ('jpg', 'image/jpeg'),
+    'webp': ('webp', 'image/webp'),
+}
+VARIANT_NAME = re.compile(r'^(?P<basename>.+)_(hero|card|thumbnail)\.(jpg|webp)$')
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Envio de arquivos em blocos (upload resumable): múltiplo de 256KB exigido pela API
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 class GCPStorageService:
     def __init__(self):
@@ -60,43 +70,42 @@ class GCPStorageService:
         
         return f"events/{timestamp}_{unique_id}{file_extension}"
     
-    def _resize_image(self, image_data: bytes, max_width: int = 1200, max_height: int = 800) -> bytes:
-        """Redimensiona a imagem mantendo a proporção"""
-        try:
-            # Abrir imagem
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Converter para RGB se necessário (para JPEG)
-            if image.mode in ('RGBA', 'LA', 'P'):
-                image = image.convert('RGB')
-            
-            # Calcular novo tamanho mantendo proporção
-            width, height = image.size
-            
-            if width > max_width or height > max_height:
-                # Calcular proporção
-                ratio = min(max_width / width, max_height / height)
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-                
-                # Redimensionar
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Salvar em buffer
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
-            
-            return output.getvalue()
+    def _generate_unique_basename(self) -> str:
+        """Gera um nome único (sem extensão) para as variantes de uma imagem"""
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"events/{timestamp}_{uuid.uuid4()}"
+    
+    def _upload_blob(self, filename: str, data: Union[bytes, str], content_type: str, original_filename: str) -> str:
+        """
+        Envia um arquivo para o bucket e o torna público (chamada bloqueante, executada numa thread).
+        data são os bytes do arquivo ou o caminho dele em disco; arquivos em disco vão em blocos
+        de UPLOAD_CHUNK_SIZE, sem serem lidos inteiros para a memória.
+        """
+        bucket = self.client.bucket(self.bucket_name)
+        blob = bucket.blob(filename)
         
-        except Exception as e:
-            print(f"Erro ao redimensionar imagem: {e}")
-            # Se houver erro, retorna a imagem original
-            return image_data
+        # Configurar metadados
+        blob.content_type = content_type
+        blob.metadata = {
+            'original_filename': original_filename,
+            'uploaded_at': str(uuid.uuid4()),
+            'service': 'ticketmetal'
+        }
+        # Nomes únicos: o conteúdo de uma URL nunca muda e pode ficar no cache do navegador/CDN
+        blob.cache_control = IMMUTABLE_CACHE_CONTROL
+        
+        if isinstance(data, str):
+            blob.chunk_size = UPLOAD_CHUNK_SIZE
+            blob.upload_from_filename(data, content_type=content_type)
+        else:
+            blob.upload_from_string(data, content_type=content_type)
+        blob.make_public()
+        return blob.public_url
     
     async def upload_image(self, file_data: bytes, original_filename: str, content_type: str = "image/jpeg") -> Optional[str]:
         """
-        Faz upload de uma imagem para o Google Cloud Storage
+        Faz upload de uma imagem para o Google Cloud Storage, sem processamento
         
         Args:
             file_data: Dados binários da imagem
@@ -107,43 +116,52 @@ class GCPStorageService:
             URL pública da imagem ou None se houver erro
         """
         try:
-            # Gerar nome único para o arquivo
             filename = self._generate_unique_filename(original_filename)
+            public_url = await asyncio.to_thread(self._upload_blob, filename, file_data, content_type, original_filename)
+            print(f"Imagem enviada com sucesso: {public_url}")
+            return public_url
             
-            # Redimensionar imagem se necessário
-            processed_data = self._resize_image(file_data)
-            
-            # Obter bucket
-            bucket = self.client.bucket(self.bucket_name)
-            
-            # Criar blob (arquivo)
-            blob = bucket.blob(filename)
+        except Exception as e:
+            print(f"Erro ao fazer upload da imagem: {e}")
+            return None
+    
+    async def upload_image_variants(self, variants: Dict[str, Dict[str, Any]], original_filename: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Faz upload das variantes de uma imagem (geradas pelo ImageProcessingPool)
+        
+        Args:
+            variants: {nome: {width, height, jpeg, webp}}, com os bytes ou o caminho de cada arquivo
+            original_filename: Nome original do arquivo
             
-            # Configurar metadados
-            blob.content_type = content_type
-            blob.metadata = {
-                'original_filename': original_filename,
-                'uploaded_at': str(uuid.uuid4()),
-                'service': 'ticketmetal'
+        Returns:
+            Manifesto {nome: {width, height, jpeg: URL, webp: URL}} ou None se houver erro
+        """
+        try:
+            basename = self._generate_unique_basename()
+            uploads = []
+            for name, variant in variants.items():
+                for image_format, (extension, content_type) in VARIANT_FORMATS.items():
+                    filename = f"{basename}_{name}.{extension}"
+                    uploads.append((name, image_format, filename, variant[image_format], content_type))
+            
+            # Os envios são independentes: todos ao mesmo tempo, cada um numa thread
+            urls = await asyncio.gather(*(
+                asyncio.to_thread(self._upload_blob, filename, data, content_type, original_filename)
+                for _, _, filename, data, content_type in uploads
+            ))
+            
+            manifest = {
+                name: {'width': variant['width'], 'height': variant['height']}
+                for name, variant in variants.items()
             }
+            for (name, image_format, _, _, _), url in zip(uploads, urls):
+                manifest[name][image_format] = url
             
-            # Fazer upload
-            blob.upload_from_string(
-                processed_data,
-                content_type=content_type
-            )
-            
-            # Tornar o arquivo público
-            blob.make_public()
-            
-            # Retornar URL pública
-            public_url = blob.public_url
-            print(f"Imagem enviada com sucesso: {public_url}")
-            
-            return public_url
+            print(f"Imagem enviada com sucesso: {basename} ({len(urls)} variantes)")
+            return manifest
             
         except Exception as e:
-            print(f"Erro ao fazer upload da imagem: {e}")
+            print(f"Erro ao fazer upload das variantes da imagem: {e}")
             return None
     
     async def delete_image(self, image_url: str) -> bool:
@@ -163,11 +181,19 @@ class GCPStorageService:
             # Obter bucket
             bucket = self.client.bucket(self.bucket_name)
             
-            # Obter blob
-            blob = bucket.blob(f"events/{filename}")
-            
-            # Deletar arquivo
-            blob.delete()
+            # Uma variante (hero, card, thumbnail) remove junto todas as outras da mesma imagem
+            match = VARIANT_NAME.match(filename)
+            if match:
+                filenames = [
+                    f"events/{match.group('basename')}_{name}.{extension}"
+                    for name in ('hero', 'card', 'thumbnail')
+                    for extension, _ in VARIANT_FORMATS.values()
+                ]
+                blobs = [bucket.blob(name) for name in filenames]
+                await asyncio.to_thread(bucket.delete_blobs, blobs, on_error=lambda blob: None)
+            else:
+                blob = bucket.blob(f"events/{filename}")
+                await asyncio.to_thread(blob.delete)
             
             print(f"Imagem deletada com sucesso: {filename}")
             return True
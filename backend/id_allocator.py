@@ -0,0 +1,129 @@
+import os
+import time
+import socket
+import threading
+import zlib
+from typing import List, Optional, Tuple
+
+# Época própria (2024-01-01 UTC, em ms): 41 bits de tempo duram até ~2093
+EPOCH_MS = 1704067200000
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+TIMESTAMP_SHIFT = WORKER_BITS + SEQUENCE_BITS
+
+# Base32 de Crockford: sem I, L, O, U, legível e com ordem igual à numérica
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ID_LENGTH = 13  # 64 bits em base32
+
+def encode_base32(value: int, length: int = ID_LENGTH) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+def decode_base32(text: str) -> int:
+    value = 0
+    for char in text.upper():
+        value = (value << 5) | ALPHABET.index(char)
+    return value
+
+def default_worker_id() -> int:
+    """
+    ID do worker: ID_WORKER_ID quando definido (um valor distinto por
+    instância/worker garante unicidade); senão, derivado de hostname + pid,
+    o que separa os workers do uvicorn numa máquina e as instâncias do
+    Cloud Run com probabilidade alta, mas não garantida. Nesse caso a API
+    troca o valor, ao subir, por um obtido do banco (set_worker_id).
+    """
+    configured = os.getenv("ID_WORKER_ID")
+    if configured is not None:
+        worker_id = int(configured)
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"ID_WORKER_ID deve estar entre 0 e {MAX_WORKER_ID}")
+        return worker_id
+    return zlib.crc32(f"{socket.gethostname()}:{os.getpid()}".encode()) & MAX_WORKER_ID
+
+class IdAllocator:
+    """
+    Gerador local de IDs de 64 bits no estilo snowflake.
+
+    Layout: 41 bits de milissegundos desde EPOCH_MS | 10 bits de worker |
+    12 bits de sequência. IDs do mesmo worker são estritamente crescentes;
+    de workers diferentes nunca colidem desde que o worker id seja único.
+    Até 4096 IDs por milissegundo por worker; ao esgotar a sequência o
+    gerador espera o próximo milissegundo.
+    """
+
+    def __init__(self, worker_id: Optional[int] = None):
+        self.worker_id = default_worker_id() if worker_id is None else worker_id
+        if not 0 <= self.worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id deve estar entre 0 e {MAX_WORKER_ID}")
+        self._worker_bits = self.worker_id << SEQUENCE_BITS
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+        # Workers criados por fork (ex.: gunicorn --preload) herdariam o mesmo worker id
+        if worker_id is None and hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self.worker_id = default_worker_id()
+        self._worker_bits = self.worker_id << SEQUENCE_BITS
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def set_worker_id(self, worker_id: int):
+        """Troca o worker id (ex.: um concedido pelo banco); os IDs seguintes usam o novo valor"""
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id deve estar entre 0 e {MAX_WORKER_ID}")
+        with self._lock:
+            self.worker_id = worker_id
+            self._worker_bits = worker_id << SEQUENCE_BITS
+
+    def _wait_next_ms(self, last_ms: int) -> int:
+        now = time.time_ns() // 1_000_000 - EPOCH_MS
+        while now <= last_ms:
+            time.sleep(0.0001)
+            now = time.time_ns() // 1_000_000 - EPOCH_MS
+        return now
+
+    def _reserve(self, count: int) -> Tuple[int, int, int]:
+        """Reserva até `count` sequências no milissegundo atual: (ms, primeira sequência, quantidade)"""
+        with self._lock:
+            now = time.time_ns() // 1_000_000 - EPOCH_MS
+            if now < self._last_ms:
+                # Relógio voltou (ajuste de NTP): continua no último ms conhecido
+                now = self._last_ms
+            if now == self._last_ms:
+                if self._sequence > MAX_SEQUENCE:
+                    now = self._wait_next_ms(self._last_ms)
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            first = self._sequence
+            taken = min(count, MAX_SEQUENCE + 1 - first)
+            self._sequence = first + taken
+            return now, first, taken
+
+    def next_id(self) -> int:
+        now, sequence, _ = self._reserve(1)
+        return (now << TIMESTAMP_SHIFT) | self._worker_bits | sequence
+
+    def next_ids(self, count: int) -> List[int]:
+        """Gera `count` IDs reservando faixas inteiras da sequência de uma vez"""
+        ids: List[int] = []
+        while len(ids) < count:
+            now, first, taken = self._reserve(count - len(ids))
+            base = (now << TIMESTAMP_SHIFT) | self._worker_bits
+            ids.extend(range(base + first, base + first + taken))
+        return ids
+
+# Instância global do gerador de IDs
+id_allocator = IdAllocator()
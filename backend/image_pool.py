@@ -0,0 +1,227 @@
+import io
+import math
+import time
+import asyncio
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Variantes geradas por upload: (largura máxima, altura máxima), do maior para o menor
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    'hero': (1200, 800),
+    'card': (640, 427),
+    'thumbnail': (320, 213),
+}
+
+EXIF_ORIENTATION = 0x0112
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+# method 2 do libwebp: arquivos ~5% maiores que o padrão (4) com metade do tempo de codificação
+WEBP_METHOD = 2
+# Limite de pixels da imagem enviada: o bitmap decodificado é que ocupa memória, não o arquivo
+MAX_PIXELS = 50_000_000
+
+# Assinaturas (magic bytes) dos formatos aceitos; o content type enviado pelo navegador não é confiável
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Content type da imagem pelos primeiros bytes do arquivo, ou None se não for um formato aceito"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+def require_image_type(head: bytes) -> str:
+    """Como sniff_image_type, mas lança ValueError se o arquivo não for uma imagem aceita"""
+    content_type = sniff_image_type(head)
+    if content_type is None:
+        raise ValueError("Arquivo deve ser uma imagem (JPEG, PNG, GIF ou WebP)")
+    return content_type
+
+class ImagePoolSaturatedError(Exception):
+    """Fila de processamento de imagens cheia; o cliente deve tentar de novo após retry_after segundos"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Processamento de imagens sobrecarregado, tente novamente em {retry_after}s")
+        self.retry_after = retry_after
+
+def _fit(size: Tuple[int, int], bounds: Tuple[int, int]) -> Tuple[int, int]:
+    """Tamanho que cabe em bounds mantendo a proporção, sem ampliar"""
+    width, height = size
+    ratio = min(bounds[0] / width, bounds[1] / height, 1)
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+def _process_image(source: Union[bytes, str], output_prefix: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Decodifica a imagem uma vez e gera todas as variantes em JPEG e WebP.
+
+    Para JPEG, draft() pede ao decodificador a menor escala (1/2, 1/4, 1/8)
+    que ainda cobre a maior variante, o que evita decodificar os pixels de
+    fotos de câmera inteiras. Cada variante é reduzida a partir da anterior.
+
+    source são os bytes da imagem ou o caminho do arquivo. Com output_prefix,
+    as variantes são gravadas em {output_prefix}_{nome}.jpg/.webp e o
+    resultado traz os caminhos no lugar dos bytes.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        if image.size[0] * image.size[1] > MAX_PIXELS:
+            raise ValueError(f"imagem com mais de {MAX_PIXELS // 1_000_000} megapixels")
+        # Orientações 5 a 8 do EXIF giram a foto em 90°: a maior variante é medida com os lados trocados
+        width, height = VARIANTS['hero']
+        if image.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        image.draft('RGB', _fit(image.size, (width, height)))
+        image = ImageOps.exif_transpose(image)
+    except Exception as e:
+        raise ValueError(f"Arquivo não é uma imagem válida: {e}")
+
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        # Fundo branco no lugar da transparência (JPEG não tem canal alfa)
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    variants = {}
+    current = image
+    for name, bounds in VARIANTS.items():
+        size = _fit(current.size, bounds)
+        if size != current.size:
+            current = current.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        if output_prefix:
+            jpeg = f"{output_prefix}_{name}.jpg"
+            webp = f"{output_prefix}_{name}.webp"
+        else:
+            jpeg = io.BytesIO()
+            webp = io.BytesIO()
+        current.save(jpeg, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        current.save(webp, format='WEBP', quality=WEBP_QUALITY, method=WEBP_METHOD)
+        variants[name] = {
+            'width': current.size[0],
+            'height': current.size[1],
+            'jpeg': jpeg if output_prefix else jpeg.getvalue(),
+            'webp': webp if output_prefix else webp.getvalue(),
+        }
+    return variants
+
+def _warm_up() -> bool:
+    from PIL import Image
+    return Image is not None
+
+class ImageProcessingPool:
+    """
+    Processamento das imagens enviadas num ProcessPoolExecutor, fora do
+    event loop (decodificar, redimensionar e codificar fotos grandes leva
+    centenas de ms de CPU). Mesmo modelo do PdfRenderPool: processos spawn,
+    criados só no primeiro upload, e fila limitada a max_pending; acima
+    disso process() lança ImagePoolSaturatedError para o Retry-After.
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 8):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        # Média móvel do tempo de processamento, para estimar o Retry-After
+        self._avg_seconds = 0.5
+
+        self.processed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    async def warm_up(self):
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_up) for _ in range(self.max_workers)))
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._pending * self._avg_seconds / self.max_workers))
+
+    @contextmanager
+    def reserve(self):
+        """
+        Reserva uma vaga na fila pelo tempo do bloco, ou lança
+        ImagePoolSaturatedError. O upload reserva antes de receber o arquivo,
+        então max_pending limita também os arquivos sendo recebidos.
+        """
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise ImagePoolSaturatedError(self.retry_after())
+        self._pending += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    async def process(self, source: Union[bytes, str], output_prefix: Optional[str] = None, reserved: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Variantes da imagem ({nome: {width, height, jpeg, webp}}); ValueError se não for uma imagem.
+        Com caminhos em source e output_prefix, a imagem não passa pela memória deste processo.
+        reserved=True quando a chamada já está dentro de reserve().
+        """
+        if not reserved:
+            with self.reserve():
+                return await self._run(source, output_prefix)
+        return await self._run(source, output_prefix)
+
+    async def _run(self, source: Union[bytes, str], output_prefix: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                result = await loop.run_in_executor(executor, _process_image, source, output_prefix)
+            except BrokenProcessPool:
+                # Um worker morreu (ex.: falta de memória numa imagem enorme): recria o pool e tenta uma vez
+                self._discard_broken(executor)
+                result = await loop.run_in_executor(self._get_executor(), _process_image, source, output_prefix)
+            self.processed += 1
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.perf_counter() - started)
+            return result
+        except Exception:
+            self.errors += 1
+            raise
+
+    def _discard_broken(self, executor: ProcessPoolExecutor):
+        """Descarta o pool quebrado só se ainda for o atual (outra chamada pode já tê-lo recriado)"""
+        if self._executor is executor:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "avg_process_ms": round(self._avg_seconds * 1000, 1),
+        }
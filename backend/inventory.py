@@ -0,0 +1,231 @@
+import time
+import uuid
+import heapq
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class SoldOutError(Exception):
+    """Não há ingressos suficientes para a reserva pedida"""
+
+class HoldNotFoundError(Exception):
+    """Reserva inexistente, expirada ou já finalizada"""
+
+class Hold:
+    __slots__ = ('hold_id', 'event_id', 'quantity', 'user_id', 'expires_at', 'confirming')
+
+    def __init__(self, hold_id: str, event_id: int, quantity: int, user_id: Optional[int], expires_at: float):
+        self.hold_id = hold_id
+        self.event_id = event_id
+        self.quantity = quantity
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.confirming = False
+
+class EventInventory:
+    __slots__ = ('capacity', 'sold', 'held', 'holds', 'expirations', 'stale')
+
+    def __init__(self, capacity: int, sold: int):
+        self.capacity = capacity
+        self.sold = sold
+        self.held = 0
+        self.holds: Dict[str, Hold] = {}
+        # Heap (expira_em, hold_id) para liberar as reservas vencidas sem varrer todas
+        self.expirations: List[Tuple[float, str]] = []
+        self.stale = False
+
+    @property
+    def available(self) -> int:
+        return max(self.capacity - self.sold - self.held, 0)
+
+class InventoryEngine:
+    """
+    Controle de estoque de ingressos em memória.
+
+    A capacidade restante de cada evento é carregada do banco na primeira
+    reserva (max_tickets menos ingressos vendidos) e depois mantida em
+    memória. O checkout pede uma reserva (hold) com prazo; a reserva é
+    confirmada quando o pagamento é aprovado, e só então os ingressos são
+    gravados no banco, ou liberada quando o pagamento falha ou o prazo vence.
+
+    Como o event loop é único por processo, verificar e descontar a
+    capacidade acontece sem await no meio, então reservas simultâneas nunca
+    vendem além do limite. O estoque vale por processo: com vários workers
+    ou instâncias cada um tem sua contagem, e quem garante o limite é o
+    commit da confirmação, que grava no banco só se os ingressos couberem
+    na capacidade (create_tickets_within_capacity) e lança SoldOutError
+    caso contrário. Nesse caso a confirmação falha e o estoque é recarregado.
+
+    Uma confirmação que termina enquanto o estoque é carregado pode ou não
+    estar na leitura do banco; a carga é repetida até nenhuma terminar no
+    meio (até seed_attempts vezes; depois conta as confirmações como não
+    lidas e recarrega de novo no próximo acesso).
+    """
+
+    def __init__(self, seed: Callable[[int], Awaitable[Optional[Tuple[int, int]]]], hold_ttl: float = 600, max_quantity: int = 10, seed_attempts: int = 3):
+        # seed(event_id) -> (capacidade, vendidos) ou None se o evento não existe
+        self.seed = seed
+        self.hold_ttl = hold_ttl
+        self.max_quantity = max_quantity
+        self.seed_attempts = seed_attempts
+
+        self._events: Dict[int, EventInventory] = {}
+        self._holds: Dict[str, Hold] = {}
+        self._seeding: Dict[int, asyncio.Task] = {}
+        # Ingressos confirmados por evento desde o início do processo (para detectar confirmações durante a carga)
+        self._confirmed: Dict[int, int] = {}
+
+        self.holds_created = 0
+        self.holds_confirmed = 0
+        self.holds_released = 0
+        self.holds_expired = 0
+        self.sold_out_rejections = 0
+
+    async def _seed(self, event_id: int) -> Optional[Tuple[int, int, bool]]:
+        """(capacidade, vendidos, exato?) lidos do banco sem perder confirmações que terminaram durante a leitura"""
+        for _ in range(self.seed_attempts):
+            before = self._confirmed.get(event_id, 0)
+            seeded = await self.seed(event_id)
+            if seeded is None:
+                return None
+            missed = self._confirmed.get(event_id, 0) - before
+            if not missed:
+                return seeded[0], seeded[1], True
+        # Na dúvida conta as confirmações do meio como não lidas: nunca vende a mais
+        return seeded[0], seeded[1] + missed, False
+
+    async def _load(self, event_id: int) -> EventInventory:
+        """Estoque do evento, carregando do banco uma única vez mesmo com chamadas simultâneas"""
+        inventory = self._events.get(event_id)
+        if inventory is not None and not inventory.stale:
+            return inventory
+
+        task = self._seeding.get(event_id)
+        if task is None:
+            task = asyncio.ensure_future(self._seed(event_id))
+            self._seeding[event_id] = task
+            task.add_done_callback(lambda _: self._seeding.pop(event_id, None))
+        seeded = await asyncio.shield(task)
+
+        inventory = self._events.get(event_id)
+        if inventory is not None and not inventory.stale:
+            return inventory
+        if seeded is None:
+            raise HoldNotFoundError(f"Evento {event_id} não encontrado")
+
+        capacity, sold, exact = seeded
+        fresh = EventInventory(capacity, sold)
+        fresh.stale = not exact
+        if inventory is not None:
+            # Recarga: as reservas em andamento continuam valendo
+            fresh.held = inventory.held
+            fresh.holds = inventory.holds
+            fresh.expirations = inventory.expirations
+        self._events[event_id] = fresh
+        return fresh
+
+    def _expire(self, inventory: EventInventory, now: float):
+        while inventory.expirations and inventory.expirations[0][0] <= now:
+            _, hold_id = heapq.heappop(inventory.expirations)
+            hold = inventory.holds.get(hold_id)
+            if hold is None or hold.confirming or hold.expires_at > now:
+                continue
+            self._drop(inventory, hold)
+            self.holds_expired += 1
+
+    def _drop(self, inventory: EventInventory, hold: Hold):
+        inventory.holds.pop(hold.hold_id, None)
+        self._holds.pop(hold.hold_id, None)
+        inventory.held -= hold.quantity
+
+    async def hold(self, event_id: int, quantity: int = 1, user_id: Optional[int] = None) -> Hold:
+        """Reserva `quantity` ingressos por hold_ttl segundos; lança SoldOutError se não houver estoque"""
+        if quantity < 1 or quantity > self.max_quantity:
+            raise ValueError(f"Quantidade deve estar entre 1 e {self.max_quantity}")
+
+        inventory = await self._load(event_id)
+        # Daqui até o fim não há await: verificação e desconto são atômicos no event loop
+        now = time.monotonic()
+        self._expire(inventory, now)
+        if inventory.available < quantity:
+            self.sold_out_rejections += 1
+            raise SoldOutError(f"Ingressos esgotados para o evento {event_id}")
+
+        hold = Hold(uuid.uuid4().hex, event_id, quantity, user_id, now + self.hold_ttl)
+        inventory.held += quantity
+        inventory.holds[hold.hold_id] = hold
+        heapq.heappush(inventory.expirations, (hold.expires_at, hold.hold_id))
+        self._holds[hold.hold_id] = hold
+        self.holds_created += 1
+        return hold
+
+    def get_hold(self, hold_id: str) -> Hold:
+        hold = self._holds.get(hold_id)
+        if hold is None or (not hold.confirming and hold.expires_at <= time.monotonic()):
+            raise HoldNotFoundError("Reserva não encontrada ou expirada")
+        return hold
+
+    async def confirm(self, hold_id: str, commit: Callable[[Hold], Awaitable[Any]]) -> Any:
+        """
+        Confirma a reserva gravando os ingressos com commit(hold).
+
+        Enquanto a gravação está em andamento a reserva não expira nem pode ser
+        liberada. Se a gravação falhar, a reserva volta a valer até o prazo
+        original e a exceção é repassada. Como parte dos ingressos pode ter
+        sido gravada, o estoque do evento é recarregado do banco.
+        """
+        hold = self.get_hold(hold_id)
+        if hold.confirming:
+            raise HoldNotFoundError("Reserva já está sendo confirmada")
+        hold.confirming = True
+        try:
+            result = await commit(hold)
+        except Exception:
+            hold.confirming = False
+            inventory = self._events[hold.event_id]
+            heapq.heappush(inventory.expirations, (hold.expires_at, hold.hold_id))
+            self.invalidate(hold.event_id)
+            raise
+
+        inventory = self._events[hold.event_id]
+        self._drop(inventory, hold)
+        inventory.sold += hold.quantity
+        self._confirmed[hold.event_id] = self._confirmed.get(hold.event_id, 0) + hold.quantity
+        self.holds_confirmed += 1
+        return result
+
+    def release(self, hold_id: str) -> bool:
+        """Libera a reserva (pagamento recusado ou desistência); False se já não existia"""
+        hold = self._holds.get(hold_id)
+        if hold is None or hold.confirming:
+            return False
+        self._drop(self._events[hold.event_id], hold)
+        self.holds_released += 1
+        return True
+
+    def invalidate(self, event_id: int):
+        """Força recarregar capacidade e vendidos do banco na próxima reserva (max_tickets alterado, ingresso cancelado)"""
+        inventory = self._events.get(event_id)
+        if inventory is not None:
+            inventory.stale = True
+
+    async def availability(self, event_id: int) -> Dict[str, Any]:
+        inventory = await self._load(event_id)
+        self._expire(inventory, time.monotonic())
+        return {
+            "event_id": event_id,
+            "capacity": inventory.capacity,
+            "sold": inventory.sold,
+            "held": inventory.held,
+            "available": inventory.available,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events": len(self._events),
+            "active_holds": len(self._holds),
+            "holds_created": self.holds_created,
+            "holds_confirmed": self.holds_confirmed,
+            "holds_released": self.holds_released,
+            "holds_expired": self.holds_expired,
+            "sold_out_rejections": self.sold_out_rejections,
+        }
@@ -1,16 +1,33 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, status, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 import io
+import shutil
+import asyncio
+import tempfile
 from dotenv import load_dotenv
-from ticket_generator import TicketGenerator
+from pdf_pool import PdfRenderPool, PdfPoolSaturatedError, build_ticket_pdf_data, parse_datetime
+from image_pool import ImageProcessingPool, ImagePoolSaturatedError, require_image_type
+from multipart_upload import UploadTooLargeError, receive_file
+from ticket_export import stream_tickets_zip, render_tickets_pdf
+from pdf_cache import PdfCache, content_key, etag_matches, make_etag
+from singleflight import SingleFlight
 from mercadopago_integration import MercadoPagoIntegration
 from supabase_client import supabase_client
+from cache import TTLCache
+from pagination import next_cursor
+from projections import resolve_fields
+from batching import parse_id_list
+from inventory import InventoryEngine, SoldOutError, HoldNotFoundError, Hold
+from id_allocator import id_allocator, encode_base32
+from checkin import CheckinService, VALID, normalize_qr
+from qr_signing import QrSigner, InvalidQrError, QR_PREFIX
+from scan_manifest import ScanManifestService
 try:
     from gcp_storage import gcp_storage_service
     GCP_AVAILABLE = True
@@ -46,12 +63,132 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After", "ETag", "X-Manifest-Version"],
 )
 
 # Inicializar serviços
-ticket_generator = TicketGenerator()
+# PDFs renderizados em processos separados, fora do event loop
+pdf_render_pool = PdfRenderPool(
+    max_workers=int(os.getenv("PDF_POOL_WORKERS", "2")),
+    max_pending=int(os.getenv("PDF_POOL_MAX_PENDING", "16")),
+    mode=os.getenv("PDF_RENDER_MODE", "template"),
+    qr_mode=os.getenv("PDF_QR_MODE", "vector"),
+    export_slots=int(os.getenv("PDF_POOL_EXPORT_SLOTS", "0")) or None
+)
+# Imagens enviadas processadas fora do event loop; os processos sobem no primeiro upload
+image_processing_pool = ImageProcessingPool(
+    max_workers=int(os.getenv("IMAGE_POOL_WORKERS", "1")),
+    max_pending=int(os.getenv("IMAGE_POOL_MAX_PENDING", "8"))
+)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Diretório dos arquivos temporários do upload (original e variantes); None usa o padrão do sistema
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+# Relatórios de evento em PDF: TTL curto, o organizador atualiza a página durante as vendas
+event_report_cache = TTLCache(
+    'relatorios_evento',
+    ttl=float(os.getenv("EVENT_REPORT_CACHE_TTL", "30")),
+    stale_ttl=float(os.getenv("EVENT_REPORT_CACHE_STALE_TTL", "30")),
+    max_bytes=int(os.getenv("EVENT_REPORT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+)
+
+# PDFs de ingresso já gerados, endereçados pelo conteúdo (memória + disco opcional).
+# O nível em disco fica desligado por padrão: no Cloud Run o /tmp ocupa a memória da instância
+ticket_pdf_cache = PdfCache(
+    'ingressos_pdf',
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    disk_dir=os.getenv("PDF_CACHE_DIR", ""),
+    disk_max_bytes=int(os.getenv("PDF_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+)
+# Downloads simultâneos do mesmo ingresso renderizam uma vez só
+ticket_pdf_renders = SingleFlight('ingressos_pdf')
 mercadopago_integration = MercadoPagoIntegration()
 
+# Cache dos eventos rock: os dados só mudam quando o agregador roda
+rock_events_cache = TTLCache(
+    'eventos_rock',
+    ttl=float(os.getenv("ROCK_EVENTS_CACHE_TTL", "300")),
+    stale_ttl=float(os.getenv("ROCK_EVENTS_CACHE_STALE_TTL", "3600")),
+    max_bytes=int(os.getenv("ROCK_EVENTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+)
+
+async def seed_inventory(event_id: int):
+    """Capacidade e ingressos vendidos do evento, para carregar o estoque em memória"""
+    stats = await supabase_client.get_event_stats(event_id)
+    if not stats:
+        return None
+    return stats['max_tickets'], stats['tickets_sold']
+
+# Estoque de ingressos em memória: reservas com prazo durante o checkout
+inventory_engine = InventoryEngine(
+    seed_inventory,
+    hold_ttl=float(os.getenv("INVENTORY_HOLD_TTL", "600")),
+    max_quantity=int(os.getenv("INVENTORY_MAX_HOLD_QUANTITY", "10"))
+)
+
+async def lookup_checkin_ticket(token: str):
+    """Ingresso pelo token do QR (gravado com o prefixo TICKETMETAL: desde os IDs locais)"""
+    ticket = await supabase_client.get_ticket_by_qr_code(f"{QR_PREFIX}{token}")
+    return ticket or await supabase_client.get_ticket_by_qr_code(token)
+
+# Tokens de QR code assinados (HMAC), verificáveis sem consultar o banco
+qr_signer = QrSigner(os.getenv("QR_SIGNING_SECRET"))
+QR_TOKEN_GRACE_HOURS = float(os.getenv("QR_TOKEN_GRACE_HOURS", "24"))
+
+# Check-in na entrada: índice de QR codes em memória e gravação em lotes
+checkin_service = CheckinService(
+    supabase_client.get_event_checkin_page,
+    lookup_checkin_ticket,
+    supabase_client.mark_tickets_used,
+    batch_size=int(os.getenv("CHECKIN_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("CHECKIN_FLUSH_INTERVAL", "0.05")),
+    page_size=int(os.getenv("CHECKIN_PAGE_SIZE", "1000")),
+    verify=qr_signer.verify,
+    miss_ttl=float(os.getenv("CHECKIN_MISS_TTL", "30")),
+    max_age=float(os.getenv("CHECKIN_INDEX_MAX_AGE", "60")),
+    max_events=int(os.getenv("CHECKIN_MAX_EVENTS", "20"))
+)
+
+# Manifesto dos ingressos válidos para leitores offline
+scan_manifest_service = ScanManifestService(
+    supabase_client.get_event_checkin_page,
+    max_age=float(os.getenv("SCAN_MANIFEST_MAX_AGE", "300")),
+    max_log=int(os.getenv("SCAN_MANIFEST_MAX_LOG", "50000"))
+)
+
+# Tentativas de gravar os ingressos de uma reserva quando o número gerado já existe no banco
+TICKET_INSERT_ATTEMPTS = 3
+
+async def lease_id_worker():
+    """Troca o worker id do gerador de números de ingresso por um concedido pelo banco (sem ID_WORKER_ID fixo)"""
+    if os.getenv("ID_WORKER_ID") is not None:
+        return
+    try:
+        id_allocator.set_worker_id(await supabase_client.lease_worker_id())
+    except Exception as e:
+        print(f"Erro ao obter worker id do banco (mantendo {id_allocator.worker_id}): {e}")
+
+@app.on_event("startup")
+async def lease_ticket_worker_id():
+    """Worker id exclusivo deste processo antes do primeiro ingresso gerado"""
+    await lease_id_worker()
+
+@app.on_event("startup")
+async def warm_up_pdf_pool():
+    """Sobe os processos de renderização de PDF antes da primeira requisição"""
+    try:
+        await pdf_render_pool.warm_up()
+    except Exception as e:
+        print(f"Erro ao aquecer o pool de PDFs: {e}")
+
+@app.on_event("shutdown")
+async def close_database_pool():
+    """Fecha o pool de conexões com o banco ao encerrar o worker"""
+    # Leituras aceitas que ainda não foram gravadas
+    await checkin_service.flush()
+    await supabase_client.aclose()
+    pdf_render_pool.shutdown()
+    image_processing_pool.shutdown()
+
 # Modelos Pydantic
 class UserCreate(BaseModel):
     email: str
@@ -103,6 +240,27 @@ class EventResponse(BaseModel):
     is_active: bool
     created_at: datetime
 
+class EventFieldsResponse(BaseModel):
+    """Evento com projeção de colunas (fields=card ou lista explícita)"""
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    date: Optional[datetime] = None
+    location: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    price: Optional[float] = None
+    max_tickets: Optional[int] = None
+    image_url: Optional[str] = None
+    organizer_id: Optional[int] = None
+    sales_end_date: Optional[datetime] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
+class EventStatsBatchRequest(BaseModel):
+    event_ids: List[int]
+
 class TicketCreate(BaseModel):
     event_id: int
     user_id: int
@@ -119,6 +277,48 @@ class TicketResponse(BaseModel):
     purchased_at: datetime
     used_at: Optional[datetime]
 
+class TicketBulkCreate(BaseModel):
+    event_id: int
+    user_id: int
+    price_paid: float
+    quantity: int
+
+class HoldCreate(BaseModel):
+    event_id: int
+    user_id: int
+    quantity: int = 1
+
+class HoldConfirm(BaseModel):
+    price_paid: float
+
+class CheckinScan(BaseModel):
+    qr_code: str
+
+class CheckinResponse(BaseModel):
+    event_id: int
+    result: str
+    ticket_id: Optional[int] = None
+    used_at: Optional[str] = None
+
+class HoldResponse(BaseModel):
+    hold_id: str
+    event_id: int
+    user_id: Optional[int]
+    quantity: int
+    expires_in: float
+
+class TicketFieldsResponse(BaseModel):
+    """Ingresso com projeção de colunas (fields=card ou lista explícita)"""
+    id: Optional[int] = None
+    event_id: Optional[int] = None
+    user_id: Optional[int] = None
+    ticket_number: Optional[str] = None
+    qr_code: Optional[str] = None
+    price_paid: Optional[float] = None
+    status: Optional[str] = None
+    purchased_at: Optional[datetime] = None
+    used_at: Optional[datetime] = None
+
 # Rotas de Usuários
 @app.post("/api/users/", response_model=UserResponse)
 async def create_user(user: UserCreate):
@@ -135,6 +335,19 @@ async def create_user(user: UserCreate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Declarada antes de /api/users/{user_id} para que "batch" não seja lido como ID
+@app.get("/api/users/batch", response_model=List[UserResponse])
+async def get_users_batch(ids: str):
+    """Busca vários usuários de uma vez (ids separados por vírgula), na ordem pedida"""
+    try:
+        user_ids = parse_id_list(ids)
+        users = {user['id']: user for user in await supabase_client.get_users_by_ids(user_ids)}
+        return [UserResponse(**users[user_id]) for user_id in user_ids if user_id in users]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/users/{user_id}", response_model=UserResponse)
 async def get_user(user_id: int):
     """Busca um usuário por ID"""
@@ -199,12 +412,37 @@ async def create_event(event: EventCreate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/events/", response_model=List[EventResponse])
-async def get_events(limit: int = 50, offset: int = 0):
-    """Lista todos os eventos"""
+@app.get("/api/events/", response_model=List[EventFieldsResponse], response_model_exclude_unset=True)
+async def get_events(response: Response, limit: int = 50, offset: int = 0, cursor: Optional[str] = None, fields: str = "full"):
+    """Lista todos os eventos
+    
+    O cursor da próxima página é devolvido no header X-Next-Cursor.
+    `fields` aceita full, card ou uma lista de colunas separadas por vírgula.
+    """
     try:
-        events = await supabase_client.get_events(limit, offset)
+        columns = resolve_fields('events', fields)
+        events = await supabase_client.get_events(limit, offset, cursor, columns)
+        cursor_value = next_cursor(events, limit, 'id')
+        if cursor_value:
+            response.headers["X-Next-Cursor"] = cursor_value
+        if columns:
+            return [EventFieldsResponse(**event) for event in events]
         return [EventResponse(**event) for event in events]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Declarada antes de /api/events/{event_id} para que "batch" não seja lido como ID
+@app.get("/api/events/batch", response_model=List[EventResponse])
+async def get_events_batch(ids: str):
+    """Busca vários eventos de uma vez (ids separados por vírgula), na ordem pedida"""
+    try:
+        event_ids = parse_id_list(ids)
+        events = {event['id']: event for event in await supabase_client.get_events_by_ids(event_ids)}
+        return [EventResponse(**events[event_id]) for event_id in event_ids if event_id in events]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -220,12 +458,17 @@ async def get_event(event_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/events/organizer/{organizer_id}", response_model=List[EventResponse])
-async def get_events_by_organizer(organizer_id: int):
+@app.get("/api/events/organizer/{organizer_id}", response_model=List[EventFieldsResponse], response_model_exclude_unset=True)
+async def get_events_by_organizer(organizer_id: int, fields: str = "full"):
     """Busca eventos por organizador"""
     try:
-        events = await supabase_client.get_events_by_organizer(organizer_id)
+        columns = resolve_fields('events', fields)
+        events = await supabase_client.get_events_by_organizer(organizer_id, columns)
+        if columns:
+            return [EventFieldsResponse(**event) for event in events]
         return [EventResponse(**event) for event in events]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -237,6 +480,9 @@ async def update_event(event_id: int, event: EventCreate):
         if not result:
             raise HTTPException(status_code=404, detail="Evento não encontrado")
         
+        # max_tickets pode ter mudado
+        inventory_engine.invalidate(event_id)
+        event_report_cache.invalidate(event_id)
         return EventResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -255,11 +501,25 @@ async def delete_event(event_id: int):
 
 # Rotas para Eventos Rock (Agregador de eventos externos)
 @app.get("/api/events/rock/")
-async def get_rock_events(limit: int = 500, offset: int = 0, cidade: Optional[str] = None):
-    """Lista eventos da tabela eventos_rock (agregador de eventos externos)"""
+async def get_rock_events(response: Response, limit: int = 500, offset: int = 0, cidade: Optional[str] = None, cursor: Optional[str] = None, fields: str = "full"):
+    """Lista eventos da tabela eventos_rock (agregador de eventos externos)
+    
+    O cursor da próxima página é devolvido no header X-Next-Cursor.
+    `fields` aceita full, card ou uma lista de colunas separadas por vírgula.
+    """
     try:
-        events = await supabase_client.get_rock_events(limit, offset, cidade)
+        columns = resolve_fields('eventos_rock', fields)
+        city_key = cidade.strip().upper() if cidade else None
+        events = await rock_events_cache.get(
+            ('list', limit, offset, city_key, cursor, tuple(columns) if columns else None),
+            lambda: supabase_client.get_rock_events(limit, offset, cidade, cursor, columns)
+        )
+        cursor_value = next_cursor(events, limit, 'data_formatada', 'id')
+        if cursor_value:
+            response.headers["X-Next-Cursor"] = cursor_value
         return events
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -267,31 +527,221 @@ async def get_rock_events(limit: int = 500, offset: int = 0, cidade: Optional[st
 async def get_featured_rock_events(limit: int = 3):
     """Lista eventos em destaque da tabela eventos_rock ordenados por prioridade"""
     try:
-        events = await supabase_client.get_featured_rock_events(limit)
+        events = await rock_events_cache.get(
+            ('featured', limit),
+            lambda: supabase_client.get_featured_rock_events(limit)
+        )
+        return events
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/events/rock/search")
+async def search_rock_events(q: str, limit: int = 50, offset: int = 0, cidade: Optional[str] = None):
+    """Busca eventos rock por texto (sem diferenciar acentos) em título, artistas, local, cidade e gêneros"""
+    try:
+        events = await supabase_client.search_rock_events(q, limit, offset, cidade)
         return events
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/events/rock/slug/{slug}")
+async def get_rock_event_by_slug(slug: str):
+    """Busca um evento da tabela eventos_rock pelo slug"""
+    try:
+        event = await supabase_client.get_rock_event_by_slug(slug)
+        if not event:
+            raise HTTPException(status_code=404, detail="Evento não encontrado")
+        
+        return event
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Rotas de Ingressos
+async def insert_hold_tickets(hold: Hold, price_paid: float) -> List[dict]:
+    """Grava no banco, num único INSERT, os ingressos de uma reserva confirmada"""
+    event = await supabase_client.get_event(hold.event_id)
+    if not event:
+        raise HoldNotFoundError(f"Evento {hold.event_id} não encontrado")
+    # O QR code vale até algumas horas depois do início do evento (datas sem fuso tratadas como UTC)
+    event_date = parse_datetime(event['date'])
+    if event_date.tzinfo is None:
+        event_date = event_date.replace(tzinfo=timezone.utc)
+    expires_at = int((event_date + timedelta(hours=QR_TOKEN_GRACE_HOURS)).timestamp())
+    
+    purchased_at = datetime.utcnow()
+    for attempt in range(TICKET_INSERT_ATTEMPTS):
+        tickets_data = []
+        # Número do ingresso gerado localmente e QR code assinado com o mesmo ID
+        for ticket_id in id_allocator.next_ids(hold.quantity):
+            tickets_data.append({
+                'event_id': hold.event_id,
+                'user_id': hold.user_id,
+                'price_paid': price_paid,
+                'ticket_number': f"TM{encode_base32(ticket_id)}",
+                'qr_code': f"{QR_PREFIX}{qr_signer.sign(ticket_id, hold.event_id, expires_at)}",
+                'status': 'active',
+                'purchased_at': purchased_at
+            })
+        
+        try:
+            # O banco confere a capacidade de novo com o evento travado: o estoque em memória é por instância
+            tickets = await supabase_client.create_tickets_within_capacity(hold.event_id, tickets_data)
+            break
+        except Exception as e:
+            # Número repetido: outro processo com o mesmo worker id gerou o mesmo ID; tenta com um novo worker id
+            if attempt + 1 == TICKET_INSERT_ATTEMPTS or not supabase_client.is_unique_violation(e):
+                raise
+            await lease_id_worker()
+    
+    if not tickets:
+        raise SoldOutError(f"Ingressos esgotados para o evento {hold.event_id}")
+    if len(tickets) != hold.quantity:
+        raise HTTPException(status_code=400, detail="Erro ao criar ingressos")
+    checkin_service.add_tickets(tickets)
+    scan_manifest_service.tickets_changed(tickets)
+    return tickets
+
 @app.post("/api/tickets/", response_model=TicketResponse)
 async def create_ticket(ticket: TicketCreate):
-    """Cria um novo ingresso"""
+    """Cria um novo ingresso (compra direta: reserva e confirma na mesma chamada)"""
     try:
-        # Gerar número do ingresso e QR code
-        ticket_number = f"TM{ticket.event_id:06d}{ticket.user_id:06d}"
-        qr_code = f"TICKETMETAL:{ticket_number}"
+        hold = await inventory_engine.hold(ticket.event_id, 1, ticket.user_id)
+        try:
+            tickets = await inventory_engine.confirm(hold.hold_id, lambda h: insert_hold_tickets(h, ticket.price_paid))
+        except Exception:
+            inventory_engine.release(hold.hold_id)
+            raise
         
-        ticket_data = ticket.model_dump()
-        ticket_data['ticket_number'] = ticket_number
-        ticket_data['qr_code'] = qr_code
-        ticket_data['status'] = 'active'
-        ticket_data['purchased_at'] = datetime.utcnow()
+        return TicketResponse(**tickets[0])
+    except SoldOutError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HoldNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/tickets/bulk", response_model=List[TicketResponse])
+async def create_tickets_bulk(order: TicketBulkCreate):
+    """Cria os N ingressos de um pedido de uma vez (uma reserva e um único INSERT)"""
+    try:
+        hold = await inventory_engine.hold(order.event_id, order.quantity, order.user_id)
+        try:
+            tickets = await inventory_engine.confirm(hold.hold_id, lambda h: insert_hold_tickets(h, order.price_paid))
+        except Exception:
+            inventory_engine.release(hold.hold_id)
+            raise
         
-        result = await supabase_client.create_ticket(ticket_data)
-        if not result:
-            raise HTTPException(status_code=400, detail="Erro ao criar ingresso")
+        return [TicketResponse(**ticket) for ticket in tickets]
+    except SoldOutError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HoldNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Reservas de ingressos durante o checkout
+@app.post("/api/tickets/holds", response_model=HoldResponse)
+async def create_hold(request: HoldCreate):
+    """Reserva ingressos por tempo limitado enquanto o pagamento é processado"""
+    try:
+        hold = await inventory_engine.hold(request.event_id, request.quantity, request.user_id)
+        return HoldResponse(
+            hold_id=hold.hold_id,
+            event_id=hold.event_id,
+            user_id=hold.user_id,
+            quantity=hold.quantity,
+            expires_in=inventory_engine.hold_ttl
+        )
+    except SoldOutError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HoldNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/tickets/holds/{hold_id}/confirm", response_model=List[TicketResponse])
+async def confirm_hold(hold_id: str, request: HoldConfirm):
+    """Confirma a reserva após o pagamento aprovado e grava os ingressos"""
+    try:
+        tickets = await inventory_engine.confirm(hold_id, lambda hold: insert_hold_tickets(hold, request.price_paid))
+        return [TicketResponse(**ticket) for ticket in tickets]
+    except SoldOutError as e:
+        # Esgotou em outra instância: a reserva não tem mais como ser confirmada
+        inventory_engine.release(hold_id)
+        raise HTTPException(status_code=409, detail=str(e))
+    except HoldNotFoundError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/api/tickets/holds/{hold_id}")
+async def release_hold(hold_id: str):
+    """Libera a reserva (pagamento recusado ou checkout abandonado)"""
+    if not inventory_engine.release(hold_id):
+        raise HTTPException(status_code=404, detail="Reserva não encontrada ou expirada")
+    return {"message": "Reserva liberada com sucesso"}
+
+@app.get("/api/events/{event_id}/availability")
+async def get_event_availability(event_id: int):
+    """Capacidade, vendidos, reservados e disponíveis do evento"""
+    try:
+        return await inventory_engine.availability(event_id)
+    except HoldNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Check-in na entrada do evento
+@app.post("/api/events/{event_id}/checkin/preload")
+async def preload_checkin(event_id: int):
+    """Carrega os QR codes do evento em memória antes da abertura dos portões"""
+    try:
+        return await checkin_service.preload(event_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/tickets/verify-qr")
+async def verify_ticket_qr(scan: CheckinScan):
+    """Confere a assinatura e a validade do QR code sem consultar o banco (não diz se o ingresso já foi usado)"""
+    try:
+        signed = qr_signer.verify(normalize_qr(scan.qr_code))
+        return {"valid": True, **signed.to_dict()}
+    except InvalidQrError as e:
+        return {"valid": False, "reason": e.reason, "detail": str(e)}
+
+@app.post("/api/events/{event_id}/checkin", response_model=CheckinResponse)
+async def checkin_ticket(event_id: int, scan: CheckinScan):
+    """Valida o QR lido pelo leitor e marca o ingresso como usado (valid, already_used, cancelled, wrong_event ou invalid)"""
+    try:
+        result = await checkin_service.scan(event_id, scan.qr_code)
+        if result['result'] == VALID:
+            scan_manifest_service.ticket_removed(event_id, scan.qr_code)
+        return CheckinResponse(**result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/events/{event_id}/scan-manifest")
+async def get_scan_manifest(event_id: int, since: Optional[int] = None):
+    """Manifesto binário dos ingressos válidos para validação offline; com since, só as alterações desde essa versão"""
+    try:
+        event = await supabase_client.get_event(event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Evento não encontrado")
         
-        return TicketResponse(**result)
+        manifest, version = await scan_manifest_service.export(event_id, since)
+        return Response(
+            content=manifest,
+            media_type="application/octet-stream",
+            headers={"X-Manifest-Version": str(version), "Cache-Control": "no-store"}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -307,12 +757,17 @@ async def get_ticket(ticket_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/tickets/user/{user_id}", response_model=List[TicketResponse])
-async def get_tickets_by_user(user_id: int):
+@app.get("/api/tickets/user/{user_id}", response_model=List[TicketFieldsResponse], response_model_exclude_unset=True)
+async def get_tickets_by_user(user_id: int, fields: str = "full"):
     """Busca ingressos por usuário"""
     try:
-        tickets = await supabase_client.get_tickets_by_user(user_id)
+        columns = resolve_fields('tickets', fields)
+        tickets = await supabase_client.get_tickets_by_user(user_id, columns)
+        if columns:
+            return [TicketFieldsResponse(**ticket) for ticket in tickets]
         return [TicketResponse(**ticket) for ticket in tickets]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -333,6 +788,13 @@ async def update_ticket(ticket_id: int, ticket_data: dict):
         if not result:
             raise HTTPException(status_code=404, detail="Ingresso não encontrado")
         
+        # Um cancelamento devolve o ingresso ao estoque
+        if 'status' in ticket_data:
+            inventory_engine.invalidate(result['event_id'])
+        ticket_pdf_cache.invalidate_ticket(ticket_id)
+        if 'status' in ticket_data:
+            checkin_service.update_ticket(result)
+            scan_manifest_service.ticket_changed(result)
         return TicketResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -341,10 +803,17 @@ async def update_ticket(ticket_id: int, ticket_data: dict):
 async def delete_ticket(ticket_id: int):
     """Deleta um ingresso"""
     try:
+        ticket = await supabase_client.get_ticket(ticket_id)
         success = await supabase_client.delete_ticket(ticket_id)
         if not success:
             raise HTTPException(status_code=404, detail="Ingresso não encontrado")
         
+        if ticket:
+            inventory_engine.invalidate(ticket['event_id'])
+            checkin_service.remove_ticket(ticket)
+            scan_manifest_service.ticket_removed(ticket['event_id'], ticket['qr_code'])
+        ticket_pdf_cache.invalidate_ticket(ticket_id)
+        
         return {"message": "Ingresso deletado com sucesso"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -359,34 +828,133 @@ async def get_event_stats(event_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/events/stats/batch")
+async def get_events_stats_batch(request: EventStatsBatchRequest):
+    """Busca estatísticas de vários eventos de uma vez, indexadas pelo id do evento"""
+    try:
+        stats = await supabase_client.get_events_stats(request.event_ids)
+        return stats
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Rota para gerar PDF do ingresso
 @app.get("/api/tickets/{ticket_id}/pdf")
-async def generate_ticket_pdf(ticket_id: int):
-    """Gera PDF do ingresso"""
+async def generate_ticket_pdf(ticket_id: int, request: Request):
+    """Gera PDF do ingresso (com ETag; responde 304 se o cliente já tiver a mesma versão)"""
     try:
         ticket = await supabase_client.get_ticket(ticket_id)
         if not ticket:
             raise HTTPException(status_code=404, detail="Ingresso não encontrado")
         
-        event = await supabase_client.get_event(ticket['event_id'])
+        event, user = await asyncio.gather(
+            supabase_client.get_event(ticket['event_id']),
+            supabase_client.get_user(ticket['user_id'])
+        )
         if not event:
             raise HTTPException(status_code=404, detail="Evento não encontrado")
         
-        # Gerar PDF
-        pdf_buffer = ticket_generator.generate_ticket_pdf(
-            ticket_number=ticket['ticket_number'],
-            qr_code=ticket['qr_code'],
-            event_title=event['title'],
-            event_date=event['date'],
-            event_location=event['location'],
-            price_paid=ticket['price_paid']
+        ticket_data, event_data = build_ticket_pdf_data(ticket, event, user)
+        key = content_key(ticket_data, event_data, pdf_render_pool.mode, pdf_render_pool.qr_mode)
+        
+        # no-cache: o navegador guarda o PDF, mas revalida com If-None-Match a cada download.
+        # O ETag sai da chave, então o 304 não precisa do cache nem de renderizar
+        headers = {"ETag": make_etag(key), "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        
+        async def render():
+            # Gerar PDF num processo do pool, sem bloquear o event loop
+            pdf = await pdf_render_pool.render_ticket(ticket_data, event_data)
+            await ticket_pdf_cache.put(key, ticket_id, pdf)
+            return pdf, headers["ETag"]
+        
+        cached = await ticket_pdf_cache.get(key)
+        pdf_buffer, _ = cached or await ticket_pdf_renders.do(key, render)
+        
+        return StreamingResponse(
+            io.BytesIO(pdf_buffer),
+            media_type="application/pdf",
+            headers={**headers, "Content-Disposition": f"attachment; filename=ticket_{ticket['ticket_number']}.pdf"}
         )
+    except HTTPException:
+        raise
+    except PdfPoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Rota para gerar o relatório do evento em PDF
+@app.get("/api/events/{event_id}/report.pdf")
+async def generate_event_report_pdf(event_id: int):
+    """Gera o relatório de vendas do evento em PDF (cacheado por alguns segundos)"""
+    try:
+        async def render_report():
+            event, stats = await asyncio.gather(
+                supabase_client.get_event(event_id),
+                supabase_client.get_event_stats(event_id)
+            )
+            if not event or not stats:
+                raise LookupError("Evento não encontrado")
+            return await pdf_render_pool.render_event_report(event, stats)
+        
+        pdf_buffer = await event_report_cache.get(event_id, render_report)
         
         return StreamingResponse(
             io.BytesIO(pdf_buffer),
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=ticket_{ticket['ticket_number']}.pdf"}
+            headers={"Content-Disposition": f"attachment; filename=event_{event_id}_report.pdf"}
         )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PdfPoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Exportação de todos os ingressos do evento (bilheteria / retirada no local)
+@app.get("/api/events/{event_id}/tickets/export")
+async def export_event_tickets(event_id: int, format: str = "zip"):
+    """Exporta os ingressos válidos do evento: zip (um PDF por ingresso, enviado em streaming) ou pdf (documento único)"""
+    try:
+        if format not in ("zip", "pdf"):
+            raise HTTPException(status_code=400, detail="format deve ser zip ou pdf")
+        
+        event = await supabase_client.get_event(event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Evento não encontrado")
+        
+        # A exportação entra na fila uma vez; depois de admitida não é recusada no meio
+        # (seus lotes esperam uma das vagas de exportação do pool)
+        pdf_render_pool.admit()
+        page_size = int(os.getenv("EXPORT_PAGE_SIZE", "200"))
+        
+        if format == "zip":
+            return StreamingResponse(
+                stream_tickets_zip(
+                    supabase_client, pdf_render_pool, event, page_size,
+                    batch_size=int(os.getenv("EXPORT_BATCH_SIZE", "25"))
+                ),
+                media_type="application/zip",
+                headers={"Content-Disposition": f"attachment; filename=event_{event_id}_tickets.zip"}
+            )
+        
+        pdf_buffer = await render_tickets_pdf(
+            supabase_client, pdf_render_pool, event, page_size,
+            max_tickets=int(os.getenv("EXPORT_PDF_MAX_TICKETS", "5000"))
+        )
+        return StreamingResponse(
+            io.BytesIO(pdf_buffer),
+            media_type="application/pdf",
+            headers={"Content-Disposition": f"attachment; filename=event_{event_id}_tickets.pdf"}
+        )
+    except HTTPException:
+        raise
+    except PdfPoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -410,6 +978,23 @@ async def payment_webhook(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Rota de métricas do cache
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Retorna contadores de hit/miss dos caches em memória, do agrupamento de buscas por ID e das leituras coalescidas"""
+    return {
+        "eventos_rock": rock_events_cache.stats(),
+        "relatorios_evento": event_report_cache.stats(),
+        "batch_loaders": [supabase_client.event_loader.stats(), supabase_client.user_loader.stats()],
+        "single_flight": supabase_client.flights.stats(),
+        "inventory": inventory_engine.stats(),
+        "checkin": checkin_service.stats(),
+        "scan_manifest": scan_manifest_service.stats(),
+        "pdf_pool": pdf_render_pool.stats(),
+        "image_pool": image_processing_pool.stats(),
+        "ticket_pdf": {**ticket_pdf_cache.stats(), "single_flight": ticket_pdf_renders.stats()},
+    }
+
 # Rota de saúde
 @app.get("/api/health")
 async def health_check():
@@ -417,44 +1002,89 @@ async def health_check():
     return {"status": "ok", "message": "TicketMetal API está funcionando"}
 
 # Rotas para Upload de Imagens
-@app.post("/api/upload/image", tags=["Upload"])
-async def upload_image(file: UploadFile = File(...)):
-    """Faz upload de uma imagem para o Google Cloud Storage"""
+# O corpo é lido pela própria rota (receive_file), então o formulário é descrito aqui para a documentação
+UPLOAD_IMAGE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+@app.post("/api/upload/image", tags=["Upload"], openapi_extra=UPLOAD_IMAGE_BODY)
+async def upload_image(request: Request):
+    """
+    Faz upload de uma imagem para o Google Cloud Storage.
+    
+    A imagem é decodificada uma vez e enviada em três tamanhos (hero, card,
+    thumbnail), cada um em JPEG e WebP; `variants` traz as URLs de cada um
+    e `image_url` continua sendo a variante hero em JPEG.
+    
+    O upload reserva uma vaga no pool de imagens antes de ler o corpo (503
+    se estiver cheio) e o corpo multipart é lido direto do socket para um
+    diretório temporário, recusado pelo Content-Length, assim que passa do
+    limite ou se os primeiros bytes não forem de uma imagem. O worker lê e
+    grava as variantes nesse diretório e o envio ao GCS é feito em blocos.
+    A memória por upload fica limitada ao bitmap decodificado no worker.
+    """
     if not GCP_AVAILABLE:
         raise HTTPException(status_code=503, detail="Serviço de upload não disponível")
     
+    tmp_dir = None
     try:
-        # Verificar se é uma imagem
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="Arquivo deve ser uma imagem")
-        
-        # Verificar tamanho do arquivo (máximo 10MB)
-        file_data = await file.read()
-        if len(file_data) > 10 * 1024 * 1024:  # 10MB
-            raise HTTPException(status_code=400, detail="Arquivo muito grande. Máximo 10MB")
-        
-        # Fazer upload para GCP
-        image_url = await gcp_storage_service.upload_image(
-            file_data=file_data,
-            original_filename=file.filename,
-            content_type=file.content_type
-        )
+        # A vaga vale do recebimento do arquivo até o fim do envio: fila cheia recusa antes de ler o corpo
+        with image_processing_pool.reserve():
+            tmp_dir = tempfile.mkdtemp(prefix="ticketmetal-upload-", dir=UPLOAD_TMP_DIR)
+            source_path = os.path.join(tmp_dir, "original")
+            
+            # Verificar tipo (pelos primeiros bytes) e tamanho do arquivo durante a leitura
+            received = await receive_file(request, "file", source_path, UPLOAD_MAX_BYTES, check_head=require_image_type)
+            
+            # Gerar as variantes no pool de processos
+            variants = await image_processing_pool.process(
+                source_path,
+                output_prefix=os.path.join(tmp_dir, "variant"),
+                reserved=True
+            )
+            
+            # Fazer upload para GCP
+            manifest = await gcp_storage_service.upload_image_variants(
+                variants=variants,
+                original_filename=received.filename
+            )
         
-        if not image_url:
+        if not manifest:
             raise HTTPException(status_code=500, detail="Erro ao fazer upload da imagem")
         
         return {
             "success": True,
-            "image_url": image_url,
-            "filename": file.filename,
-            "size": len(file_data)
+            "image_url": manifest['hero']['jpeg'],
+            "variants": manifest,
+            "filename": received.filename,
+            "size": received.size
         }
         
     except HTTPException:
         raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImagePoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Erro no upload: {e}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    finally:
+        if tmp_dir:
+            await asyncio.to_thread(shutil.rmtree, tmp_dir, True)
 
 @app.delete("/api/upload/image", tags=["Upload"])
 async def delete_image(image_url: str):
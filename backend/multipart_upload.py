@@ -0,0 +1,125 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+# Margem do corpo multipart além do arquivo: delimitadores, cabeçalhos das partes e campos pequenos
+MULTIPART_OVERHEAD = 64 * 1024
+# Bytes do começo do arquivo passados para check_head (assinatura do formato)
+HEAD_SIZE = 16
+
+class UploadTooLargeError(ValueError):
+    """Corpo da requisição ou arquivo maior que o limite"""
+
+class ReceivedFile:
+    __slots__ = ('filename', 'size', 'content_type')
+
+    def __init__(self, filename: str, size: int, content_type: Any):
+        self.filename = filename
+        self.size = size
+        self.content_type = content_type
+
+def _too_large(max_bytes: int) -> UploadTooLargeError:
+    return UploadTooLargeError(f"Arquivo muito grande. Máximo {max_bytes // (1024 * 1024)}MB")
+
+async def receive_file(request: Request, field_name: str, path: str, max_bytes: int, check_head: Optional[Callable[[bytes], Any]] = None) -> ReceivedFile:
+    """
+    Recebe o campo field_name de um corpo multipart/form-data direto do
+    socket (request.stream()) e grava em path, sem passar pelo parser de
+    formulários do Starlette, que guarda o corpo inteiro antes de chamar a
+    rota. Em memória fica no máximo um bloco da rede.
+
+    Lança UploadTooLargeError antes de ler qualquer byte quando o
+    Content-Length passa de max_bytes (mais a margem do multipart), e
+    durante a leitura assim que o corpo ou o arquivo passam do limite.
+    check_head recebe os primeiros HEAD_SIZE bytes do arquivo assim que
+    chegam e deve lançar ValueError para recusá-lo; o que ele retornar vai
+    em ReceivedFile.content_type.
+    """
+    content_type, options = parse_options_header(request.headers.get('content-type', ''))
+    boundary = options.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise ValueError("Envie o arquivo como multipart/form-data")
+
+    body_limit = max_bytes + MULTIPART_OVERHEAD
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > body_limit:
+        raise _too_large(max_bytes)
+
+    part: Dict[str, Any] = {}
+    headers: Dict[bytes, bytes] = {}
+    chunks: List[bytes] = []
+    field = field_name.encode()
+
+    def on_part_begin():
+        headers.clear()
+        part['header_field'] = b''
+        part['header_value'] = b''
+        part['target'] = False
+
+    def on_header_field(data: bytes, start: int, end: int):
+        part['header_field'] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        part['header_value'] += data[start:end]
+
+    def on_header_end():
+        headers[part['header_field'].lower()] = part['header_value']
+        part['header_field'] = b''
+        part['header_value'] = b''
+
+    def on_headers_finished():
+        _, params = parse_options_header(headers.get(b'content-disposition', b''))
+        if params.get(b'name') == field and 'filename' not in part:
+            part['target'] = True
+            part['filename'] = params.get(b'filename', b'').decode('utf-8', 'replace')
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if part['target']:
+            chunks.append(bytes(data[start:end]))
+
+    def on_part_end():
+        part['target'] = False
+
+    parser = MultipartParser(boundary, {
+        'on_part_begin': on_part_begin,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+        'on_part_data': on_part_data,
+        'on_part_end': on_part_end,
+    })
+
+    received = 0
+    size = 0
+    head = b''
+    detected = None
+    with open(path, 'wb') as f:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise _too_large(max_bytes)
+            parser.write(chunk)
+            if not chunks:
+                continue
+
+            data = b''.join(chunks)
+            chunks.clear()
+            size += len(data)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            if check_head is not None and len(head) < HEAD_SIZE:
+                head += data[:HEAD_SIZE - len(head)]
+                if len(head) == HEAD_SIZE:
+                    detected = check_head(head)
+            await asyncio.to_thread(f.write, data)
+        parser.finalize()
+
+    if 'filename' not in part:
+        raise ValueError(f"Campo {field_name} não enviado")
+    if not size:
+        raise ValueError("Arquivo vazio")
+    if check_head is not None and len(head) < HEAD_SIZE:
+        detected = check_head(head)
+    return ReceivedFile(part['filename'], size, detected)
@@ -0,0 +1,26 @@
+import json
+import base64
+from typing import Any, Dict, List, Optional
+
+def encode_cursor(*values: Any) -> str:
+    """Gera um cursor opaco a partir dos valores da chave de ordenação"""
+    raw = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decodifica um cursor gerado por encode_cursor; lança ValueError se inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Cursor inválido")
+    return values
+
+def next_cursor(rows: List[Dict[str, Any]], limit: int, *keys: str) -> Optional[str]:
+    """Cursor da próxima página, ou None quando a página veio incompleta"""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(*(last.get(key) for key in keys))
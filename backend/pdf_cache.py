@@ -0,0 +1,245 @@
+import os
+import json
+import hashlib
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Versão do layout do ingresso: mudar quando o desenho do PDF mudar, para
+# que os arquivos já gravados em disco deixem de ser encontrados
+PDF_LAYOUT_VERSION = 2
+
+TICKET_FIELDS = ('ticket_number', 'qr_code', 'price_paid', 'purchased_at', 'buyer_name', 'status')
+EVENT_FIELDS = ('title', 'date', 'location', 'address', 'city', 'state')
+
+def content_key(ticket_data: Dict[str, Any], event_data: Dict[str, Any], mode: str, qr_mode: str) -> str:
+    """Hash dos campos que entram no PDF do ingresso (e do modo de renderização)"""
+    payload = {
+        'version': PDF_LAYOUT_VERSION,
+        'mode': mode,
+        'qr_mode': qr_mode,
+        'ticket': {field: ticket_data.get(field) for field in TICKET_FIELDS},
+        'event': {field: event_data.get(field) for field in EVENT_FIELDS},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+def make_etag(key: str) -> str:
+    """
+    ETag fraco derivado da content_key. Dois PDFs renderizados com a mesma
+    chave não são idênticos byte a byte (o rodapé leva a hora da geração),
+    mas têm o mesmo conteúdo, então o ETag não muda entre renderizações,
+    reinícios ou instâncias.
+    """
+    return f'W/"{key[:32]}"'
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith('W/') else etag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca (RFC 9110), a usada em If-None-Match"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or _opaque(etag) in (_opaque(value) for value in candidates)
+
+class PdfCache:
+    """
+    Cache endereçado por conteúdo dos PDFs de ingresso, em dois níveis.
+
+    A chave é o hash dos campos que entram no PDF (content_key), então
+    qualquer mudança no ingresso, no evento ou no nome do comprador gera
+    outra chave. O nível em memória guarda os PDFs mais usados até
+    max_bytes; o nível em disco (disk_dir, opcional) guarda até
+    disk_max_bytes e sobrevive a reinícios. Os dois removem o menos usado
+    primeiro (LRU). Um acerto em disco é promovido para a memória.
+
+    O ETag vem da chave (make_etag), não dos bytes: a rota pode responder
+    304 sem consultar o cache nem renderizar. _ticket_keys só guarda
+    ingressos cuja chave ainda está em algum dos níveis; quando a entrada
+    sai da memória e do disco, o ingresso sai junto.
+    """
+
+    def __init__(self, name: str, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None, disk_max_bytes: int = 512 * 1024 * 1024):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        # Chave atual de cada ingresso, para invalidar quando o ingresso muda
+        self._ticket_keys: Dict[int, str] = {}
+        self._key_tickets: Dict[str, int] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.errors = 0
+
+        if self.disk_dir:
+            self._scan_disk()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pdf")
+
+    def _scan_disk(self):
+        """Recupera o índice do disco, do arquivo menos recente para o mais recente"""
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            files = []
+            for entry in os.scandir(self.disk_dir):
+                if entry.is_file() and entry.name.endswith('.pdf'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            for _, key, size in sorted(files):
+                self._disk[key] = size
+                self._disk_bytes += size
+            self._evict_disk()
+        except Exception as e:
+            print(f"Erro ao carregar cache de PDFs em disco ({self.disk_dir}): {e}")
+            self.disk_dir = None
+
+    def _store_memory(self, key: str, pdf: bytes):
+        self._discard_memory(key)
+        if len(pdf) > self.max_bytes:
+            return
+        self._memory[key] = pdf
+        self._memory_bytes += len(pdf)
+        while self._memory_bytes > self.max_bytes:
+            evicted_key, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+            self._release(evicted_key)
+
+    def _discard_memory(self, key: str):
+        pdf = self._memory.pop(key, None)
+        if pdf is not None:
+            self._memory_bytes -= len(pdf)
+
+    def _release(self, key: str):
+        """Esquece o ingresso da chave quando ela não está mais em nenhum nível"""
+        if key in self._memory or key in self._disk:
+            return
+        ticket_id = self._key_tickets.pop(key, None)
+        if ticket_id is not None and self._ticket_keys.get(ticket_id) == key:
+            del self._ticket_keys[ticket_id]
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        with open(path, 'rb') as f:
+            pdf = f.read()
+        os.utime(path)
+        return pdf
+
+    def _write_disk(self, key: str, pdf: bytes):
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(pdf)
+        os.replace(temp_path, path)
+
+    def _remove_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            key = next(iter(self._disk))
+            self._remove_disk(key)
+            self.disk_evictions += 1
+            self._release(key)
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """(pdf, etag) da chave, ou None"""
+        pdf = self._memory.get(key)
+        if pdf is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return pdf, make_etag(key)
+
+        if self.disk_dir and key in self._disk:
+            try:
+                pdf = await asyncio.to_thread(self._read_disk, key)
+            except FileNotFoundError:
+                # Removido por outro worker que compartilha o diretório
+                self._disk.pop(key, None)
+                self._release(key)
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro ao ler PDF do cache em disco: {e}")
+            else:
+                self._disk.move_to_end(key)
+                self.disk_hits += 1
+                self._store_memory(key, pdf)
+                return pdf, make_etag(key)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, ticket_id: int, pdf: bytes) -> str:
+        """Guarda o PDF nos dois níveis e retorna o ETag"""
+        previous = self._ticket_keys.get(ticket_id)
+        if previous is not None and previous != key:
+            self._drop(previous)
+        self._ticket_keys[ticket_id] = key
+        self._key_tickets[key] = ticket_id
+
+        self._store_memory(key, pdf)
+
+        if self.disk_dir and key not in self._disk:
+            try:
+                await asyncio.to_thread(self._write_disk, key, pdf)
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro ao gravar PDF no cache em disco: {e}")
+            else:
+                self._disk[key] = len(pdf)
+                self._disk_bytes += len(pdf)
+                self._evict_disk()
+        # PDF maior que os dois níveis: não fica guardado, o ingresso também não
+        self._release(key)
+        return make_etag(key)
+
+    def _drop(self, key: str):
+        self._discard_memory(key)
+        if self.disk_dir:
+            self._remove_disk(key)
+        self._release(key)
+
+    def invalidate_ticket(self, ticket_id: int):
+        """Remove o PDF guardado do ingresso (chamado quando o ingresso é alterado ou removido)"""
+        key = self._ticket_keys.pop(ticket_id, None)
+        if key is not None:
+            self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'name': self.name,
+            'entries': len(self._memory),
+            'tracked_tickets': len(self._ticket_keys),
+            'bytes': self._memory_bytes,
+            'max_bytes': self.max_bytes,
+            'disk_dir': self.disk_dir,
+            'disk_entries': len(self._disk),
+            'disk_bytes': self._disk_bytes,
+            'disk_max_bytes': self.disk_max_bytes,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'disk_evictions': self.disk_evictions,
+            'errors': self.errors,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0
+        }
@@ -0,0 +1,214 @@
+import math
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class PdfPoolSaturatedError(Exception):
+    """Fila de renderização cheia; o cliente deve tentar de novo após retry_after segundos"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Geração de PDF sobrecarregada, tente novamente em {retry_after}s")
+        self.retry_after = retry_after
+
+# Gerador do processo worker: criado uma vez no initializer, com os estilos já montados
+_generator = None
+
+def _init_worker(qr_mode: str):
+    global _generator
+    from reportlab import rl_config
+    from ticket_generator import TicketGenerator
+    # Streams comprimidos em binário: o PDF só trafega por HTTP, a codificação ASCII85 é custo à toa
+    rl_config.useA85 = 0
+    _generator = TicketGenerator(qr_mode)
+
+def _warm_up() -> bool:
+    return _generator is not None
+
+def _render_ticket(ticket_data: Dict[str, Any], event_data: Dict[str, Any], mode: str) -> bytes:
+    if mode == 'template':
+        return _generator.create_ticket_pdf_fast(ticket_data, event_data)
+    return _generator.create_ticket_pdf(ticket_data, event_data)
+
+def _render_tickets(tickets_data: List[Dict[str, Any]], event_data: Dict[str, Any], mode: str) -> List[bytes]:
+    return [_render_ticket(ticket_data, event_data, mode) for ticket_data in tickets_data]
+
+def _render_tickets_document(tickets_data: List[Dict[str, Any]], event_data: Dict[str, Any]) -> bytes:
+    return _generator.create_tickets_pdf_fast(tickets_data, event_data)
+
+def _render_event_report(event_data: Dict[str, Any], stats: Dict[str, Any]) -> bytes:
+    return _generator.create_event_report_pdf(event_data, stats)
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """Datas do banco chegam como ISO 8601 (PostgREST/asyncpg); o ReportLab precisa de datetime"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+def build_ticket_pdf_data(ticket: Dict[str, Any], event: Dict[str, Any], user: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Monta os dicionários esperados por TicketGenerator.create_ticket_pdf"""
+    ticket_data = {
+        **ticket,
+        'purchased_at': parse_datetime(ticket.get('purchased_at')) or datetime.utcnow(),
+        'buyer_name': (user or {}).get('name') or (user or {}).get('email') or '-',
+    }
+    event_data = {
+        **event,
+        'date': parse_datetime(event['date']),
+        'address': event.get('address') or '',
+        'city': event.get('city') or '',
+        'state': event.get('state') or '',
+    }
+    return ticket_data, event_data
+
+class PdfRenderPool:
+    """
+    Renderização de PDFs num ProcessPoolExecutor, fora do event loop.
+
+    Os processos são criados com o contexto spawn (seguro com as threads do
+    uvicorn) e aquecidos no initializer: cada um monta o TicketGenerator e
+    seus estilos uma única vez. A fila é limitada a max_pending renderizações
+    (em execução + aguardando); acima disso render_* lança
+    PdfPoolSaturatedError com a estimativa de espera para o Retry-After.
+
+    mode escolhe a renderização do ingresso: 'template' (layout do evento
+    pré-compilado, só os campos do ingresso são desenhados) ou 'story'
+    (documento platypus completo a cada ingresso). qr_mode escolhe como o
+    QR Code é desenhado no modo template: 'vector' ou 'png'.
+
+    Lotes de exportação (admitted=True) não passam pelo limite de
+    max_pending, para não serem recusados no meio do streaming: esperam
+    por uma das export_slots vagas (padrão: max_workers) antes de entrar na
+    fila. Assim, qualquer número de exportações simultâneas ocupa no máximo
+    export_slots posições, e o resto da fila fica para os PDFs avulsos.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 16, mode: str = 'template', qr_mode: str = 'vector', export_slots: Optional[int] = None):
+        if mode not in ('template', 'story'):
+            raise ValueError(f"Modo de renderização inválido: {mode} (use template ou story)")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.mode = mode
+        self.qr_mode = qr_mode
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.export_slots = export_slots or max_workers
+        self._export_slots = asyncio.Semaphore(self.export_slots)
+        self._export_waiting = 0
+        # Média móvel do tempo de renderização, para estimar o Retry-After
+        self._avg_seconds = 0.05
+
+        self.rendered = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.qr_mode,)
+            )
+        return self._executor
+
+    async def warm_up(self):
+        """Sobe todos os processos antes da primeira requisição"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_up) for _ in range(self.max_workers)))
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._pending * self._avg_seconds / self.max_workers))
+
+    def admit(self):
+        """Lança PdfPoolSaturatedError se a fila estiver cheia"""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PdfPoolSaturatedError(self.retry_after())
+
+    async def _submit(self, fn: Callable, *args, admitted: bool = False) -> Any:
+        if admitted:
+            # Exportações já admitidas não são recusadas no meio do streaming: esperam uma vaga
+            self._export_waiting += 1
+            try:
+                await self._export_slots.acquire()
+            finally:
+                self._export_waiting -= 1
+            try:
+                return await self._run(fn, *args, admitted=True)
+            finally:
+                self._export_slots.release()
+
+        self.admit()
+        return await self._run(fn, *args)
+
+    async def _run(self, fn: Callable, *args, admitted: bool = False) -> Any:
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                result = await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                # Um worker morreu (ex.: falta de memória): recria o pool e tenta uma vez
+                self._discard_broken(executor)
+                result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            self.rendered += 1
+            if not admitted:
+                # Lotes de exportação distorceriam a média usada no Retry-After
+                self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.perf_counter() - started)
+            return result
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._pending -= 1
+
+    async def render_ticket(self, ticket_data: Dict[str, Any], event_data: Dict[str, Any]) -> bytes:
+        return await self._submit(_render_ticket, ticket_data, event_data, self.mode)
+
+    async def render_tickets(self, tickets_data: List[Dict[str, Any]], event_data: Dict[str, Any], admitted: bool = False) -> List[bytes]:
+        """Um PDF por ingresso, renderizados em lote num único worker"""
+        return await self._submit(_render_tickets, tickets_data, event_data, self.mode, admitted=admitted)
+
+    async def render_tickets_document(self, tickets_data: List[Dict[str, Any]], event_data: Dict[str, Any], admitted: bool = False) -> bytes:
+        """Um único PDF com uma página por ingresso (layout do evento compartilhado entre as páginas)"""
+        return await self._submit(_render_tickets_document, tickets_data, event_data, admitted=admitted)
+
+    async def render_event_report(self, event_data: Dict[str, Any], stats: Dict[str, Any]) -> bytes:
+        return await self._submit(_render_event_report, event_data, stats)
+
+    def _discard_broken(self, executor: ProcessPoolExecutor):
+        """
+        Descarta o pool quebrado. Todas as chamadas que estavam nele falham
+        juntas: só a primeira o descarta, as outras já encontram o pool novo
+        (e não podem encerrá-lo, o que cancelaria as novas tentativas).
+        """
+        if self._executor is executor:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "mode": self.mode,
+            "qr_mode": self.qr_mode,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "export_slots": self.export_slots,
+            "export_waiting": self._export_waiting,
+            "rendered": self.rendered,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "avg_render_ms": round(self._avg_seconds * 1000, 1),
+        }
@@ -0,0 +1,61 @@
+import re
+from typing import Dict, List, Optional
+
+# Colunas devolvidas no modo "card" (listagens), sem textos longos como descrições
+CARD_FIELDS: Dict[str, List[str]] = {
+    'events': [
+        'id', 'title', 'date', 'location', 'city', 'state', 'price',
+        'max_tickets', 'image_url', 'organizer_id', 'is_active'
+    ],
+    'eventos_rock': [
+        'id', 'slug', 'titulo', 'data_formatada', 'hora', 'nome_local', 'cidade', 'estado',
+        'imagem', 'preco_min', 'preco_max', 'evento_gratuito', 'artistas', 'generos',
+        'link', 'link_compra', 'prioridade'
+    ],
+    'tickets': [
+        'id', 'event_id', 'user_id', 'ticket_number', 'qr_code', 'price_paid',
+        'status', 'purchased_at', 'used_at'
+    ],
+}
+
+# Colunas sempre incluídas: chaves da paginação por cursor
+REQUIRED_FIELDS: Dict[str, List[str]] = {
+    'events': ['id'],
+    'eventos_rock': ['id', 'data_formatada'],
+    'tickets': ['id'],
+}
+
+# Colunas que podem ser pedidas numa lista explícita: as que a API expõe de cada tabela
+# (eventos_rock é criada pelo agregador; aqui ficam as colunas usadas pelo front)
+ALLOWED_FIELDS: Dict[str, List[str]] = {
+    'events': CARD_FIELDS['events'] + ['description', 'address', 'sales_end_date', 'created_at'],
+    'eventos_rock': CARD_FIELDS['eventos_rock'] + ['descricao', 'endereco', 'fonte'],
+    'tickets': list(CARD_FIELDS['tickets']),
+}
+
+COLUMN_NAME = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+def resolve_fields(table: str, fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Converte o parâmetro `fields` em lista de colunas.
+
+    'full' (ou vazio) devolve None, que significa todas as colunas; 'card'
+    devolve o conjunto enxuto da tabela; qualquer outro valor é tratado como
+    lista de colunas separadas por vírgula, aceitas só se estiverem em
+    ALLOWED_FIELDS da tabela. Lança ValueError se inválido.
+    """
+    if not fields or fields == 'full':
+        return None
+    if fields == 'card':
+        return list(CARD_FIELDS[table])
+
+    columns = [column.strip() for column in fields.split(',') if column.strip()]
+    for column in columns:
+        if not COLUMN_NAME.match(column):
+            raise ValueError(f"Campo inválido: {column}")
+        if column not in ALLOWED_FIELDS[table]:
+            raise ValueError(f"Campo desconhecido: {column} (disponíveis: {', '.join(ALLOWED_FIELDS[table])})")
+    for column in reversed(REQUIRED_FIELDS[table]):
+        if column not in columns:
+            columns.insert(0, column)
+    return columns
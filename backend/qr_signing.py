@@ -0,0 +1,92 @@
+import hmac
+import time
+import struct
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+from id_allocator import encode_base32, decode_base32, ALPHABET
+
+# Prefixo do conteúdo do QR code (gravado também no qr_code do banco)
+QR_PREFIX = "TICKETMETAL:"
+
+TOKEN_VERSION = 1
+SIGNATURE_BYTES = 10  # 80 bits de HMAC-SHA256
+
+# versão, id do ingresso (snowflake), id do evento, expira em (segundos unix)
+PAYLOAD = struct.Struct('>BQII')
+TOKEN_BYTES = PAYLOAD.size + SIGNATURE_BYTES
+TOKEN_LENGTH = (TOKEN_BYTES * 8 + 4) // 5  # em base32
+
+class InvalidQrError(ValueError):
+    """QR code malformado, com assinatura inválida ou expirado"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+class SignedTicket:
+    __slots__ = ('ticket_id', 'event_id', 'expires_at')
+
+    def __init__(self, ticket_id: int, event_id: int, expires_at: int):
+        self.ticket_id = ticket_id
+        self.event_id = event_id
+        self.expires_at = expires_at
+
+    @property
+    def ticket_number(self) -> str:
+        return f"TM{encode_base32(self.ticket_id)}"
+
+    def to_dict(self) -> dict:
+        return {
+            'ticket_number': self.ticket_number,
+            'event_id': self.event_id,
+            'expires_at': datetime.fromtimestamp(self.expires_at, tz=timezone.utc).isoformat(),
+        }
+
+def is_signed_token(token: str) -> bool:
+    """Tokens assinados têm tamanho fixo; os anteriores (id + aleatório) são mais curtos"""
+    return len(token) == TOKEN_LENGTH and all(char in ALPHABET for char in token)
+
+class QrSigner:
+    """
+    Tokens de QR code autocontidos, verificáveis sem consultar o banco.
+
+    O token carrega o ID do ingresso (o mesmo ID snowflake do número do
+    ingresso, conhecido antes do INSERT), o id do evento e a data de
+    expiração, seguidos de um HMAC-SHA256 truncado em 80 bits, tudo em base32
+    de Crockford (44 caracteres, modo alfanumérico do QR). Qualquer worker
+    ou leitor com o segredo valida a autenticidade em microssegundos; o
+    banco só é necessário para saber se o ingresso já foi usado.
+    """
+
+    def __init__(self, secret: Optional[str]):
+        if not secret:
+            raise ValueError("QR_SIGNING_SECRET não configurado")
+        self._key = secret.encode()
+
+    def _signature(self, payload: bytes) -> bytes:
+        return hmac.new(self._key, payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+    def sign(self, ticket_id: int, event_id: int, expires_at: int) -> str:
+        payload = PAYLOAD.pack(TOKEN_VERSION, ticket_id, event_id, expires_at)
+        value = int.from_bytes(payload + self._signature(payload), 'big')
+        return encode_base32(value, TOKEN_LENGTH)
+
+    def verify(self, token: str, now: Optional[float] = None) -> SignedTicket:
+        """Valida o token (sem o prefixo TICKETMETAL:); lança InvalidQrError"""
+        if not is_signed_token(token):
+            raise InvalidQrError('malformed', "QR code em formato desconhecido")
+        value = decode_base32(token)
+        if value >> (TOKEN_BYTES * 8):
+            raise InvalidQrError('malformed', "QR code em formato desconhecido")
+        raw = value.to_bytes(TOKEN_BYTES, 'big')
+        payload, signature = raw[:PAYLOAD.size], raw[PAYLOAD.size:]
+        if not hmac.compare_digest(signature, self._signature(payload)):
+            raise InvalidQrError('signature', "Assinatura do QR code inválida")
+
+        version, ticket_id, event_id, expires_at = PAYLOAD.unpack(payload)
+        if version != TOKEN_VERSION:
+            raise InvalidQrError('malformed', "Versão do QR code não suportada")
+        if expires_at < (time.time() if now is None else now):
+            raise InvalidQrError('expired', "QR code expirado")
+        return SignedTicket(ticket_id, event_id, expires_at)
@@ -0,0 +1,215 @@
+import re
+import time
+import bisect
+import asyncio
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from pagination import next_cursor
+
+# Campos pesquisáveis e seus pesos no ranking da busca
+SEARCH_FIELDS = {
+    'titulo': 3.0,
+    'artistas': 3.0,
+    'nome_local': 2.0,
+    'cidade': 1.5,
+    'generos': 1.0,
+}
+
+def fold_text(text: Any) -> str:
+    """Remove acentos e caixa: 'SÃO PAULO' e 'Sao Paulo' viram 'sao paulo'"""
+    if text is None:
+        return ''
+    if isinstance(text, (list, tuple)):
+        text = ' '.join(str(item) for item in text)
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+def tokenize(text: Any) -> List[str]:
+    return re.findall(r'[a-z0-9]+', fold_text(text))
+
+def parse_event_date(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+class RockEventIndex:
+    """
+    Índice em memória dos eventos da tabela eventos_rock.
+
+    Mantém o mapa slug -> linha e um índice invertido com os termos sem
+    acento de titulo, artistas, nome_local, cidade e generos. É alimentado
+    de forma incremental: toda leitura de eventos_rock feita pelo cliente
+    passa pelo índice, e um aquecimento periódico percorre os eventos
+    futuros em páginas, mesclando as linhas e descartando as que saíram.
+    """
+
+    def __init__(self, refresh_interval: float = 600, page_size: int = 1000, retry_backoff: float = 5):
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        self.retry_backoff = retry_backoff
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.by_slug: Dict[str, str] = {}
+        # Momento da última carga completa bem-sucedida (None: índice nunca carregado)
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[BaseException] = None
+        self._retry_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        # Índice invertido: termo -> {chave do evento: peso}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_dates: Dict[str, Optional[datetime]] = {}
+        self._doc_cities: Dict[str, str] = {}
+        self._sorted_terms: Optional[List[str]] = None
+
+    def _key(self, row: Dict[str, Any]) -> Optional[str]:
+        key = row.get('id') or row.get('slug')
+        return str(key) if key is not None else None
+
+    def _remove(self, key: str):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        if row.get('slug') and self.by_slug.get(row['slug']) == key:
+            del self.by_slug[row['slug']]
+        for term in self._doc_terms.pop(key, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+                    self._sorted_terms = None
+        self._doc_dates.pop(key, None)
+        self._doc_cities.pop(key, None)
+
+    def add(self, rows: List[Dict[str, Any]]):
+        """Insere ou atualiza linhas no índice"""
+        for row in rows:
+            key = self._key(row)
+            if key is None:
+                continue
+            self._remove(key)
+            self.rows[key] = row
+            if row.get('slug'):
+                self.by_slug[row['slug']] = key
+
+            terms: Dict[str, float] = {}
+            for field, weight in SEARCH_FIELDS.items():
+                for term in tokenize(row.get(field)):
+                    terms[term] = max(terms.get(term, 0), weight)
+            for term, weight in terms.items():
+                if term not in self._postings:
+                    self._postings[term] = {}
+                    self._sorted_terms = None
+                self._postings[term][key] = weight
+            self._doc_terms[key] = set(terms)
+            self._doc_dates[key] = parse_event_date(row.get('data_formatada'))
+            self._doc_cities[key] = fold_text(row.get('cidade'))
+
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        key = self.by_slug.get(slug)
+        return self.rows.get(key) if key is not None else None
+
+    def _matching(self, term: str) -> Dict[str, float]:
+        """Pontuação por evento para um termo: match exato vale o peso, prefixo vale metade"""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        scores: Dict[str, float] = {}
+        start = bisect.bisect_left(self._sorted_terms, term)
+        for indexed in self._sorted_terms[start:]:
+            if not indexed.startswith(term):
+                break
+            factor = 1.0 if indexed == term else 0.5
+            for key, weight in self._postings[indexed].items():
+                scores[key] = max(scores.get(key, 0), weight * factor)
+        return scores
+
+    def search(self, query: str, limit: int = 50, offset: int = 0, city: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Busca eventos futuros que contenham todos os termos (ou prefixos) da consulta, por relevância"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores: Optional[Dict[str, float]] = None
+        for term in terms:
+            matches = self._matching(term)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {key: score + matches[key] for key, score in scores.items() if key in matches}
+            if not scores:
+                return []
+
+        now = datetime.now(timezone.utc)
+        city_folded = fold_text(city).strip() if city else None
+        ranked: List[Tuple[float, datetime, str]] = []
+        for key, score in scores.items():
+            event_date = self._doc_dates.get(key)
+            if event_date is None or event_date < now:
+                continue
+            if city_folded and city_folded not in self._doc_cities.get(key, ''):
+                continue
+            ranked.append((-score, event_date, key))
+        ranked.sort()
+        return [self.rows[key] for _, _, key in ranked[offset:offset + limit]]
+
+    def is_stale(self) -> bool:
+        return self.last_refresh is None or time.monotonic() - self.last_refresh > self.refresh_interval
+
+    async def refresh(self, fetch_page: Callable[[int, Optional[str]], Awaitable[List[Dict[str, Any]]]]):
+        """Percorre os eventos futuros em páginas (por cursor) e mescla no índice"""
+        seen: Set[str] = set()
+        cursor = None
+        while True:
+            rows = await fetch_page(self.page_size, cursor)
+            self.add(rows)
+            seen.update(key for key in map(self._key, rows) if key is not None)
+            cursor = next_cursor(rows, self.page_size, 'data_formatada', 'id')
+            if cursor is None:
+                break
+        # Eventos que já passaram ou foram removidos pelo agregador
+        for key in set(self.rows) - seen:
+            self._remove(key)
+        self.last_refresh = time.monotonic()
+        self.last_error = None
+        self._retry_at = None
+
+    def ensure_fresh(self, fetch_page: Callable[[int, Optional[str]], Awaitable[List[Dict[str, Any]]]]) -> Optional[asyncio.Task]:
+        """Agenda o aquecimento em segundo plano quando o índice está desatualizado"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return self._refresh_task
+        if not self.is_stale():
+            return None
+        if self._retry_at is not None and time.monotonic() < self._retry_at:
+            return None
+        self._refresh_task = asyncio.ensure_future(self.refresh(fetch_page))
+
+        def log_failure(done: asyncio.Task):
+            if not done.cancelled() and done.exception() is not None:
+                print(f"Erro ao atualizar índice de eventos rock: {done.exception()}")
+                self.last_error = done.exception()
+                # Índice já carregado continua servindo e espera o próximo intervalo;
+                # sem carga nenhuma, tenta de novo logo (a busca fica indisponível até lá)
+                delay = self.retry_backoff if self.last_refresh is None else self.refresh_interval
+                self._retry_at = time.monotonic() + delay
+
+        self._refresh_task.add_done_callback(log_failure)
+        return self._refresh_task
+
+    async def ensure_loaded(self, fetch_page: Callable[[int, Optional[str]], Awaitable[List[Dict[str, Any]]]]):
+        """
+        Garante que o índice já foi carregado ao menos uma vez (a busca depende dele completo).
+        Se a carga falhar, lança o erro em vez de deixar a busca responder com o índice vazio.
+        """
+        task = self.ensure_fresh(fetch_page)
+        if self.last_refresh is not None:
+            return
+        if task is None:
+            # Última carga falhou há menos de retry_backoff segundos
+            raise RuntimeError(f"Índice de eventos rock indisponível: {self.last_error}")
+        await asyncio.shield(task)
@@ -0,0 +1,230 @@
+import time
+import zlib
+import struct
+import asyncio
+import hashlib
+import secrets
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from checkin import normalize_qr
+
+MAGIC = b'TMSM'
+FORMAT_VERSION = 1
+HASH_WIDTH = 8
+
+FULL = 0
+DELTA = 1
+
+# magic, formato, tipo, largura do hash, reservado, evento, versão, versão base, salt, adicionados, removidos
+HEADER = struct.Struct('>4sBBBBIQQ16sII')
+CHECKSUM = struct.Struct('>I')
+
+def token_hash(salt: bytes, qr_code: str) -> int:
+    """Hash de 64 bits do token do QR com o salt do manifesto (blake2b com chave)"""
+    digest = hashlib.blake2b(normalize_qr(qr_code).encode(), digest_size=HASH_WIDTH, key=salt).digest()
+    return int.from_bytes(digest, 'big')
+
+def encode_manifest(kind: int, event_id: int, version: int, base_version: int, salt: bytes, added: List[int], removed: List[int]) -> bytes:
+    added = sorted(added)
+    removed = sorted(removed)
+    parts = [
+        HEADER.pack(MAGIC, FORMAT_VERSION, kind, HASH_WIDTH, 0, event_id, version, base_version, salt, len(added), len(removed)),
+        struct.pack(f'>{len(added)}Q', *added),
+        struct.pack(f'>{len(removed)}Q', *removed),
+    ]
+    body = b''.join(parts)
+    return body + CHECKSUM.pack(zlib.crc32(body))
+
+def parse_manifest(data: bytes) -> Dict[str, Any]:
+    """Decodificador de referência do formato (o mesmo que os leitores implementam)"""
+    body, (checksum,) = data[:-CHECKSUM.size], CHECKSUM.unpack(data[-CHECKSUM.size:])
+    if zlib.crc32(body) != checksum:
+        raise ValueError("Manifesto corrompido (CRC32 não confere)")
+    magic, fmt, kind, width, _, event_id, version, base_version, salt, added_count, removed_count = HEADER.unpack_from(body)
+    if magic != MAGIC or fmt != FORMAT_VERSION or width != HASH_WIDTH:
+        raise ValueError("Formato de manifesto desconhecido")
+    offset = HEADER.size
+    added = list(struct.unpack_from(f'>{added_count}Q', body, offset))
+    offset += added_count * HASH_WIDTH
+    removed = list(struct.unpack_from(f'>{removed_count}Q', body, offset))
+    return {
+        'kind': 'full' if kind == FULL else 'delta',
+        'event_id': event_id,
+        'version': version,
+        'base_version': base_version,
+        'salt': salt,
+        'added': added,
+        'removed': removed,
+    }
+
+class EventManifest:
+    __slots__ = ('salt', 'hashes', 'seq', 'log', 'log_start', 'built_at', 'recent_removals')
+
+    def __init__(self, salt: bytes):
+        self.salt = salt
+        self.hashes: set = set()
+        self.seq = 0
+        # Alterações em ordem: (seq, adicionado?, hash)
+        self.log: List[Tuple[int, bool, int]] = []
+        # Deltas só podem partir de versões com seq >= log_start
+        self.log_start = 0
+        self.built_at = 0.0
+        # Removidos pela API desde a última recarga (o banco pode ainda não ter a gravação do check-in)
+        self.recent_removals: set = set()
+
+class ScanManifestService:
+    """
+    Manifesto de ingressos válidos para leitores offline.
+
+    Para cada evento mantém o conjunto de hashes de 64 bits dos tokens dos
+    ingressos ativos (não usados nem cancelados) e um log de alterações. O
+    leitor baixa o manifesto completo uma vez e depois pede só o delta desde
+    a versão que tem (since), validando os QR codes localmente: calcula o
+    hash do token com o salt do manifesto e procura no conjunto ordenado.
+
+    Formato binário (big-endian):
+      cabeçalho  magic 'TMSM', formato (1), tipo (0 completo, 1 delta),
+                 largura do hash (8), reservado, id do evento (u32),
+                 versão (u64), versão base do delta (u64), salt (16 bytes),
+                 quantidade de adicionados (u32) e de removidos (u32)
+      corpo      hashes adicionados em ordem crescente, depois os removidos
+      final      CRC32 de tudo o que vem antes (u32)
+
+    A versão é (época << 32) | sequência: a época é sorteada ao subir o
+    processo, então após um reinício (ou em outro processo) o leitor recebe
+    o manifesto completo. O conjunto é atualizado pela própria API (compras,
+    cancelamentos, check-in) e recarregado do banco a cada max_age segundos;
+    a diferença da recarga entra no log, então alterações feitas por outros
+    processos também chegam como delta.
+    """
+
+    def __init__(self, load_page: Callable[[int, int, Optional[int]], Awaitable[List[Dict[str, Any]]]], max_age: float = 300, max_log: int = 50000, page_size: int = 1000):
+        # load_page(event_id, limit, after_id) -> ingressos não cancelados ordenados por id
+        self.load_page = load_page
+        self.max_age = max_age
+        self.max_log = max_log
+        self.page_size = page_size
+        self.epoch = secrets.randbits(32)
+
+        self._events: Dict[int, EventManifest] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+
+        self.full_exports = 0
+        self.delta_exports = 0
+        self.rebuilds = 0
+
+    def _version(self, manifest: EventManifest) -> int:
+        return (self.epoch << 32) | manifest.seq
+
+    async def _read_active(self, event_id: int, salt: bytes) -> set:
+        hashes = set()
+        after_id = None
+        while True:
+            page = await self.load_page(event_id, self.page_size, after_id)
+            for ticket in page:
+                if ticket.get('status') == 'active':
+                    hashes.add(token_hash(salt, ticket['qr_code']))
+            if len(page) < self.page_size:
+                return hashes
+            after_id = page[-1]['id']
+
+    async def _rebuild(self, event_id: int) -> EventManifest:
+        manifest = self._events.get(event_id)
+        if manifest is None:
+            manifest = EventManifest(secrets.token_bytes(16))
+            manifest.hashes = await self._read_active(event_id, manifest.salt)
+            self._events[event_id] = manifest
+        else:
+            # Recarga: a diferença para o banco entra no log como alterações normais.
+            # Hashes alterados durante a leitura, ou removidos pela API desde a
+            # recarga anterior, ficam como estão: o banco pode estar atrasado.
+            start_seq = manifest.seq
+            recent_removals = manifest.recent_removals
+            manifest.recent_removals = set()
+            current = await self._read_active(event_id, manifest.salt)
+            touched = {value for seq, _, value in manifest.log if seq > start_seq}
+            for value in current - manifest.hashes - touched - recent_removals:
+                self._record(manifest, True, value)
+            for value in manifest.hashes - current - touched:
+                self._record(manifest, False, value)
+                manifest.recent_removals.discard(value)
+            self.rebuilds += 1
+        manifest.built_at = time.monotonic()
+        return manifest
+
+    async def _load(self, event_id: int) -> EventManifest:
+        """Manifesto do evento, (re)carregado do banco uma única vez mesmo com pedidos simultâneos"""
+        manifest = self._events.get(event_id)
+        if manifest is not None and time.monotonic() - manifest.built_at < self.max_age:
+            return manifest
+
+        task = self._loading.get(event_id)
+        if task is None:
+            task = asyncio.ensure_future(self._rebuild(event_id))
+            self._loading[event_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(event_id, None))
+        return await asyncio.shield(task)
+
+    def _record(self, manifest: EventManifest, added: bool, value: int):
+        if added == (value in manifest.hashes):
+            return
+        if added:
+            manifest.hashes.add(value)
+            manifest.recent_removals.discard(value)
+        else:
+            manifest.hashes.discard(value)
+            manifest.recent_removals.add(value)
+        manifest.seq += 1
+        manifest.log.append((manifest.seq, added, value))
+        if len(manifest.log) > self.max_log:
+            # Leitores com versão anterior ao log retido recebem o manifesto completo
+            drop = len(manifest.log) - self.max_log
+            manifest.log_start = manifest.log[drop - 1][0]
+            del manifest.log[:drop]
+
+    def ticket_changed(self, ticket: Dict[str, Any]):
+        """Ingresso criado ou com status alterado: entra no manifesto se ativo, sai caso contrário"""
+        manifest = self._events.get(ticket['event_id'])
+        if manifest is not None:
+            self._record(manifest, ticket.get('status', 'active') == 'active', token_hash(manifest.salt, ticket['qr_code']))
+
+    def tickets_changed(self, tickets: List[Dict[str, Any]]):
+        for ticket in tickets:
+            self.ticket_changed(ticket)
+
+    def ticket_removed(self, event_id: int, qr_code: str):
+        """Ingresso usado na entrada ou removido deixa de ser válido"""
+        manifest = self._events.get(event_id)
+        if manifest is not None:
+            self._record(manifest, False, token_hash(manifest.salt, qr_code))
+
+    async def export(self, event_id: int, since: Optional[int] = None) -> Tuple[bytes, int]:
+        """(manifesto, versão): delta desde `since` quando possível, senão o completo"""
+        manifest = await self._load(event_id)
+        version = self._version(manifest)
+
+        if since is not None and since >> 32 == self.epoch:
+            since_seq = since & 0xFFFFFFFF
+            if manifest.log_start <= since_seq <= manifest.seq:
+                changes: Dict[int, bool] = {}
+                # O log está em ordem de seq: a última alteração de cada hash vale
+                for seq, added, value in reversed(manifest.log):
+                    if seq <= since_seq:
+                        break
+                    changes.setdefault(value, added)
+                added = [value for value, was_added in changes.items() if was_added]
+                removed = [value for value, was_added in changes.items() if not was_added]
+                self.delta_exports += 1
+                return encode_manifest(DELTA, event_id, version, since, manifest.salt, added, removed), version
+
+        self.full_exports += 1
+        return encode_manifest(FULL, event_id, version, 0, manifest.salt, list(manifest.hashes), []), version
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'events': len(self._events),
+            'tickets': sum(len(manifest.hashes) for manifest in self._events.values()),
+            'log_entries': sum(len(manifest.log) for manifest in self._events.values()),
+            'full_exports': self.full_exports,
+            'delta_exports': self.delta_exports,
+            'rebuilds': self.rebuilds,
+        }
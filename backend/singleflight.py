@@ -0,0 +1,68 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+def _freeze(value: Any) -> Hashable:
+    """Converte listas e dicionários dos argumentos em tuplas, para compor a chave"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+class SingleFlight:
+    """
+    Coalescência de leituras idênticas concorrentes.
+
+    Enquanto uma chamada para a chave está em andamento, as demais chamadas
+    com a mesma chave aguardam o mesmo resultado (ou a mesma exceção) em vez
+    de disparar outra consulta. Nada é guardado depois que a chamada termina:
+    não é um cache, só achata picos de requisições simultâneas.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._finish, key))
+        else:
+            self.collapsed += 1
+        # shield: o cancelamento de um chamador não derruba a consulta dos demais
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight),
+            "collapse_rate": round(self.collapsed / self.calls, 4) if self.calls else 0,
+        }
+
+def single_flight(method):
+    """Decorador para métodos de leitura de um cliente que tenha o atributo `flights` (SingleFlight)"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = (method.__name__, _freeze(args), _freeze(kwargs))
+        return await self.flights.do(key, lambda: method(self, *args, **kwargs))
+    return wrapper
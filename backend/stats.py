@@ -0,0 +1,27 @@
+from typing import Any, Dict
+
+def build_event_stats(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Monta o dicionário de estatísticas a partir de uma linha de event_ticket_stats"""
+    tickets_active = int(row.get('tickets_active') or 0)
+    tickets_used = int(row.get('tickets_used') or 0)
+    tickets_cancelled = int(row.get('tickets_cancelled') or 0)
+    max_tickets = row.get('max_tickets') or 0
+    revenue = float(row.get('revenue') or 0)
+
+    # Ingressos cancelados não contam como vendidos nem entram na receita
+    tickets_sold = tickets_active + tickets_used
+
+    return {
+        'event_id': row['event_id'],
+        'tickets_sold': tickets_sold,
+        'tickets_active': tickets_active,
+        'tickets_used': tickets_used,
+        'tickets_cancelled': tickets_cancelled,
+        'max_tickets': max_tickets,
+        'tickets_available': max(max_tickets - tickets_sold, 0),
+        'revenue': revenue,
+        # Nomes usados por TicketGenerator.create_event_report_pdf
+        'total_revenue': revenue,
+        'average_price': revenue / tickets_sold if tickets_sold > 0 else 0,
+        'occupancy_rate': (tickets_sold / max_tickets) * 100 if max_tickets > 0 else 0
+    }
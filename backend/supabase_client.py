@@ -1,9 +1,34 @@
 import os
-from supabase import create_client, Client
+import uuid
+import asyncio
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from postgrest.utils import AsyncClient
 from typing import Optional, Dict, Any, List
+from rock_index import RockEventIndex
+from pagination import decode_cursor
+from stats import build_event_stats
+from batching import BatchLoader
+from singleflight import SingleFlight, single_flight
 from datetime import datetime
 import json
 
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Cliente PostgREST assíncrono com pool de conexões keep-alive limitado"""
+    
+    def __init__(self, base_url: str, headers: Dict[str, str], timeout: httpx.Timeout, limits: httpx.Limits):
+        self.limits = limits
+        super().__init__(base_url, headers=headers, timeout=timeout)
+    
+    def create_session(self, base_url: str, headers: Dict[str, str], timeout: httpx.Timeout) -> AsyncClient:
+        return AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self.limits
+        )
+
 class SupabaseClient:
     def __init__(self):
         self.url = os.getenv("SUPABASE_URL")
@@ -12,7 +37,59 @@ class SupabaseClient:
         if not self.url or not self.key:
             raise ValueError("SUPABASE_URL e SUPABASE_KEY devem estar definidas nas variáveis de ambiente")
         
-        self.client: Client = create_client(self.url, self.key)
+        # Timeouts por chamada (segundos): leituras e escritas têm prazos distintos
+        self.read_timeout = float(os.getenv("SUPABASE_READ_TIMEOUT", "5"))
+        self.write_timeout = float(os.getenv("SUPABASE_WRITE_TIMEOUT", "10"))
+        
+        # Pool compartilhado de conexões keep-alive com o PostgREST
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+        )
+        timeout = httpx.Timeout(
+            max(self.read_timeout, self.write_timeout),
+            connect=float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3")),
+            pool=float(os.getenv("SUPABASE_POOL_TIMEOUT", "5"))
+        )
+        
+        self.rest_url = os.getenv("SUPABASE_REST_URL", f"{self.url}/rest/v1")
+        
+        self.client = PooledPostgrestClient(
+            self.rest_url,
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apiKey": self.key,
+                "Authorization": f"Bearer {self.key}"
+            },
+            timeout=timeout,
+            limits=limits
+        )
+        
+        # Índice slug -> evento da tabela eventos_rock
+        self.rock_index = RockEventIndex(
+            refresh_interval=float(os.getenv("ROCK_INDEX_REFRESH_INTERVAL", "600"))
+        )
+        
+        # Leituras idênticas simultâneas compartilham a mesma consulta
+        self.flights = SingleFlight('database')
+        
+        # Agrupa get_event/get_user feitos no mesmo ciclo do event loop numa única consulta
+        batch_size = int(os.getenv("DATABASE_BATCH_MAX_SIZE", "100"))
+        self.event_loader = BatchLoader('events', self._load_events, batch_size)
+        self.user_loader = BatchLoader('users', self._load_users, batch_size)
+    
+    async def _execute(self, query, timeout: Optional[float] = None):
+        """Executa a query sem bloquear o event loop, respeitando o timeout da chamada"""
+        return await asyncio.wait_for(query.execute(), timeout or self.read_timeout)
+    
+    async def aclose(self):
+        """Fecha as conexões do pool"""
+        await self.client.aclose()
+    
+    def _select_columns(self, columns: Optional[List[str]], default: str = '*') -> str:
+        """Projeção enviada ao PostgREST: só as colunas pedidas, ou o select padrão"""
+        return ','.join(columns) if columns else default
     
     def _serialize_datetime(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Converte objetos datetime para string"""
@@ -29,25 +106,41 @@ class SupabaseClient:
         """Cria um novo usuário"""
         try:
             serialized_data = self._serialize_datetime(user_data)
-            result = self.client.table('users').insert(serialized_data).execute()
+            result = await self._execute(self.client.table('users').insert(serialized_data), timeout=self.write_timeout)
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Erro ao criar usuário: {e}")
             raise e
     
+    @single_flight
     async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """Busca um usuário por ID"""
+        """Busca um usuário por ID (agrupado com as demais buscas do mesmo ciclo)"""
         try:
-            result = self.client.table('users').select('*').eq('id', user_id).execute()
-            return result.data[0] if result.data else None
+            return await self.user_loader.load(user_id)
         except Exception as e:
             print(f"Erro ao buscar usuário: {e}")
             raise e
     
+    @single_flight
+    async def get_users_by_ids(self, user_ids: List[int]) -> List[Dict[str, Any]]:
+        """Busca vários usuários numa única consulta"""
+        try:
+            if not user_ids:
+                return []
+            result = await self._execute(self.client.table('users').select('*').in_('id', list(user_ids)))
+            return result.data if result.data else []
+        except Exception as e:
+            print(f"Erro ao buscar usuários: {e}")
+            raise e
+    
+    async def _load_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return {user['id']: user for user in await self.get_users_by_ids(user_ids)}
+    
+    @single_flight
     async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Busca um usuário por email"""
         try:
-            result = self.client.table('users').select('*').eq('email', email).execute()
+            result = await self._execute(self.client.table('users').select('*').eq('email', email))
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Erro ao buscar usuário por email: {e}")
@@ -57,7 +150,7 @@ class SupabaseClient:
         """Atualiza um usuário"""
         try:
             serialized_data = self._serialize_datetime(user_data)
-            result = self.client.table('users').update(serialized_data).eq('id', user_id).execute()
+            result = await self._execute(self.client.table('users').update(serialized_data).eq('id', user_id), timeout=self.write_timeout)
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Erro ao atualizar usuário: {e}")
@@ -66,7 +159,7 @@ class SupabaseClient:
     async def delete_user(self, user_id: int) -> bool:
         """Deleta um usuário"""
         try:
-            result = self.client.table('users').delete().eq('id', user_id).execute()
+            result = await self._execute(self.client.table('users').delete().eq('id', user_id), timeout=self.write_timeout)
             return True
         except Exception as e:
             print(f"Erro ao deletar usuário: {e}")
@@ -77,34 +170,58 @@ class SupabaseClient:
         """Cria um novo evento"""
         try:
             serialized_data = self._serialize_datetime(event_data)
-            result = self.client.table('events').insert(serialized_data).execute()
+            result = await self._execute(self.client.table('events').insert(serialized_data), timeout=self.write_timeout)
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Erro ao criar evento: {e}")
             raise e
     
+    @single_flight
     async def get_event(self, event_id: int) -> Optional[Dict[str, Any]]:
-        """Busca um evento por ID"""
+        """Busca um evento por ID (agrupado com as demais buscas do mesmo ciclo)"""
         try:
-            result = self.client.table('events').select('*').eq('id', event_id).execute()
-            return result.data[0] if result.data else None
+            return await self.event_loader.load(event_id)
         except Exception as e:
             print(f"Erro ao buscar evento: {e}")
             raise e
     
-    async def get_events(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """Busca todos os eventos com paginação"""
+    @single_flight
+    async def get_events_by_ids(self, event_ids: List[int]) -> List[Dict[str, Any]]:
+        """Busca vários eventos numa única consulta"""
+        try:
+            if not event_ids:
+                return []
+            result = await self._execute(self.client.table('events').select('*').in_('id', list(event_ids)))
+            return result.data if result.data else []
+        except Exception as e:
+            print(f"Erro ao buscar eventos: {e}")
+            raise e
+    
+    async def _load_events(self, event_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return {event['id']: event for event in await self.get_events_by_ids(event_ids)}
+    
+    @single_flight
+    async def get_events(self, limit: int = 50, offset: int = 0, cursor: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Busca todos os eventos com paginação (por offset ou por cursor em id)"""
         try:
-            result = self.client.table('events').select('*').range(offset, offset + limit - 1).execute()
+            query = self.client.table('events').select(self._select_columns(columns)).order('id', desc=False)
+            if cursor:
+                # Paginação keyset: continua a partir do último id entregue
+                last_id, = decode_cursor(cursor, 1)
+                query = query.gt('id', int(last_id)).limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
+            result = await self._execute(query)
             return result.data if result.data else []
         except Exception as e:
             print(f"Erro ao buscar eventos: {e}")
             raise e
     
-    async def get_events_by_organizer(self, organizer_id: int) -> List[Dict[str, Any]]:
+    @single_flight
+    async def get_events_by_organizer(self, organizer_id: int, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Busca eventos por organizador"""
         try:
-            result = self.client.table('events').select('*').eq('organizer_id', organizer_id).execute()
+            result = await self._execute(self.client.table('events').select(self._select_columns(columns)).eq('organizer_id', organizer_id))
             return result.data if result.data else []
         except Exception as e:
             print(f"Erro ao buscar eventos por organizador: {e}")
@@ -114,7 +231,7 @@ class SupabaseClient:
         """Atualiza um evento"""
         try:
             serialized_data = self._serialize_datetime(event_data)
-            result = self.client.table('events').update(serialized_data).eq('id', event_id).execute()
+            result = await self._execute(self.client.table('events').update(serialized_data).eq('id', event_id), timeout=self.write_timeout)
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Erro ao atualizar evento: {e}")
@@ -123,7 +240,7 @@ class SupabaseClient:
     async def delete_event(self, event_id: int) -> bool:
         """Deleta um evento"""
         try:
-            result = self.client.table('events').delete().eq('id', event_id).execute()
+            result = await self._execute(self.client.table('events').delete().eq('id', event_id), timeout=self.write_timeout)
             return True
         except Exception as e:
             print(f"Erro ao deletar evento: {e}")
@@ -133,44 +250,150 @@ class SupabaseClient:
     async def create_ticket(self, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
         """Cria um novo ingresso"""
         try:
-            result = self.client.table('tickets').insert(ticket_data).execute()
+            serialized_data = self._serialize_datetime(ticket_data)
+            result = await self._execute(self.client.table('tickets').insert(serialized_data), timeout=self.write_timeout)
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Erro ao criar ingresso: {e}")
             raise e
     
+    async def create_tickets(self, tickets_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cria vários ingressos num único INSERT em lote"""
+        try:
+            if not tickets_data:
+                return []
+            serialized_data = [self._serialize_datetime(ticket_data) for ticket_data in tickets_data]
+            result = await self._execute(self.client.table('tickets').insert(serialized_data), timeout=self.write_timeout)
+            return result.data if result.data else []
+        except Exception as e:
+            print(f"Erro ao criar ingressos em lote: {e}")
+            raise e
+    
+    async def create_tickets_within_capacity(self, event_id: int, tickets_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cria os ingressos num único INSERT só se couberem na capacidade do evento (lista vazia se esgotado)"""
+        try:
+            if not tickets_data:
+                return []
+            serialized_data = [self._serialize_datetime(ticket_data) for ticket_data in tickets_data]
+            result = await self._execute(self.client.rpc('create_tickets_within_capacity', {
+                'p_event_id': event_id,
+                'p_tickets': serialized_data
+            }), timeout=self.write_timeout)
+            return result.data if result.data else []
+        except Exception as e:
+            print(f"Erro ao criar ingressos dentro da capacidade: {e}")
+            raise e
+    
+    @single_flight
     async def get_ticket(self, ticket_id: int) -> Optional[Dict[str, Any]]:
         """Busca um ingresso por ID"""
         try:
-            result = self.client.table('tickets').select('*').eq('id', ticket_id).execute()
+            result = await self._execute(self.client.table('tickets').select('*').eq('id', ticket_id))
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Erro ao buscar ingresso: {e}")
             raise e
     
-    async def get_tickets_by_user(self, user_id: int) -> List[Dict[str, Any]]:
-        """Busca ingressos por usuário"""
+    @single_flight
+    async def get_tickets_by_user(self, user_id: int, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Busca ingressos por usuário (com `columns`, sem embutir o evento)"""
         try:
-            result = self.client.table('tickets').select('*, events(*)').eq('user_id', user_id).execute()
+            query = self.client.table('tickets').select(self._select_columns(columns, '*, events(*)')).eq('user_id', user_id)
+            result = await self._execute(query)
             return result.data if result.data else []
         except Exception as e:
             print(f"Erro ao buscar ingressos por usuário: {e}")
             raise e
     
+    @single_flight
     async def get_tickets_by_event(self, event_id: int) -> List[Dict[str, Any]]:
         """Busca ingressos por evento"""
         try:
-            result = self.client.table('tickets').select('*, users(*)').eq('event_id', event_id).execute()
+            result = await self._execute(self.client.table('tickets').select('*, users(*)').eq('event_id', event_id))
             return result.data if result.data else []
         except Exception as e:
             print(f"Erro ao buscar ingressos por evento: {e}")
             raise e
     
+    async def get_tickets_by_event_page(self, event_id: int, limit: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Página de ingressos válidos (não cancelados) do evento, ordenada por id, com nome e email do comprador"""
+        try:
+            query = (
+                self.client.table('tickets')
+                .select('*, users(name,email)')
+                .eq('event_id', event_id)
+                .neq('status', 'cancelled')
+                .order('id', desc=False)
+                .limit(limit)
+            )
+            if after_id is not None:
+                query = query.gt('id', after_id)
+            result = await self._execute(query)
+            return result.data if result.data else []
+        except Exception as e:
+            print(f"Erro ao buscar página de ingressos do evento: {e}")
+            raise e
+    
+    async def get_event_checkin_page(self, event_id: int, limit: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Página com id, QR code, status e uso dos ingressos válidos do evento, para o índice do check-in"""
+        try:
+            query = (
+                self.client.table('tickets')
+                .select('id,event_id,qr_code,status,used_at')
+                .eq('event_id', event_id)
+                .neq('status', 'cancelled')
+                .order('id', desc=False)
+                .limit(limit)
+            )
+            if after_id is not None:
+                query = query.gt('id', after_id)
+            result = await self._execute(query)
+            return result.data if result.data else []
+        except Exception as e:
+            print(f"Erro ao buscar ingressos para o check-in: {e}")
+            raise e
+    
+    async def get_ticket_by_qr_code(self, qr_code: str) -> Optional[Dict[str, Any]]:
+        """Busca ingresso pelo QR code"""
+        try:
+            result = await self._execute(self.client.table('tickets').select('id,event_id,qr_code,status,used_at').eq('qr_code', qr_code))
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Erro ao buscar ingresso por QR code: {e}")
+            raise e
+    
+    async def lease_worker_id(self) -> int:
+        """Worker id (0-1023) para o gerador de números de ingresso, distinto a cada chamada"""
+        try:
+            result = await self._execute(self.client.rpc('lease_worker_id', {}), timeout=self.write_timeout)
+            return int(result.data)
+        except Exception as e:
+            print(f"Erro ao obter worker id: {e}")
+            raise e
+    
+    @staticmethod
+    def is_unique_violation(error: Exception) -> bool:
+        """Erro de chave duplicada (código 23505 do PostgreSQL, repassado pelo PostgREST)"""
+        return getattr(error, 'code', None) == '23505'
+    
+    async def mark_tickets_used(self, ticket_ids: List[int], used_at: List[datetime]) -> List[int]:
+        """Marca vários ingressos como usados numa única chamada; retorna os ids que ainda estavam ativos"""
+        try:
+            result = await self._execute(self.client.rpc('mark_tickets_used', {
+                'p_ticket_ids': list(ticket_ids),
+                'p_used_at': [value.isoformat() for value in used_at]
+            }), timeout=self.write_timeout)
+            rows = result.data if result.data else []
+            return [row['ticket_id'] for row in rows]
+        except Exception as e:
+            print(f"Erro ao marcar ingressos como usados: {e}")
+            raise e
+    
     async def update_ticket(self, ticket_id: int, ticket_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Atualiza um ingresso"""
         try:
             serialized_data = self._serialize_datetime(ticket_data)
-            result = self.client.table('tickets').update(serialized_data).eq('id', ticket_id).execute()
+            result = await self._execute(self.client.table('tickets').update(serialized_data).eq('id', ticket_id), timeout=self.write_timeout)
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Erro ao atualizar ingresso: {e}")
@@ -179,49 +402,54 @@ class SupabaseClient:
     async def delete_ticket(self, ticket_id: int) -> bool:
         """Deleta um ingresso"""
         try:
-            result = self.client.table('tickets').delete().eq('id', ticket_id).execute()
+            result = await self._execute(self.client.table('tickets').delete().eq('id', ticket_id), timeout=self.write_timeout)
             return True
         except Exception as e:
             print(f"Erro ao deletar ingresso: {e}")
             raise e
     
     # Métodos para Estatísticas
+    @single_flight
     async def get_event_stats(self, event_id: int) -> Dict[str, Any]:
-        """Busca estatísticas de um evento"""
+        """Busca estatísticas de um evento com uma única consulta agregada no banco"""
         try:
-            # Busca o evento
-            event = await self.get_event(event_id)
-            if not event:
+            result = await self._execute(self.client.rpc('event_ticket_stats', {'p_event_id': event_id}))
+            if not result.data:
                 return {}
             
-            # Busca ingressos vendidos
-            tickets_result = self.client.table('tickets').select('id').eq('event_id', event_id).execute()
-            tickets_sold = len(tickets_result.data) if tickets_result.data else 0
-            
-            # Calcula receita
-            revenue = tickets_sold * event.get('price', 0)
-            
-            return {
-                'event_id': event_id,
-                'tickets_sold': tickets_sold,
-                'max_tickets': event.get('max_tickets', 0),
-                'revenue': revenue,
-                'occupancy_rate': (tickets_sold / event.get('max_tickets', 1)) * 100 if event.get('max_tickets', 0) > 0 else 0
-            }
+            return build_event_stats(result.data[0])
         except Exception as e:
             print(f"Erro ao buscar estatísticas do evento: {e}")
             raise e
     
+    @single_flight
+    async def get_events_stats(self, event_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Busca estatísticas de vários eventos numa única consulta agrupada"""
+        try:
+            if not event_ids:
+                return {}
+            result = await self._execute(self.client.rpc('events_ticket_stats', {'p_event_ids': list(event_ids)}))
+            rows = result.data if result.data else []
+            return {row['event_id']: build_event_stats(row) for row in rows}
+        except Exception as e:
+            print(f"Erro ao buscar estatísticas dos eventos: {e}")
+            raise e
+    
     # Métodos para Eventos Rock (Agregador)
-    async def get_rock_events(self, limit: int = 50, offset: int = 0, city: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Busca eventos da tabela eventos_rock (agregador de eventos externos)"""
+    @single_flight
+    async def get_rock_events(self, limit: int = 50, offset: int = 0, city: Optional[str] = None, cursor: Optional[str] = None, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Busca eventos da tabela eventos_rock (agregador de eventos externos)
+        
+        Com `cursor`, pagina por (data_formatada, id) a partir da última linha entregue
+        em vez de usar offset. Com `columns`, devolve só essas colunas.
+        """
         try:
             # Busca eventos que ainda vão acontecer (data_formatada >= agora)
             from datetime import datetime, timezone
             now = datetime.now(timezone.utc)
             
             query = self.client.table('eventos_rock')\
-                .select('*')\
+                .select(self._select_columns(columns))\
                 .gte('data_formatada', now.isoformat())
             
             # Filtrar por cidade se especificado
@@ -232,16 +460,33 @@ class SupabaseClient:
                 city_normalized = city.strip().upper()
                 query = query.ilike('cidade', f'%{city_normalized}%')
             
-            result = query\
-                .order('data_formatada', desc=False)\
-                .range(offset, offset + limit - 1)\
-                .execute()
+            # Ordem total por (data_formatada, id) num único parâmetro order, base da paginação keyset
+            query = query.order('data_formatada,id', desc=False)
             
-            return result.data if result.data else []
+            if cursor:
+                last_date, last_id = decode_cursor(cursor, 2)
+                # Valida os valores antes de montá-los no filtro do PostgREST
+                last_date = datetime.fromisoformat(last_date).isoformat()
+                last_id = str(uuid.UUID(str(last_id)))
+                # (data_formatada, id) > (último): o postgrest-py não expõe or_, então o filtro vai direto nos params
+                query.params = query.params.add(
+                    'or', f'(data_formatada.gt."{last_date}",and(data_formatada.eq."{last_date}",id.gt."{last_id}"))'
+                )
+                query = query.limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
+            result = await self._execute(query)
+            
+            events = result.data if result.data else []
+            if columns is None:
+                # Só linhas completas alimentam o índice em memória
+                self.rock_index.add(events)
+            return events
         except Exception as e:
             print(f"Erro ao buscar eventos rock: {e}")
             raise e
     
+    @single_flight
     async def get_featured_rock_events(self, limit: int = 3) -> List[Dict[str, Any]]:
         """Busca eventos em destaque da tabela eventos_rock ordenados por prioridade"""
         try:
@@ -250,19 +495,62 @@ class SupabaseClient:
             
             # Busca eventos com prioridade (prioridade IS NOT NULL)
             # Ordena por prioridade (menor = maior prioridade) e depois por data
-            result = self.client.table('eventos_rock')\
+            query = self.client.table('eventos_rock')\
                 .select('*')\
                 .gte('data_formatada', now.isoformat())\
                 .not_.is_('prioridade', 'null')\
                 .order('prioridade', desc=False)\
                 .order('data_formatada', desc=False)\
-                .limit(limit)\
-                .execute()
+                .limit(limit)
+            result = await self._execute(query)
             
-            return result.data if result.data else []
+            events = result.data if result.data else []
+            self.rock_index.add(events)
+            return events
         except Exception as e:
             print(f"Erro ao buscar eventos em destaque: {e}")
             raise e
+    
+    async def _fetch_rock_page(self, limit: int, cursor: Optional[str]) -> List[Dict[str, Any]]:
+        """Página de eventos futuros usada para aquecer o índice em memória"""
+        return await self.get_rock_events(limit, cursor=cursor)
+    
+    @single_flight
+    async def get_rock_event_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        """Busca um evento da tabela eventos_rock pelo slug usando o índice em memória"""
+        try:
+            self.rock_index.ensure_fresh(self._fetch_rock_page)
+            event = self.rock_index.get(slug)
+            if event is None:
+                # Evento ainda não indexado: busca apenas a linha pedida
+                query = self.client.table('eventos_rock').select('*').eq('slug', slug).limit(1)
+                result = await self._execute(query)
+                event = result.data[0] if result.data else None
+                if event:
+                    self.rock_index.add([event])
+            return event
+        except Exception as e:
+            print(f"Erro ao buscar evento rock por slug: {e}")
+            raise e
+    
+    async def search_rock_events(self, query: str, limit: int = 50, offset: int = 0, city: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Busca textual sem acentos nos eventos_rock futuros (titulo, artistas, local, cidade e gêneros)"""
+        try:
+            await self.rock_index.ensure_loaded(self._fetch_rock_page)
+            return self.rock_index.search(query, limit, offset, city)
+        except Exception as e:
+            print(f"Erro ao buscar eventos rock por texto: {e}")
+            raise e
+
+def create_database_client():
+    """Cria o backend de dados conforme DATABASE_BACKEND (postgrest ou asyncpg)"""
+    backend = os.getenv("DATABASE_BACKEND", "postgrest").lower()
+    if backend == "asyncpg":
+        from asyncpg_client import AsyncpgClient
+        return AsyncpgClient()
+    if backend != "postgrest":
+        raise ValueError(f"DATABASE_BACKEND inválido: {backend} (use postgrest ou asyncpg)")
+    return SupabaseClient()
 
-# Instância global do cliente Supabase
-supabase_client = SupabaseClient()
+# Instância global do cliente de banco de dados
+supabase_client = create_database_client()
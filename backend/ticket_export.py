@@ -0,0 +1,104 @@
+import asyncio
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pdf_pool import PdfRenderPool, build_ticket_pdf_data
+
+class ZipStreamBuffer:
+    """
+    Destino de escrita não posicionável para o zipfile: acumula os bytes
+    escritos até serem drenados para a resposta. Sem seek, o zipfile grava
+    cada arquivo em sequência e o diretório central no fim, o que permite
+    enviar o ZIP enquanto ele é montado.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+async def iter_ticket_pages(client, event_id: int, page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Percorre os ingressos do evento por id, buscando a próxima página enquanto a atual é processada"""
+    next_page = asyncio.ensure_future(client.get_tickets_by_event_page(event_id, page_size))
+    while True:
+        page = await next_page
+        if not page:
+            return
+        if len(page) == page_size:
+            next_page = asyncio.ensure_future(client.get_tickets_by_event_page(event_id, page_size, page[-1]['id']))
+        else:
+            next_page = None
+        yield page
+        if next_page is None:
+            return
+
+def _pdf_inputs(page: List[Dict[str, Any]], event: Dict[str, Any]):
+    tickets_data = []
+    event_data = None
+    for ticket in page:
+        ticket_data, event_data = build_ticket_pdf_data(ticket, event, ticket.get('users'))
+        ticket_data.pop('users', None)
+        tickets_data.append(ticket_data)
+    return tickets_data, event_data
+
+async def stream_tickets_zip(client, pool: PdfRenderPool, event: Dict[str, Any], page_size: int = 200, batch_size: int = 25) -> AsyncIterator[bytes]:
+    """
+    ZIP com um PDF por ingresso, enviado à medida que é gerado.
+
+    Cada página de ingressos é dividida em lotes renderizados em paralelo
+    pelos processos do pool; em memória fica no máximo uma página de PDFs.
+    """
+    buffer = ZipStreamBuffer()
+    archive = zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED)
+    timestamp = datetime.now().timetuple()[:6]
+
+    async for page in iter_ticket_pages(client, event['id'], page_size):
+        tickets_data, event_data = _pdf_inputs(page, event)
+        batches = [tickets_data[i:i + batch_size] for i in range(0, len(tickets_data), batch_size)]
+        rendered = await asyncio.gather(*(pool.render_tickets(batch, event_data, admitted=True) for batch in batches))
+
+        for batch, pdfs in zip(batches, rendered):
+            for ticket_data, pdf in zip(batch, pdfs):
+                # PDFs já são comprimidos: armazenados sem nova compressão
+                info = zipfile.ZipInfo(f"{ticket_data['ticket_number']}.pdf", date_time=timestamp)
+                archive.writestr(info, pdf)
+        yield buffer.drain()
+
+    archive.close()
+    yield buffer.drain()
+
+async def render_tickets_pdf(client, pool: PdfRenderPool, event: Dict[str, Any], page_size: int = 200, max_tickets: Optional[int] = None) -> bytes:
+    """
+    PDF único com uma página por ingresso.
+
+    O formato PDF só é válido com a tabela de referências no fim, então o
+    documento é montado inteiro num processo do pool e enviado depois; as
+    páginas compartilham o layout do evento (form XObject), o que mantém o
+    arquivo pequeno. Acima de max_tickets lança ValueError (use o ZIP).
+    """
+    tickets_data: List[Dict[str, Any]] = []
+    event_data = None
+    async for page in iter_ticket_pages(client, event['id'], page_size):
+        page_data, event_data = _pdf_inputs(page, event)
+        tickets_data.extend(page_data)
+        if max_tickets is not None and len(tickets_data) > max_tickets:
+            raise ValueError(f"Evento com mais de {max_tickets} ingressos: exporte em format=zip")
+
+    if not tickets_data:
+        raise LookupError("Evento sem ingressos para exportar")
+    return await pool.render_tickets_document(tickets_data, event_data, admitted=True)
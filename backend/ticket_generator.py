@@ -4,15 +4,66 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
 import qrcode
 import io
+from collections import OrderedDict
+from functools import lru_cache
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+from ticket_template import TicketTemplate
+from qr_signing import QR_PREFIX
+
+# Quantidade de eventos com layout compilado mantidos em memória
+TEMPLATE_CACHE_SIZE = 128
+
+# Quantidade de matrizes de QR Code mantidas em memória (downloads repetidos do mesmo ingresso)
+QR_MATRIX_CACHE_SIZE = 4096
+
+# Máscara fixa no modo vetorial: pular a busca da melhor máscara corta a maior parte do custo
+# do QR Code, e qualquer uma das 8 máscaras gera um código válido para os leitores
+QR_MASK_PATTERN = 0
+
+@lru_cache(maxsize=QR_MATRIX_CACHE_SIZE)
+def qr_matrix(qr_data: str) -> Tuple[int, str]:
+    """
+    Matriz do QR Code (com a borda de 4 módulos) já convertida em operadores
+    PDF: um retângulo por trecho horizontal de módulos escuros, em unidades
+    de módulo com a origem no canto superior esquerdo.
+    Devolve (tamanho em módulos, operadores).
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=4,
+        mask_pattern=QR_MASK_PATTERN,
+    )
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+    
+    matrix = qr.get_matrix()
+    runs = []
+    for row, modules in enumerate(matrix):
+        col = 0
+        while col < len(modules):
+            if modules[col]:
+                start = col
+                while col < len(modules) and modules[col]:
+                    col += 1
+                runs.append(f"{start} {row} {col - start} 1 re")
+            else:
+                col += 1
+    return len(matrix), '\n'.join(runs)
 
 class TicketGenerator:
-    def __init__(self):
+    def __init__(self, qr_mode: str = 'vector'):
+        if qr_mode not in ('vector', 'png'):
+            raise ValueError(f"Modo de QR Code inválido: {qr_mode} (use vector ou png)")
+        self.qr_mode = qr_mode
         self.styles = getSampleStyleSheet()
         self.setup_custom_styles()
+        self._templates: "OrderedDict[Tuple, TicketTemplate]" = OrderedDict()
     
     def setup_custom_styles(self):
         # Estilo para título do evento
@@ -118,8 +169,7 @@ class TicketGenerator:
         story.append(Spacer(1, 30))
         
         # QR Code
-        qr_data = f"TICKETMETAL:{ticket_data['qr_code']}"
-        qr_bytes = self.generate_qr_code(qr_data)
+        qr_bytes = self.generate_qr_code(self.qr_payload(ticket_data))
         
         qr_image = Image(io.BytesIO(qr_bytes), width=2*inch, height=2*inch)
         story.append(qr_image)
@@ -149,6 +199,58 @@ class TicketGenerator:
         
         return buffer.getvalue()
     
+    def qr_payload(self, ticket_data: Dict[str, Any]) -> str:
+        """Conteúdo gravado no QR Code do ingresso (o qr_code do banco já traz o prefixo, exceto em ingressos antigos)"""
+        qr_code = ticket_data['qr_code']
+        return qr_code if qr_code.startswith(QR_PREFIX) else f"{QR_PREFIX}{qr_code}"
+    
+    def get_template(self, event_data: Dict[str, Any]) -> TicketTemplate:
+        """Layout compilado do evento (LRU); muda de chave se algum dado exibido do evento mudar"""
+        key = (
+            event_data.get('id'), event_data['title'], event_data['date'], event_data['location'],
+            event_data['address'], event_data['city'], event_data['state']
+        )
+        template = self._templates.get(key)
+        if template is None:
+            template = TicketTemplate(event_data)
+            self._templates[key] = template
+            if len(self._templates) > TEMPLATE_CACHE_SIZE:
+                self._templates.popitem(last=False)
+        else:
+            self._templates.move_to_end(key)
+        return template
+    
+    def draw_qr_image(self, pdf: canvas.Canvas, qr_data: str, x: float, y: float, size: float):
+        """Desenha o QR Code como imagem PNG no canvas"""
+        pdf.drawImage(ImageReader(io.BytesIO(self.generate_qr_code(qr_data))), x, y, width=size, height=size)
+    
+    def draw_qr_vector(self, pdf: canvas.Canvas, qr_data: str, x: float, y: float, size: float):
+        """Desenha o QR Code como retângulos vetoriais (um por trecho de módulos escuros), sem imagem"""
+        count, operators = qr_matrix(qr_data)
+        module = size / count
+        pdf.saveState()
+        # Uma unidade = um módulo, com o eixo y para baixo: os operadores em cache valem para qualquer posição
+        pdf.transform(module, 0, 0, -module, x, y + size)
+        pdf.setFillColor(colors.black)
+        pdf.addLiteral(f"{operators}\nf")
+        pdf.restoreState()
+    
+    def draw_qr(self, pdf: canvas.Canvas, qr_data: str, x: float, y: float, size: float):
+        if self.qr_mode == 'vector':
+            self.draw_qr_vector(pdf, qr_data, x, y, size)
+        else:
+            self.draw_qr_image(pdf, qr_data, x, y, size)
+    
+    def create_ticket_pdf_fast(self, ticket_data: Dict[str, Any], event_data: Dict[str, Any]) -> bytes:
+        """Cria PDF do ingresso pelo layout pré-compilado do evento (só os campos do ingresso são desenhados)"""
+        return self.create_tickets_pdf_fast([ticket_data], event_data)
+    
+    def create_tickets_pdf_fast(self, tickets_data: List[Dict[str, Any]], event_data: Dict[str, Any]) -> bytes:
+        """Cria um PDF com uma página por ingresso do mesmo evento, pelo layout pré-compilado"""
+        template = self.get_template(event_data)
+        pages = [{**ticket_data, 'qr_payload': self.qr_payload(ticket_data)} for ticket_data in tickets_data]
+        return template.render(pages, self.draw_qr, title=event_data['title'])
+    
     def create_event_report_pdf(self, event_data: Dict[str, Any], stats: Dict[str, Any]) -> bytes:
         """Cria relatório do evento em PDF"""
         buffer = io.BytesIO()
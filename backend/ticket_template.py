@@ -0,0 +1,163 @@
+import io
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = inch
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+LABEL_WIDTH = 1.5 * inch
+VALUE_WIDTH = 4 * inch
+TABLE_X = MARGIN + (CONTENT_WIDTH - LABEL_WIDTH - VALUE_WIDTH) / 2
+ROW_HEIGHT = 24
+CELL_PADDING = 6
+QR_SIZE = 2 * inch
+
+INSTRUCTIONS = [
+    "📱 INSTRUÇÕES:",
+    "• Apresente este ingresso na entrada do evento",
+    "• O QR Code será escaneado para validação",
+    "• Mantenha este documento em segurança",
+    "• Em caso de dúvidas, entre em contato com o organizador"
+]
+
+TICKET_LABELS = ['🎫 Número do Ingresso:', '💰 Valor Pago:', '📅 Data da Compra:', '👤 Comprador:']
+
+def fit_text(text: str, font: str, size: float, width: float) -> str:
+    """Corta o texto com reticências para caber na largura da célula"""
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + '…', font, size) > width:
+        text = text[:-1]
+    return text + '…'
+
+class TicketTemplate:
+    """
+    Layout do ingresso compilado uma vez por evento.
+
+    A compilação resolve tudo o que não muda entre ingressos do mesmo evento
+    (cabeçalho, título quebrado em linhas, dados do evento, rótulos,
+    instruções e as posições de cada campo) numa lista de operações de
+    canvas. Cada PDF desenha essa parte como um form XObject (definido uma
+    vez por documento e reutilizado em todas as páginas) e só escreve por
+    cima os campos do ingresso: número, valor, data da compra, comprador,
+    QR code e rodapé.
+    """
+
+    FORM_NAME = 'ticket_static'
+
+    def __init__(self, event_data: Dict[str, Any]):
+        self.ops: List[Tuple[str, tuple]] = []
+        self.value_positions: List[Tuple[float, float]] = []
+        self._compile(event_data)
+
+    def _op(self, name: str, *args):
+        self.ops.append((name, args))
+
+    def _compile(self, event_data: Dict[str, Any]):
+        y = PAGE_HEIGHT - MARGIN
+
+        # Cabeçalho
+        y -= 18
+        self._op('setFillColor', colors.darkgreen)
+        self._op('setFont', 'Helvetica-Bold', 18)
+        self._op('drawCentredString', PAGE_WIDTH / 2, y, "🎫 TICKETMETAL")
+        y -= 30
+
+        # Título do evento, quebrado em linhas como no Paragraph
+        self._op('setFillColor', colors.darkblue)
+        self._op('setFont', 'Helvetica-Bold', 24)
+        for line in simpleSplit(event_data['title'], 'Helvetica-Bold', 24, CONTENT_WIDTH):
+            y -= 29
+            self._op('drawCentredString', PAGE_WIDTH / 2, y, line)
+        y -= 24
+
+        # Informações do evento
+        event_info = [
+            ('📅 Data:', event_data['date'].strftime('%d/%m/%Y às %H:%M')),
+            ('📍 Local:', event_data['location']),
+            ('🏠 Endereço:', event_data['address']),
+            ('🏙️ Cidade:', f"{event_data['city']} - {event_data['state']}"),
+        ]
+        self._op('setFillColor', colors.black)
+        for label, value in event_info:
+            y -= ROW_HEIGHT
+            self._op('setFont', 'Helvetica-Bold', 12)
+            self._op('drawString', TABLE_X + CELL_PADDING, y + 8, label)
+            self._op('setFont', 'Helvetica', 12)
+            self._op('drawString', TABLE_X + LABEL_WIDTH + CELL_PADDING, y + 8,
+                     fit_text(value, 'Helvetica', 12, VALUE_WIDTH - 2 * CELL_PADDING))
+        y -= 20
+
+        # Tabela do ingresso: fundo e rótulos fixos, valores preenchidos por ingresso
+        table_height = ROW_HEIGHT * len(TICKET_LABELS)
+        self._op('setFillColor', colors.lightgrey)
+        self._op('rect', TABLE_X, y - table_height, LABEL_WIDTH + VALUE_WIDTH, table_height, 0, 1)
+        self._op('setFillColor', colors.black)
+        self._op('setFont', 'Helvetica-Bold', 12)
+        for label in TICKET_LABELS:
+            y -= ROW_HEIGHT
+            self._op('drawString', TABLE_X + CELL_PADDING, y + 8, label)
+            self.value_positions.append((TABLE_X + LABEL_WIDTH + CELL_PADDING, y + 8))
+        y -= 20
+
+        # Espaço do QR code
+        y -= QR_SIZE
+        self.qr_position = ((PAGE_WIDTH - QR_SIZE) / 2, y)
+        y -= 16
+
+        # Instruções
+        self._op('setFont', 'Helvetica', 12)
+        for instruction in INSTRUCTIONS:
+            y -= 20
+            self._op('drawString', MARGIN, y, instruction)
+
+        self.footer_position = (MARGIN, y - 30)
+
+    def _ensure_form(self, pdf: canvas.Canvas):
+        """Define o form XObject da parte estática no documento (uma vez por canvas)"""
+        if not pdf.hasForm(self.FORM_NAME):
+            pdf.beginForm(self.FORM_NAME)
+            for name, args in self.ops:
+                getattr(pdf, name)(*args)
+            pdf.endForm()
+
+    def draw_page(self, pdf: canvas.Canvas, ticket_data: Dict[str, Any], draw_qr: Callable[[canvas.Canvas, str, float, float, float], None]):
+        """Desenha uma página: a parte estática (form) e os campos do ingresso"""
+        self._ensure_form(pdf)
+        pdf.doForm(self.FORM_NAME)
+
+        values = [
+            ticket_data['ticket_number'],
+            f"R$ {ticket_data['price_paid']:.2f}",
+            ticket_data['purchased_at'].strftime('%d/%m/%Y às %H:%M'),
+            ticket_data['buyer_name'],
+        ]
+        pdf.setFillColor(colors.black)
+        pdf.setFont('Helvetica', 12)
+        for (x, y), value in zip(self.value_positions, values):
+            pdf.drawString(x, y, fit_text(str(value), 'Helvetica', 12, VALUE_WIDTH - 2 * CELL_PADDING))
+
+        qr_x, qr_y = self.qr_position
+        draw_qr(pdf, ticket_data['qr_payload'], qr_x, qr_y, QR_SIZE)
+
+        pdf.setFont('Helvetica', 10)
+        footer = f"Gerado em {datetime.now().strftime('%d/%m/%Y às %H:%M')} | TicketMetal"
+        pdf.drawString(*self.footer_position, footer)
+        pdf.showPage()
+
+    def render(self, tickets: List[Dict[str, Any]], draw_qr: Callable[[canvas.Canvas, str, float, float, float], None], title: Optional[str] = None) -> bytes:
+        """PDF com uma página por ingresso, todas reutilizando o mesmo form estático"""
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        if title:
+            pdf.setTitle(title)
+        for ticket_data in tickets:
+            self.draw_page(pdf, ticket_data, draw_qr)
+        pdf.save()
+        return buffer.getvalue()
@@ -67,5 +67,105 @@ COMMENT ON COLUMN users.provider IS 'Provedor de autenticação (google, faceboo
 COMMENT ON COLUMN users.is_admin IS 'Se o usuário é administrador/organizador';
 COMMENT ON COLUMN events.sales_end_date IS 'Data limite para venda de ingressos';
 COMMENT ON COLUMN tickets.qr_code IS 'Código QR único para validação';
-COMMENT ON COLUMN tickets.ticket_number IS 'Número único do ingresso (ex: TM00010001)';
+COMMENT ON COLUMN tickets.ticket_number IS 'Número único do ingresso, gerado pelo id_allocator (ex: TM0A8E2QERG0400)';
 COMMENT ON COLUMN tickets.status IS 'Status do ingresso (active, used, cancelled)';
+
+-- Índices da tabela eventos_rock (criada pelo agregador de eventos externos)
+DO $$
+BEGIN
+    IF to_regclass('public.eventos_rock') IS NOT NULL THEN
+        -- Paginação keyset por (data_formatada, id)
+        CREATE INDEX IF NOT EXISTS idx_eventos_rock_data_id ON eventos_rock(data_formatada, id);
+    END IF;
+END $$;
+
+-- Estatísticas de vendas de um evento numa única consulta agregada
+CREATE INDEX IF NOT EXISTS idx_tickets_event_status ON tickets(event_id, status) INCLUDE (price_paid);
+
+CREATE OR REPLACE FUNCTION events_ticket_stats(p_event_ids INTEGER[])
+RETURNS TABLE (
+    event_id INTEGER,
+    max_tickets INTEGER,
+    tickets_active BIGINT,
+    tickets_used BIGINT,
+    tickets_cancelled BIGINT,
+    revenue NUMERIC
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        e.id,
+        e.max_tickets,
+        count(t.id) FILTER (WHERE t.status = 'active'),
+        count(t.id) FILTER (WHERE t.status = 'used'),
+        count(t.id) FILTER (WHERE t.status = 'cancelled'),
+        coalesce(sum(t.price_paid) FILTER (WHERE t.status <> 'cancelled'), 0)
+    FROM events e
+    LEFT JOIN tickets t ON t.event_id = e.id
+    WHERE e.id = ANY(p_event_ids)
+    GROUP BY e.id, e.max_tickets;
+$$;
+
+CREATE OR REPLACE FUNCTION event_ticket_stats(p_event_id INTEGER)
+RETURNS TABLE (
+    event_id INTEGER,
+    max_tickets INTEGER,
+    tickets_active BIGINT,
+    tickets_used BIGINT,
+    tickets_cancelled BIGINT,
+    revenue NUMERIC
+)
+LANGUAGE sql STABLE AS $$
+    SELECT * FROM events_ticket_stats(ARRAY[p_event_id]);
+$$;
+
+-- Check-in: grava em lote os ingressos validados na entrada (group commit).
+-- Só altera ingressos ainda ativos e retorna os ids efetivamente marcados.
+CREATE OR REPLACE FUNCTION mark_tickets_used(p_ticket_ids INTEGER[], p_used_at TIMESTAMP[])
+RETURNS TABLE (ticket_id INTEGER)
+LANGUAGE sql VOLATILE AS $$
+    UPDATE tickets t
+    SET status = 'used', used_at = s.used_at
+    FROM unnest(p_ticket_ids, p_used_at) AS s(id, used_at)
+    WHERE t.id = s.id AND t.status = 'active'
+    RETURNING t.id;
+$$;
+
+-- Compra: grava os ingressos de uma reserva só se couberem na capacidade do evento.
+-- A linha do evento fica travada até o fim da transação, então compras simultâneas
+-- do mesmo evento (em qualquer instância da API) são verificadas uma de cada vez.
+-- Sem capacidade não grava nada e não retorna linhas.
+CREATE OR REPLACE FUNCTION create_tickets_within_capacity(p_event_id INTEGER, p_tickets JSONB)
+RETURNS SETOF tickets
+LANGUAGE plpgsql VOLATILE AS $$
+DECLARE
+    v_max_tickets INTEGER;
+    v_sold BIGINT;
+BEGIN
+    SELECT max_tickets INTO v_max_tickets FROM events WHERE id = p_event_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    SELECT count(*) INTO v_sold FROM tickets WHERE event_id = p_event_id AND status <> 'cancelled';
+    IF v_sold + jsonb_array_length(p_tickets) > v_max_tickets THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    INSERT INTO tickets (event_id, user_id, price_paid, ticket_number, qr_code, status, purchased_at)
+    SELECT p_event_id, t.user_id, t.price_paid, t.ticket_number, t.qr_code, coalesce(t.status, 'active'), coalesce(t.purchased_at, now())
+    FROM jsonb_populate_recordset(NULL::tickets, p_tickets) AS t
+    RETURNING *;
+END;
+$$;
+
+-- Worker id do gerador de números de ingresso (id_allocator): cada processo da API
+-- pega o próximo valor ao subir, então processos vivos ao mesmo tempo têm ids
+-- distintos enquanto houver menos de 1024 inícios entre eles.
+CREATE SEQUENCE IF NOT EXISTS worker_id_seq;
+
+CREATE OR REPLACE FUNCTION lease_worker_id()
+RETURNS INTEGER
+LANGUAGE sql VOLATILE AS $$
+    SELECT (nextval('worker_id_seq') % 1024)::integer;
+$$;
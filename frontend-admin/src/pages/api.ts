@@ -227,6 +227,23 @@ class ApiService {
     return response.json();
   }
 
+  async getEventsStatsBatch(eventIds: number[]) {
+    // Estatísticas de vários eventos numa única requisição, indexadas pelo id do evento
+    const response = await fetch(`${API_BASE_URL}/events/stats/batch`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ event_ids: eventIds }),
+    });
+    
+    if (!response.ok) {
+      throw new Error('Erro ao buscar estatísticas dos eventos');
+    }
+    
+    return response.json();
+  }
+
   // Método para gerar PDF do ingresso
   async generateTicketPdf(ticketId: number) {
     const response = await fetch(`${API_BASE_URL}/tickets/${ticketId}/pdf`);
@@ -238,6 +255,17 @@ class ApiService {
     return response.blob();
   }
 
+  // Método para baixar o relatório do evento em PDF
+  async generateEventReportPdf(eventId: number) {
+    const response = await fetch(`${API_BASE_URL}/events/${eventId}/report.pdf`);
+    
+    if (!response.ok) {
+      throw new Error('Erro ao gerar relatório do evento');
+    }
+    
+    return response.blob();
+  }
+
   // Métodos para Pagamentos
   async createPayment(paymentData: any) {
     const response = await fetch(`${API_BASE_URL}/payments/create`, {
@@ -56,12 +56,10 @@ const EventDetails: React.FC = () => {
       
       console.log('Buscando evento por identificador:', slug || id);
       
-      // Buscar todos os eventos e encontrar o evento com slug ou ID correspondente
-      const allEvents = await apiService.getEvents(100, 0);
-      const eventData = allEvents.find((e: any) => {
-        // Usar slug diretamente do banco, ou ID como fallback
-        return slug ? e.slug === slug : e.id === id;
-      });
+      // Buscar o evento diretamente pelo slug; por ID, procurar na listagem
+      const eventData = slug
+        ? await apiService.getEventBySlug(slug)
+        : (await apiService.getEvents(100, 0)).find((e: any) => e.id === id);
       
       console.log('Dados do evento recebidos:', eventData);
       
@@ -66,6 +66,17 @@ class ApiService {
     return response.json();
   }
 
+  async getEventBySlug(slug: string) {
+    // Busca um único evento rock pelo slug
+    const response = await fetch(`${API_BASE_URL}/events/rock/slug/${encodeURIComponent(slug)}`);
+    
+    if (!response.ok) {
+      throw new Error('Evento não encontrado');
+    }
+    
+    return response.json();
+  }
+
   // Método antigo mantido para referência futura
   // async getEvents(limit: number = 50, offset: number = 0) {
   //   const response = await fetch(`${API_BASE_URL}/events/?limit=${limit}&offset=${offset}`);
@@ -114,6 +125,26 @@ class ApiService {
     // return response.json();
   }
 
+  async createTicketsBulk(orderData: { event_id: number; user_id: number; price_paid: number; quantity: number }) {
+    throw new Error('Funcionalidade de compra desabilitada no modo agregador');
+    
+    // Código original comentado para quando formos usar eventos próprios
+    // Cria todos os ingressos do pedido numa única requisição
+    // const response = await fetch(`${API_BASE_URL}/tickets/bulk`, {
+    //   method: 'POST',
+    //   headers: {
+    //     'Content-Type': 'application/json',
+    //   },
+    //   body: JSON.stringify(orderData),
+    // });
+    // 
+    // if (!response.ok) {
+    //   throw new Error('Erro ao criar ingressos');
+    // }
+    // 
+    // return response.json();
+  }
+
   async getTicketsByUser(userId: number) {
     // Retorna array vazio no modo agregador
     return [];